@@ -0,0 +1,86 @@
+"""Compare the memory used by interned cardinalities with the former dataclasses.
+
+Run with `python benchmarks/cardinality_memory.py [number of features]`.
+"""
+
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable
+
+from cfmtoolbox.models import Cardinality, Interval
+
+# The most common cardinalities produced by the UVL and FeatureIDE importers
+COMMON_BOUNDS: list[list[tuple[int, int | None]]] = [
+    [(0, 1)],
+    [(1, 1)],
+    [(0, None)],
+    [(1, None)],
+    [],
+]
+
+
+@dataclass
+class DataclassInterval:
+    lower: int
+    upper: int | None
+
+
+@dataclass
+class DataclassCardinality:
+    intervals: list[DataclassInterval]
+
+
+def build_dataclass_cardinalities(count: int) -> list:
+    return [
+        [
+            DataclassCardinality(
+                [DataclassInterval(lower, upper) for lower, upper in bounds]
+            )
+            for bounds in (
+                COMMON_BOUNDS[i % 5],
+                COMMON_BOUNDS[(i + 1) % 5],
+                COMMON_BOUNDS[(i + 2) % 5],
+            )
+        ]
+        for i in range(count)
+    ]
+
+
+def build_interned_cardinalities(count: int) -> list:
+    return [
+        [
+            Cardinality([Interval(lower, upper) for lower, upper in bounds])
+            for bounds in (
+                COMMON_BOUNDS[i % 5],
+                COMMON_BOUNDS[(i + 1) % 5],
+                COMMON_BOUNDS[(i + 2) % 5],
+            )
+        ]
+        for i in range(count)
+    ]
+
+
+def measure(build: Callable[[int], list], count: int) -> int:
+    tracemalloc.start()
+    result = build(count)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    dataclass_bytes = measure(build_dataclass_cardinalities, count)
+    interned_bytes = measure(build_interned_cardinalities, count)
+
+    print(f"features:               {count}")
+    print(f"dataclass cardinalities: {dataclass_bytes / 2**20:8.2f} MiB")
+    print(f"interned cardinalities:  {interned_bytes / 2**20:8.2f} MiB")
+    print(f"reduction:               {1 - interned_bytes / dataclass_bytes:8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Compare loading a large generated model from JSON and from the binary CFMB format.
+
+Run with `python benchmarks/cfmb_load.py [number of features] [number of runs]`.
+"""
+
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+from cfmtoolbox import CFM, Cardinality, Feature, Interval
+from cfmtoolbox.plugins.cfmb_export import export_cfmb
+from cfmtoolbox.plugins.cfmb_import import read_cfmb
+from cfmtoolbox.plugins.json_export import export_json
+from cfmtoolbox.plugins.json_import import import_json
+
+BRANCHING = 8
+
+
+def generate_model(feature_count: int) -> CFM:
+    optional = Cardinality([Interval(0, 1)])
+    group = Cardinality([Interval(0, BRANCHING)])
+    features = [
+        Feature("feature0", Cardinality([Interval(1, 1)]), group, group, None, [])
+    ]
+
+    for i in range(1, feature_count):
+        parent = features[(i - 1) // BRANCHING]
+        feature = Feature(f"feature{i}", optional, group, group, parent, [])
+        parent.children.append(feature)
+        features.append(feature)
+
+    return CFM(features[0], [])
+
+
+def measure(load: Callable[[], object], runs: int) -> float:
+    durations = []
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        load()
+        durations.append(time.perf_counter() - start)
+
+    return statistics.median(durations)
+
+
+def main() -> None:
+    feature_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    cfm = generate_model(feature_count)
+
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = Path(directory) / "model.json"
+        cfmb_path = Path(directory) / "model.cfmb"
+        json_path.write_bytes(export_json(cfm))
+        cfmb_path.write_bytes(export_cfmb(cfm))
+
+        def load_cfmb() -> CFM:
+            with cfmb_path.open("rb") as file:
+                return read_cfmb(file)
+
+        json_duration = measure(lambda: import_json(json_path.read_bytes()), runs)
+        cfmb_duration = measure(load_cfmb, runs)
+
+        print(f"features:   {feature_count}")
+        print(f"json size:  {json_path.stat().st_size / 2**20:8.2f} MiB")
+        print(f"cfmb size:  {cfmb_path.stat().st_size / 2**20:8.2f} MiB")
+        print(f"json load:  {json_duration * 1000:8.1f} ms")
+        print(f"cfmb load:  {cfmb_duration * 1000:8.1f} ms")
+        print(f"speedup:    {json_duration / cfmb_duration:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Compare importing a model by parsing it with loading it from the model cache.
+
+Run with `python benchmarks/model_cache.py [model path] [number of runs]`. The model
+defaults to the UVL sandwich model of the tests, and the toolbox has to be
+installed, so its importers can be discovered.
+"""
+
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from cfmtoolbox import CFMToolbox, app
+from cfmtoolbox.cache import ModelCache
+
+
+def measure(app: CFMToolbox, runs: int, clear: bool) -> float:
+    durations = []
+
+    for _ in range(runs):
+        if clear and app.cache is not None:
+            app.cache.clear()
+
+        start = time.perf_counter()
+        app.import_model()
+        durations.append(time.perf_counter() - start)
+
+    return statistics.median(durations)
+
+
+def main() -> None:
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path("tests/data/sandwich.uvl")
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    app.declare_plugins()
+    app.import_path = path
+
+    uncached = measure(app, runs, clear=False)
+
+    with tempfile.TemporaryDirectory() as directory:
+        app.cache = ModelCache(Path(directory))
+        cold = measure(app, runs, clear=True)
+        warm = measure(app, runs, clear=False)
+
+    print(f"model:         {path}")
+    print(f"runs:          {runs}")
+    print(f"without cache: {uncached * 1000:8.2f} ms")
+    print(f"cold cache:    {cold * 1000:8.2f} ms")
+    print(f"warm cache:    {warm * 1000:8.2f} ms")
+    print(f"speedup:       {uncached / warm:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Compare the startup time of loading all plugins with loading only the selected ones.
+
+Run with `python benchmarks/plugin_startup.py [number of runs]`. The toolbox has to
+be installed, so its plugin entry points can be discovered.
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+
+ARGS = ["--import", "model.json", "debug"]
+
+EAGER = "from cfmtoolbox import app; app.load_plugins()"
+LAZY = f"from cfmtoolbox import app; app.load_plugins_for({ARGS!r})"
+BASELINE = "import cfmtoolbox"
+
+
+def measure(code: str, runs: int) -> float:
+    durations = []
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        durations.append(time.perf_counter() - start)
+
+    return statistics.median(durations)
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    baseline = measure(BASELINE, runs)
+    eager = measure(EAGER, runs)
+    lazy = measure(LAZY, runs)
+
+    print(f"runs:                 {runs}")
+    print(f"arguments:            {' '.join(ARGS)}")
+    print(f"import cfmtoolbox:    {baseline * 1000:8.1f} ms")
+    print(f"load all plugins:     {eager * 1000:8.1f} ms")
+    print(f"load needed plugins:  {lazy * 1000:8.1f} ms")
+    print(f"speedup:              {eager / lazy:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
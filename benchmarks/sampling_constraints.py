@@ -0,0 +1,45 @@
+"""Compare the acceptance rate of the random sampler with and without constraint propagation.
+
+Run with `python benchmarks/sampling_constraints.py [number of features] [constraint
+density] [number of samples]`.
+"""
+
+import random
+import sys
+import time
+
+from cfmtoolbox.generation import generate_cfm
+from cfmtoolbox.plugins.random_sampling import RandomSampler
+
+
+def main() -> None:
+    feature_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    constraint_density = float(sys.argv[2]) if len(sys.argv) > 2 else 0.03
+    sample_count = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+
+    model = generate_cfm(
+        feature_count,
+        clone_probability=0.1,
+        constraint_density=constraint_density,
+        seed=2,
+    )
+
+    print(f"features: {feature_count}   constraints: {len(model.constraints)}")
+    for propagate_constraints in (False, True):
+        sampler = RandomSampler(model, random.Random(0), propagate_constraints)
+
+        start = time.perf_counter()
+        for _ in range(sample_count):
+            sampler.random_flat_sampling()
+        rate = sample_count / (time.perf_counter() - start)
+
+        print(
+            f"propagation {'on ' if propagate_constraints else 'off'}   "
+            f"acceptance rate: {sampler.acceptance_rate:6.1%}   "
+            f"discarded: {sampler.retries:5} ({sampler.pruned} pruned)   "
+            f"{rate:8.1f} samples/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Compare the sampling throughput with the secure and the default random generator.
+
+Run with `python benchmarks/sampling_random.py [number of features] [number of samples]`.
+"""
+
+import random
+import sys
+import time
+
+from cfmtoolbox.generation import generate_cfm
+from cfmtoolbox.plugins.one_wise_sampling import OneWiseSampler
+from cfmtoolbox.plugins.random_sampling import RandomSampler
+from cfmtoolbox.randomness import create_random_generator
+
+
+def random_samples_per_second(sampler: RandomSampler, sample_count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(sample_count):
+        sampler.random_flat_sampling()
+    return sample_count / (time.perf_counter() - start)
+
+
+def one_wise_samples_per_second(sampler: OneWiseSampler) -> float:
+    start = time.perf_counter()
+    sample_count = len(sampler.one_wise_flat_sampling())
+    return sample_count / (time.perf_counter() - start)
+
+
+def main() -> None:
+    feature_count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    sample_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    model = generate_cfm(feature_count, clone_probability=0.1, seed=0)
+
+    generators: dict[str, random.Random] = {
+        "secure": create_random_generator(secure=True),
+        "seeded": create_random_generator(0),
+    }
+
+    print(f"features: {feature_count}")
+    for name, generator in generators.items():
+        random_rate = random_samples_per_second(
+            RandomSampler(model, generator), sample_count
+        )
+        one_wise_rate = one_wise_samples_per_second(OneWiseSampler(model, generator))
+        print(
+            f"{name:8} random sampling: {random_rate:8.1f} samples/s   "
+            f"one-wise sampling: {one_wise_rate:8.1f} samples/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
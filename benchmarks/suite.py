@@ -0,0 +1,259 @@
+"""Benchmark the importers, exporters and samplers on generated models of several sizes.
+
+Run with `python benchmarks/suite.py [--tiers small medium large] [--runs 5]
+[--output results.json] [--compare previous.json]`.
+
+Each tier is a model from `cfmtoolbox.generation.generate_cfm` with the tier's number
+of features, some clonable features and one constraint per hundred features. The
+median and minimum wall time of every benchmark are written to the output file as
+JSON. With `--compare`, the minimums are compared with those of an earlier results
+file, and the exit code is 1 if any benchmark became slower than the threshold.
+
+The UVL importer reads the tier's model without constraints, as it cannot read back
+the constraints the exporter writes for generated models. The one-wise sampler only
+runs on tiers of up to 1000 features, as it needs one sample per feature.
+The samplers run on the models without constraints, as rejecting invalid samples
+would dominate their runtime.
+"""
+
+import argparse
+import copy
+import json
+import platform
+import statistics
+import sys
+import time
+from collections.abc import Callable, Iterator
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from typing import Any, NamedTuple
+from xml.etree.ElementTree import Element, SubElement, tostring
+
+from cfmtoolbox import CFM, Feature
+from cfmtoolbox.cache import toolbox_version
+from cfmtoolbox.generation import generate_cfm
+from cfmtoolbox.plugins.big_m import apply_big_m
+from cfmtoolbox.plugins.featureide_import import import_featureide
+from cfmtoolbox.plugins.json_export import export_json
+from cfmtoolbox.plugins.json_import import import_json
+from cfmtoolbox.plugins.one_wise_sampling import OneWiseSampler
+from cfmtoolbox.plugins.random_sampling import RandomSampler
+from cfmtoolbox.plugins.uniform_sampling import UniformSampler
+from cfmtoolbox.plugins.uvl_export import export_uvl
+from cfmtoolbox.plugins.uvl_import import import_uvl
+
+TIERS = {"small": 100, "medium": 1_000, "large": 10_000}
+"""Number of features of the generated model of each tier."""
+
+ONE_WISE_MAX_FEATURES = 1_000
+SAMPLES = 10
+RESULTS_VERSION = 1
+
+
+class Benchmark(NamedTuple):
+    name: str
+    run: Callable[[Any], object]
+    setup: Callable[[], Any] = lambda: None
+    """Prepares the argument of each run outside of the measured time."""
+
+
+class Result(NamedTuple):
+    tier: str
+    features: int
+    benchmark: str
+    runs: int
+    median: float
+    min: float
+
+
+def featureide_document(cfm: CFM) -> bytes:
+    """Serialize a boolean feature model to FeatureIDE XML, for the FeatureIDE importer."""
+
+    document = Element("featureModel")
+    add_featureide_feature(SubElement(document, "struct"), cfm.root)
+
+    constraints = SubElement(document, "constraints")
+    for constraint in cfm.constraints:
+        implication = SubElement(SubElement(constraints, "rule"), "imp")
+        SubElement(implication, "var").text = constraint.first_feature.name
+        consequence = (
+            implication if constraint.require else SubElement(implication, "not")
+        )
+        SubElement(consequence, "var").text = constraint.second_feature.name
+
+    return tostring(document)
+
+
+def add_featureide_feature(parent: Element, feature: Feature) -> None:
+    group_type = feature.group_type_cardinality.intervals
+    all_optional = not any(child.is_required for child in feature.children)
+
+    if not feature.children:
+        tag = "feature"
+    elif all_optional and len(feature.children) > 1 and group_type[0].lower == 1:
+        tag = "alt" if group_type[0].upper == 1 else "or"
+    else:
+        tag = "and"
+
+    element = SubElement(parent, tag, name=feature.name)
+    if feature.is_required:
+        element.set("mandatory", "true")
+
+    for child in feature.children:
+        add_featureide_feature(element, child)
+
+
+def uvl_document(tree: CFM) -> bytes:
+    """Export a feature model without constraints to UVL the UVL importer can read."""
+
+    # The importer rejects the empty constraints section the exporter ends with
+    return export_uvl(tree).rstrip().removesuffix(b"constraints")
+
+
+def tier_benchmarks(feature_count: int, seed: int) -> Iterator[Benchmark]:
+    model = generate_cfm(
+        feature_count, clone_probability=0.1, constraint_density=0.01, seed=seed
+    )
+    boolean_model = generate_cfm(feature_count, constraint_density=0.01, seed=seed)
+    unbound_model = generate_cfm(
+        feature_count,
+        clone_probability=0.1,
+        unbounded_probability=0.02,
+        seed=seed,
+    )
+    tree = CFM(model.root, [])
+
+    json_data = export_json(model)
+    uvl_data = uvl_document(tree)
+    featureide_data = featureide_document(boolean_model)
+
+    yield Benchmark("import_json", lambda _: import_json(json_data))
+    yield Benchmark("export_json", lambda _: export_json(model))
+
+    yield Benchmark("import_uvl", lambda _: import_uvl(uvl_data))
+    yield Benchmark("export_uvl", lambda _: export_uvl(model))
+    yield Benchmark("import_featureide", lambda _: import_featureide(featureide_data))
+    yield Benchmark("apply_big_m", apply_big_m, lambda: copy.deepcopy(unbound_model))
+
+    sampler = RandomSampler(tree)
+    yield Benchmark(
+        "RandomSampler", lambda _: [sampler.random_sampling() for _ in range(SAMPLES)]
+    )
+
+    uniform_sampler = UniformSampler(tree)
+    yield Benchmark(
+        "UniformSampler",
+        lambda _: [uniform_sampler.uniform_sampling() for _ in range(SAMPLES)],
+    )
+
+    if feature_count <= ONE_WISE_MAX_FEATURES:
+        yield Benchmark(
+            "OneWiseSampler", lambda _: OneWiseSampler(tree).one_wise_sampling()
+        )
+
+    samples = [sampler.random_sampling() for _ in range(SAMPLES)]
+    yield Benchmark(
+        "ConfigurationNode.validate",
+        lambda _: [sample.validate(model) for sample in samples],
+    )
+
+
+def measure(benchmark: Benchmark, runs: int) -> list[float]:
+    durations = []
+
+    for _ in range(runs):
+        argument = benchmark.setup()
+
+        # Commands report their progress on stdout, which would drown the results
+        with redirect_stdout(StringIO()):
+            start = time.perf_counter()
+            benchmark.run(argument)
+            durations.append(time.perf_counter() - start)
+
+    return durations
+
+
+def run_suite(tiers: list[str], runs: int, seed: int) -> Iterator[Result]:
+    for tier in tiers:
+        feature_count = TIERS[tier]
+
+        for benchmark in tier_benchmarks(feature_count, seed):
+            durations = measure(benchmark, runs)
+            yield Result(
+                tier,
+                feature_count,
+                benchmark.name,
+                runs,
+                statistics.median(durations),
+                min(durations),
+            )
+
+
+def compare(results: list[Result], previous_path: Path, threshold: float) -> bool:
+    """Print the change of each minimum against an earlier results file. False if any regressed."""
+
+    # The minimum is compared, as it is the least affected by other processes
+    previous = json.loads(previous_path.read_text())
+    previous_minimums = {
+        (result["tier"], result["benchmark"]): result["min"]
+        for result in previous["results"]
+    }
+    regressed = False
+
+    for result in results:
+        previous_minimum = previous_minimums.get((result.tier, result.benchmark))
+        if previous_minimum is None:
+            continue
+
+        ratio = result.min / previous_minimum
+        slower = ratio > 1 + threshold
+        regressed = regressed or slower
+        print(
+            f"{result.tier:8} {result.benchmark:28} {ratio:6.2f}x"
+            + ("  regression" if slower else "")
+        )
+
+    return not regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tiers", nargs="+", choices=TIERS, default=list(TIERS))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=Path("benchmark-results.json"))
+    parser.add_argument("--compare", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.2)
+    arguments = parser.parse_args()
+
+    results = []
+    for result in run_suite(arguments.tiers, arguments.runs, arguments.seed):
+        print(
+            f"{result.tier:8} {result.benchmark:28} {result.median * 1000:10.2f} ms",
+            file=sys.stderr,
+        )
+        results.append(result)
+
+    arguments.output.write_text(
+        json.dumps(
+            {
+                "version": RESULTS_VERSION,
+                "toolbox_version": toolbox_version(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "seed": arguments.seed,
+                "results": [result._asdict() for result in results],
+            },
+            indent=2,
+        )
+    )
+
+    if arguments.compare is not None and not compare(
+        results, arguments.compare, arguments.threshold
+    ):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
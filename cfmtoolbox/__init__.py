@@ -1,4 +1,13 @@
-from .models import CFM, Cardinality, ConfigurationNode, Constraint, Feature, Interval
+from .models import (
+    CFM,
+    Cardinality,
+    ConfigurationNode,
+    Constraint,
+    Feature,
+    FeatureIndex,
+    Interval,
+    structurally_equal,
+)
 from .toolbox import CFMToolbox
 
 app = CFMToolbox()
@@ -9,6 +18,8 @@ __all__ = [
     "Interval",
     "Cardinality",
     "Feature",
+    "FeatureIndex",
     "Constraint",
     "ConfigurationNode",
+    "structurally_equal",
 ]
@@ -1,4 +1,6 @@
+import sys
+
 from cfmtoolbox import app
 
-app.load_plugins()
+app.load_plugins_for(sys.argv[1:])
 app()
@@ -0,0 +1,117 @@
+import glob
+from collections.abc import Collection, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from time import perf_counter
+from typing import TYPE_CHECKING, NamedTuple
+
+from cfmtoolbox.cache import ModelCache, default_cache_directory
+
+if TYPE_CHECKING:
+    from cfmtoolbox.toolbox import CFMToolbox, PipelineStage
+
+
+class BatchResult(NamedTuple):
+    import_path: Path
+    """Path of the imported model."""
+
+    duration: float
+    """Seconds spent on importing, processing and exporting the model."""
+
+    error: str | None = None
+    """Description of the error that stopped processing the model, if any."""
+
+
+def is_batch_path(path: Path) -> bool:
+    """Check if an import path selects several models, as a directory or a glob pattern."""
+
+    # Existing files are single models, even if their names look like patterns
+    return path.is_dir() or (not path.is_file() and glob.has_magic(str(path)))
+
+
+def find_models(path: Path, extensions: Collection[str]) -> list[Path]:
+    """Find the model files in a directory with one of the extensions, or the files matching a glob pattern."""
+
+    if path.is_dir():
+        return sorted(
+            child
+            for child in path.iterdir()
+            if child.is_file() and child.suffix in extensions
+        )
+
+    return sorted(
+        Path(match)
+        for match in glob.glob(str(path), recursive=True)
+        if Path(match).is_file()
+    )
+
+
+def process_model(
+    app: "CFMToolbox",
+    stages: Sequence["PipelineStage"],
+    import_path: Path,
+    export_path: Path | None,
+) -> BatchResult:
+    """Run the pipeline on one model, turning any error into a failed result."""
+
+    app.import_path = import_path
+    app.export_path = export_path
+    start = perf_counter()
+
+    try:
+        app.process_model(stages)
+    except Exception as error:
+        return BatchResult(import_path, perf_counter() - start, describe_error(error))
+
+    return BatchResult(import_path, perf_counter() - start)
+
+
+def process_models(
+    app: "CFMToolbox",
+    stages: Sequence["PipelineStage"],
+    models: Sequence[tuple[Path, Path | None]],
+    jobs: int = 1,
+) -> Iterator[BatchResult]:
+    """Run the pipeline on each pair of import and export paths, yielding the results in order.
+
+    With more than one job, the models are processed by a process pool. Each worker
+    loads the plugins and parses the pipeline once, using the global toolbox app.
+    """
+
+    if jobs <= 1:
+        for import_path, export_path in models:
+            yield process_model(app, stages, import_path, export_path)
+        return
+
+    pipeline = [list(stage.args) for stage in stages]
+
+    with ProcessPoolExecutor(
+        jobs,
+        initializer=_initialize_worker,
+        initargs=(pipeline, app.cache is not None),
+    ) as executor:
+        yield from executor.map(_process_model, *zip(*models))
+
+
+def describe_error(error: Exception) -> str:
+    message = str(error)
+    return f"{type(error).__name__}: {message}" if message else type(error).__name__
+
+
+_worker_stages: list["PipelineStage"] = []
+
+
+def _initialize_worker(pipeline: list[list[str]], use_cache: bool) -> None:
+    global _worker_stages
+
+    from cfmtoolbox import app
+
+    app.load_plugins()
+    app.cache = ModelCache(default_cache_directory()) if use_cache else None
+    _worker_stages = app.parse_pipeline(pipeline)
+
+
+def _process_model(import_path: Path, export_path: Path | None) -> BatchResult:
+    from cfmtoolbox import app
+
+    return process_model(app, _worker_stages, import_path, export_path)
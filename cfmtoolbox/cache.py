@@ -0,0 +1,176 @@
+import os
+import pickle
+from hashlib import sha256
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import BinaryIO
+
+from cfmtoolbox.flat import FlatCFM
+from cfmtoolbox.models import CFM
+
+DEFAULT_MAX_SIZE = 256 * 2**20
+"""Default size limit of the model cache in bytes."""
+
+CHUNK_SIZE = 2**20
+"""Number of bytes hashed at once when computing the key of a file."""
+
+CACHE_DIR_VARIABLE = "CFMTOOLBOX_CACHE_DIR"
+"""Environment variable overriding the default cache directory."""
+
+
+def default_cache_directory() -> Path:
+    """Directory of the model cache, `$CFMTOOLBOX_CACHE_DIR` or `cfmtoolbox` in the user's cache directory."""
+
+    directory = os.environ.get(CACHE_DIR_VARIABLE)
+    if directory:
+        return Path(directory)
+
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    return (Path(cache_home) if cache_home else Path.home() / ".cache") / "cfmtoolbox"
+
+
+def toolbox_version() -> str:
+    try:
+        return version("cfmtoolbox")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+class ModelCache:
+    """On-disk cache of imported feature models.
+
+    Entries are keyed by the hash of the imported file's contents, the importer and
+    the toolbox version, so changed files, importers or toolbox releases never hit
+    stale entries. Models are stored as pickled
+    [FlatCFM][cfmtoolbox.flat.FlatCFM]s, which consist of a few arrays and load
+    much faster than any text format can be parsed. When the cache grows beyond its
+    size limit, the least recently used entries are evicted.
+
+    Entries are unpickled, so the cache directory must only be writable by the user.
+    """
+
+    def __init__(self, directory: Path, max_size: int = DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+
+    def key(self, data: bytes | BinaryIO, importer: str) -> str:
+        """Key of the model imported from the file contents by the named importer.
+
+        Files are hashed in chunks from their current position to their end, so
+        large models are never read into memory at once.
+        """
+
+        digest = sha256()
+        digest.update(toolbox_version().encode())
+        digest.update(b"\0")
+        digest.update(importer.encode())
+        digest.update(b"\0")
+
+        if isinstance(data, bytes):
+            digest.update(data)
+        else:
+            while chunk := data.read(CHUNK_SIZE):
+                digest.update(chunk)
+
+        return digest.hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.directory / f"{key}.pickle"
+
+    def load(self, key: str) -> CFM | None:
+        """Load a cached model. Returns None if the model is not cached or the cache is unusable."""
+
+        path = self.path(key)
+
+        try:
+            data = path.read_bytes()
+        except OSError:
+            # Missing entries and unreadable cache directories are cache misses
+            return None
+
+        try:
+            flat_cfm = pickle.loads(data)
+        except Exception:
+            flat_cfm = None
+
+        if not isinstance(flat_cfm, FlatCFM):
+            # Entries written by an interrupted or incompatible toolbox are dropped
+            self.discard(path)
+            return None
+
+        try:
+            # The modification time tracks the last use for the eviction
+            os.utime(path)
+        except OSError:
+            pass
+
+        return flat_cfm.to_cfm()
+
+    def store(self, key: str, cfm: CFM) -> None:
+        """Cache a model and evict the least recently used entries beyond the size limit.
+
+        Models are silently left uncached if the cache directory is unusable.
+        """
+
+        try:
+            flat_cfm = FlatCFM.from_cfm(cfm)
+        except ValueError:
+            # Models with constraints on unknown features cannot be flattened
+            return
+
+        temporary_path: Path | None = None
+
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+            # Entries are renamed into place, so concurrent imports never read a
+            # partially written entry
+            with NamedTemporaryFile(
+                dir=self.directory, suffix=".tmp", delete=False
+            ) as file:
+                temporary_path = Path(file.name)
+                pickle.dump(flat_cfm, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+            os.replace(temporary_path, self.path(key))
+        except OSError:
+            if temporary_path is not None:
+                self.discard(temporary_path)
+            return
+
+        self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        size = 0
+
+        try:
+            paths = list(self.directory.glob("*.pickle"))
+        except OSError:
+            return
+
+        for path in paths:
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            size += stat.st_size
+
+        entries.sort()
+
+        for _, entry_size, path in entries:
+            if size <= self.max_size:
+                break
+            self.discard(path)
+            size -= entry_size
+
+    def discard(self, path: Path) -> None:
+        try:
+            path.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        for path in self.directory.glob("*.pickle"):
+            path.unlink(missing_ok=True)
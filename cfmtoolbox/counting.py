@@ -0,0 +1,120 @@
+from collections import defaultdict
+
+from cfmtoolbox.models import CFM, Cardinality, Feature
+
+GroupCounts = list[dict[tuple[int, int], int]]
+"""Number of ways to choose the children of a group from each position on.
+
+The entry of a position maps the number of selected children and the sum of their
+instance counts to the number of ways the children from that position on can be
+chosen with these totals, including the configurations of their subtrees.
+"""
+
+
+class ConfigurationCounter:
+    """Counts the configurations of a bound feature model, ignoring its constraints.
+
+    Configurations are counted as trees with one root instance, where the instances
+    of a feature below the same parent are ordered, as in the configurations the
+    samplers produce. The counts are computed once, bottom-up in reversed
+    breadth-first order: for every feature, the number of configurations of one of
+    its instances, and for every instance count of the feature, the number of
+    configurations of that many instances. The counts are exact, so they grow to
+    arbitrarily large integers for large models.
+    """
+
+    def __init__(self, model: CFM):
+        self.model = model
+        self.feature_ids = {feature: i for i, feature in enumerate(model.features)}
+
+        self.configuration_counts = [0] * len(model.features)
+        """Number of configurations of one instance of each feature, by feature id."""
+
+        self.instance_counts: list[dict[int, int]] = [{}] * len(model.features)
+        """Number of configurations of each valid instance count of each feature, by feature id.
+
+        Instance counts without any configuration are left out.
+        """
+
+        self.group_counts: list[GroupCounts] = [[]] * len(model.features)
+        """Group counts of each feature, by feature id. Empty for features without children."""
+
+        for feature in reversed(model.features):
+            feature_id = self.feature_ids[feature]
+
+            if feature.children:
+                group_counts = self.count_group(feature)
+                self.group_counts[feature_id] = group_counts
+                configuration_count = sum(
+                    count
+                    for (type_count, instance_sum), count in group_counts[0].items()
+                    if feature.group_type_cardinality.is_valid_cardinality(type_count)
+                    and feature.group_instance_cardinality.is_valid_cardinality(
+                        instance_sum
+                    )
+                )
+            else:
+                configuration_count = 1
+
+            self.configuration_counts[feature_id] = configuration_count
+            self.instance_counts[feature_id] = {
+                instances: configuration_count**instances
+                for instances in instance_values(feature)
+                if instances == 0 or configuration_count
+            }
+
+    @property
+    def count(self) -> int:
+        """Number of configurations of the model without its constraints."""
+
+        return self.configuration_counts[0]
+
+    def count_group(self, feature: Feature) -> GroupCounts:
+        # Neither the number of selected children nor the sum of their instance
+        # counts can usefully exceed the upper bounds of the group cardinalities
+        max_type_count = max_value(feature.group_type_cardinality)
+        max_instance_sum = max_value(feature.group_instance_cardinality)
+
+        group_counts: GroupCounts = [{} for _ in range(len(feature.children) + 1)]
+        group_counts[-1] = {(0, 0): 1}
+
+        for position in reversed(range(len(feature.children))):
+            child = feature.children[position]
+            instance_counts = self.instance_counts[self.feature_ids[child]]
+            counts: defaultdict[tuple[int, int], int] = defaultdict(int)
+
+            for (type_count, instance_sum), later_count in group_counts[
+                position + 1
+            ].items():
+                for instances, count in instance_counts.items():
+                    totals = (type_count + (instances > 0), instance_sum + instances)
+
+                    if (max_type_count is None or totals[0] <= max_type_count) and (
+                        max_instance_sum is None or totals[1] <= max_instance_sum
+                    ):
+                        counts[totals] += later_count * count
+
+            group_counts[position] = dict(counts)
+
+        return group_counts
+
+
+def instance_values(feature: Feature) -> list[int]:
+    """Valid instance counts of a feature. Unbounded instance cardinalities are rejected."""
+
+    values: list[int] = []
+    for interval in feature.instance_cardinality.normalized().intervals:
+        if interval.upper is None:
+            raise ValueError(
+                f"{feature.name} is unbound. Please apply big-m global bound first."
+            )
+        values.extend(range(interval.lower, interval.upper + 1))
+
+    return values
+
+
+def max_value(cardinality: Cardinality) -> int | None:
+    """Largest valid value of a cardinality, or None if it is unbounded."""
+
+    intervals = cardinality.normalized().intervals
+    return intervals[-1].upper if intervals else 0
@@ -0,0 +1,511 @@
+from array import array
+from bisect import bisect_right
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+
+from cfmtoolbox.models import CFM, Cardinality, ConfigurationNode, Constraint, Feature
+
+UNBOUNDED = -1
+"""Value used for unbounded upper bounds in the packed interval bound tables."""
+
+
+@dataclass
+class FlatCFM:
+    """Dataclass representing a feature model as a structure of contiguous arrays.
+
+    Features are identified by their position in breadth-first order, with the root
+    feature having id 0. Because of this order, the children of every feature have
+    consecutive ids.
+    """
+
+    names: list[str]
+    """Name of each feature."""
+
+    parents: "array[int]"
+    """Id of each feature's parent. -1 for the root feature."""
+
+    first_children: "array[int]"
+    """Id of each feature's first child. Equal to the feature count for leaves."""
+
+    child_counts: "array[int]"
+    """Number of children of each feature."""
+
+    preorder: "array[int]"
+    """Rank of each feature in a depth-first pre-order traversal."""
+
+    postorder: "array[int]"
+    """Rank of each feature in a depth-first post-order traversal."""
+
+    cardinalities: list[Cardinality]
+    """Table of all distinct cardinalities used in the feature model."""
+
+    instance_cardinalities: "array[int]"
+    """Index of each feature's instance cardinality in the cardinality table."""
+
+    group_type_cardinalities: "array[int]"
+    """Index of each feature's group type cardinality in the cardinality table."""
+
+    group_instance_cardinalities: "array[int]"
+    """Index of each feature's group instance cardinality in the cardinality table."""
+
+    interval_offsets: "array[int]"
+    """Start of each cardinality's normalized intervals in the bound tables, followed by the total number of intervals."""
+
+    interval_lowers: "array[int]"
+    """Lower bounds of the normalized intervals of all cardinalities."""
+
+    interval_uppers: "array[int]"
+    """Upper bounds of the normalized intervals of all cardinalities. -1 if unbounded."""
+
+    constraint_requires: "array[int]"
+    """1 for require constraints, 0 for exclude constraints."""
+
+    constraint_first_features: "array[int]"
+    """Id of the first feature of each constraint."""
+
+    constraint_first_cardinalities: "array[int]"
+    """Index of the first cardinality of each constraint in the cardinality table."""
+
+    constraint_second_features: "array[int]"
+    """Id of the second feature of each constraint."""
+
+    constraint_second_cardinalities: "array[int]"
+    """Index of the second cardinality of each constraint in the cardinality table."""
+
+    ids: dict[str, int] = field(init=False, repr=False, compare=False)
+    """Mapping of feature names to feature ids."""
+
+    def __post_init__(self) -> None:
+        self.ids = {}
+        for feature_id, name in enumerate(self.names):
+            self.ids.setdefault(name, feature_id)
+
+    @property
+    def feature_count(self) -> int:
+        """Number of features in the feature model."""
+
+        return len(self.names)
+
+    @property
+    def constraint_count(self) -> int:
+        """Number of constraints in the feature model."""
+
+        return len(self.constraint_requires)
+
+    def children(self, feature_id: int) -> range:
+        """Ids of the children of a feature."""
+
+        first_child = self.first_children[feature_id]
+        return range(first_child, first_child + self.child_counts[feature_id])
+
+    def is_valid_cardinality(self, cardinality_index: int, value: int) -> bool:
+        """Check if a value is valid for a cardinality of the cardinality table."""
+
+        start = self.interval_offsets[cardinality_index]
+        end = self.interval_offsets[cardinality_index + 1]
+        position = bisect_right(self.interval_lowers, value, start, end) - 1
+
+        if position < start:
+            return False
+
+        upper = self.interval_uppers[position]
+        return upper == UNBOUNDED or value <= upper
+
+    def is_violated_constraint(
+        self, constraint: int, global_feature_count: Sequence[int]
+    ) -> bool:
+        """Check if a constraint is violated by a vector of global feature counts."""
+
+        if not self.is_valid_cardinality(
+            self.constraint_first_cardinalities[constraint],
+            global_feature_count[self.constraint_first_features[constraint]],
+        ):
+            return False
+
+        return self.is_valid_cardinality(
+            self.constraint_second_cardinalities[constraint],
+            global_feature_count[self.constraint_second_features[constraint]],
+        ) != bool(self.constraint_requires[constraint])
+
+    def first_violated_constraint(self, global_feature_count: Sequence[int]) -> int:
+        """Index of the first constraint violated by a vector of global feature counts. -1 if none is violated."""
+
+        for constraint in range(self.constraint_count):
+            if self.is_violated_constraint(constraint, global_feature_count):
+                return constraint
+
+        return -1
+
+    def first_violated_constraints(
+        self, global_feature_counts: Sequence[Sequence[int]]
+    ) -> list[int]:
+        """Index of the first violated constraint for each row of a matrix of global feature counts. -1 if none is violated."""
+
+        first_violated = [-1] * len(global_feature_counts)
+        unresolved = list(range(len(global_feature_counts)))
+
+        # Constraints are evaluated column by column. Feature counts repeat a lot
+        # across configurations, so every cardinality is checked once per distinct
+        # count, and rows that already violate a constraint are not checked again.
+        for constraint in range(self.constraint_count):
+            if not unresolved:
+                break
+
+            first_feature = self.constraint_first_features[constraint]
+            second_feature = self.constraint_second_features[constraint]
+            first_valid = self._count_memberships(
+                self.constraint_first_cardinalities[constraint],
+                {global_feature_counts[row][first_feature] for row in unresolved},
+            )
+            second_valid = self._count_memberships(
+                self.constraint_second_cardinalities[constraint],
+                {global_feature_counts[row][second_feature] for row in unresolved},
+            )
+            require = bool(self.constraint_requires[constraint])
+
+            still_unresolved = []
+            for row in unresolved:
+                counts = global_feature_counts[row]
+                if (
+                    first_valid[counts[first_feature]]
+                    and second_valid[counts[second_feature]] != require
+                ):
+                    first_violated[row] = constraint
+                else:
+                    still_unresolved.append(row)
+            unresolved = still_unresolved
+
+        return first_violated
+
+    def _count_memberships(
+        self, cardinality_index: int, values: set[int]
+    ) -> dict[int, bool]:
+        return {
+            value: self.is_valid_cardinality(cardinality_index, value)
+            for value in values
+        }
+
+    @classmethod
+    def from_cfm(cls, cfm: CFM) -> "FlatCFM":
+        """Flatten a feature model in a single pass over its feature index."""
+
+        index = cfm.feature_index
+        features = index.features
+        feature_count = len(features)
+
+        cardinality_ids: dict[Cardinality, int] = {}
+        cardinalities: list[Cardinality] = []
+
+        def cardinality_id(cardinality: Cardinality) -> int:
+            position = cardinality_ids.get(cardinality)
+            if position is None:
+                position = cardinality_ids[cardinality] = len(cardinalities)
+                cardinalities.append(cardinality)
+            return position
+
+        parents = array("q", index.parents)
+        first_children = array("q", [feature_count]) * feature_count
+        child_counts = array("q", [0]) * feature_count
+        instance_cardinalities = array("q")
+        group_type_cardinalities = array("q")
+        group_instance_cardinalities = array("q")
+
+        for feature_id, feature in enumerate(features):
+            parent_id = parents[feature_id]
+            if parent_id >= 0:
+                if child_counts[parent_id] == 0:
+                    first_children[parent_id] = feature_id
+                child_counts[parent_id] += 1
+
+            instance_cardinalities.append(cardinality_id(feature.instance_cardinality))
+            group_type_cardinalities.append(
+                cardinality_id(feature.group_type_cardinality)
+            )
+            group_instance_cardinalities.append(
+                cardinality_id(feature.group_instance_cardinality)
+            )
+
+        # Constraints usually reference features of the tree, which are found by
+        # identity. Features that are not part of the tree are matched by name.
+        feature_ids = {
+            id(feature): feature_id for feature_id, feature in enumerate(features)
+        }
+
+        def constraint_feature_id(feature: Feature) -> int:
+            feature_id = feature_ids.get(id(feature), index.ids.get(feature.name))
+            if feature_id is None:
+                raise ValueError(f"Feature {feature.name} not found")
+            return feature_id
+
+        constraint_requires = array("b")
+        constraint_first_features = array("q")
+        constraint_first_cardinalities = array("q")
+        constraint_second_features = array("q")
+        constraint_second_cardinalities = array("q")
+
+        for constraint in cfm.constraints:
+            constraint_requires.append(constraint.require)
+            constraint_first_features.append(
+                constraint_feature_id(constraint.first_feature)
+            )
+            constraint_first_cardinalities.append(
+                cardinality_id(constraint.first_cardinality)
+            )
+            constraint_second_features.append(
+                constraint_feature_id(constraint.second_feature)
+            )
+            constraint_second_cardinalities.append(
+                cardinality_id(constraint.second_cardinality)
+            )
+
+        interval_offsets = array("q", [0])
+        interval_lowers = array("q")
+        interval_uppers = array("q")
+
+        for cardinality in cardinalities:
+            for interval in cardinality.normalized().intervals:
+                interval_lowers.append(interval.lower)
+                interval_uppers.append(
+                    UNBOUNDED if interval.upper is None else interval.upper
+                )
+            interval_offsets.append(len(interval_lowers))
+
+        preorder, postorder = _depth_first_ranks(first_children, child_counts)
+
+        return cls(
+            names=[feature.name for feature in features],
+            parents=parents,
+            first_children=first_children,
+            child_counts=child_counts,
+            preorder=preorder,
+            postorder=postorder,
+            cardinalities=cardinalities,
+            instance_cardinalities=instance_cardinalities,
+            group_type_cardinalities=group_type_cardinalities,
+            group_instance_cardinalities=group_instance_cardinalities,
+            interval_offsets=interval_offsets,
+            interval_lowers=interval_lowers,
+            interval_uppers=interval_uppers,
+            constraint_requires=constraint_requires,
+            constraint_first_features=constraint_first_features,
+            constraint_first_cardinalities=constraint_first_cardinalities,
+            constraint_second_features=constraint_second_features,
+            constraint_second_cardinalities=constraint_second_cardinalities,
+        )
+
+    def to_cfm(self) -> CFM:
+        """Rebuild the pointer-based feature model."""
+
+        features: list[Feature] = []
+
+        for feature_id, name in enumerate(self.names):
+            parent_id = self.parents[feature_id]
+            parent = features[parent_id] if parent_id >= 0 else None
+
+            feature = Feature(
+                name=name,
+                instance_cardinality=self.cardinalities[
+                    self.instance_cardinalities[feature_id]
+                ],
+                group_type_cardinality=self.cardinalities[
+                    self.group_type_cardinalities[feature_id]
+                ],
+                group_instance_cardinality=self.cardinalities[
+                    self.group_instance_cardinalities[feature_id]
+                ],
+                parent=parent,
+                children=[],
+            )
+
+            if parent is not None:
+                parent.children.append(feature)
+
+            features.append(feature)
+
+        constraints = [
+            Constraint(
+                require=bool(self.constraint_requires[i]),
+                first_feature=features[self.constraint_first_features[i]],
+                first_cardinality=self.cardinalities[
+                    self.constraint_first_cardinalities[i]
+                ],
+                second_feature=features[self.constraint_second_features[i]],
+                second_cardinality=self.cardinalities[
+                    self.constraint_second_cardinalities[i]
+                ],
+            )
+            for i in range(self.constraint_count)
+        ]
+
+        return CFM(root=features[0], constraints=constraints)
+
+
+@dataclass
+class FlatConfiguration:
+    """Dataclass representing a configuration as a structure of contiguous arrays.
+
+    Nodes are identified by their position in depth-first pre-order, with the root
+    node having id 0. The subtree of every node is the range of ids from the node
+    to its subtree end, so the first child of a node directly follows it and every
+    further child follows the subtree of its predecessor.
+    """
+
+    names: list[str]
+    """Name of each feature of the feature model, indexed by feature id."""
+
+    feature_ids: "array[int]" = field(default_factory=lambda: array("q"))
+    """Feature id of each node."""
+
+    instances: "array[int]" = field(default_factory=lambda: array("q"))
+    """Instance number of each node among all instances of its feature."""
+
+    subtree_ends: "array[int]" = field(default_factory=lambda: array("q"))
+    """Id following the last node in the subtree of each node."""
+
+    @property
+    def node_count(self) -> int:
+        """Number of nodes in the configuration."""
+
+        return len(self.feature_ids)
+
+    def open_node(self, feature_id: int, instance: int) -> int:
+        """Append a node after the nodes added so far. Returns the id of the node."""
+
+        node = len(self.feature_ids)
+        self.feature_ids.append(feature_id)
+        self.instances.append(instance)
+        self.subtree_ends.append(node + 1)
+        return node
+
+    def close_node(self, node: int) -> None:
+        """End the subtree of a node after the nodes added so far."""
+
+        self.subtree_ends[node] = len(self.feature_ids)
+
+    def children(self, node: int) -> list[int]:
+        """Ids of the children of a node."""
+
+        children = []
+        child = node + 1
+        end = self.subtree_ends[node]
+
+        while child < end:
+            children.append(child)
+            child = self.subtree_ends[child]
+
+        return children
+
+    def value(self, node: int) -> str:
+        """Value of a node in the `name#index` form used by configuration nodes."""
+
+        return f"{self.names[self.feature_ids[node]]}#{self.instances[node]}"
+
+    def path(self, node: int) -> list[str]:
+        """Values of the nodes from the root to the given node."""
+
+        path = []
+        current = 0
+
+        while current != node:
+            path.append(self.value(current))
+            current += 1
+            while self.subtree_ends[current] <= node:
+                current = self.subtree_ends[current]
+
+        path.append(self.value(node))
+        return path
+
+    def to_configuration_node(self) -> ConfigurationNode:
+        """Build the pointer-based configuration."""
+
+        root = ConfigurationNode(self.value(0), [])
+        # Stack entries are the open nodes and the ends of their subtrees
+        open_nodes = [(root, self.subtree_ends[0])]
+
+        for node in range(1, self.node_count):
+            while open_nodes[-1][1] <= node:
+                open_nodes.pop()
+
+            configuration_node = ConfigurationNode(self.value(node), [])
+            open_nodes[-1][0].children.append(configuration_node)
+            open_nodes.append((configuration_node, self.subtree_ends[node]))
+
+        return root
+
+    def to_dict(self) -> dict:
+        """Build the nested dictionary of the pointer-based configuration for JSON output."""
+
+        root: dict = {"value": self.value(0), "children": []}
+        open_nodes = [(root, self.subtree_ends[0])]
+
+        for node in range(1, self.node_count):
+            while open_nodes[-1][1] <= node:
+                open_nodes.pop()
+
+            node_dict: dict = {"value": self.value(node), "children": []}
+            open_nodes[-1][0]["children"].append(node_dict)
+            open_nodes.append((node_dict, self.subtree_ends[node]))
+
+        return root
+
+    @classmethod
+    def from_configuration_node(
+        cls, configuration: ConfigurationNode, flat_cfm: FlatCFM
+    ) -> "FlatConfiguration":
+        """Flatten a configuration of the given feature model."""
+
+        flat_configuration = cls(flat_cfm.names)
+
+        # Stack entries are a configuration node to open or the id of a node to close
+        pending: list[ConfigurationNode | int] = [configuration]
+
+        while pending:
+            entry = pending.pop()
+
+            if isinstance(entry, int):
+                flat_configuration.close_node(entry)
+                continue
+
+            name, _, instance = entry.value.partition("#")
+            feature_id = flat_cfm.ids.get(name)
+            if feature_id is None:
+                raise ValueError(f"Feature {name} not found")
+
+            node = flat_configuration.open_node(feature_id, int(instance or 0))
+            pending.append(node)
+            pending.extend(reversed(entry.children))
+
+        return flat_configuration
+
+
+def _depth_first_ranks(
+    first_children: "array[int]", child_counts: "array[int]"
+) -> tuple["array[int]", "array[int]"]:
+    feature_count = len(first_children)
+    preorder = array("q", [0]) * feature_count
+    postorder = array("q", [0]) * feature_count
+
+    if feature_count == 0:
+        return preorder, postorder
+
+    # Each stack entry is a feature id and the position of its next unvisited child
+    stack = [[0, 0]]
+    preorder_rank = 1
+    postorder_rank = 0
+
+    while stack:
+        entry = stack[-1]
+        feature_id, visited_children = entry
+
+        if visited_children < child_counts[feature_id]:
+            entry[1] += 1
+            child_id = first_children[feature_id] + visited_children
+            preorder[child_id] = preorder_rank
+            preorder_rank += 1
+            stack.append([child_id, 0])
+        else:
+            postorder[feature_id] = postorder_rank
+            postorder_rank += 1
+            stack.pop()
+
+    return preorder, postorder
@@ -0,0 +1,179 @@
+import random
+
+from cfmtoolbox.models import CFM, Cardinality, Constraint, Feature, Interval
+
+GROUP_KINDS = ("and", "or", "alternative")
+"""Kinds of groups the generator creates, named after their FeatureIDE counterparts."""
+
+MAX_CLONES = 4
+"""Largest bounded upper instance cardinality of a generated clonable feature."""
+
+
+def generate_cfm(
+    feature_count: int,
+    *,
+    max_depth: int = 8,
+    max_children: int = 4,
+    clone_probability: float = 0.0,
+    unbounded_probability: float = 0.0,
+    constraint_density: float = 0.0,
+    seed: int = 0,
+) -> CFM:
+    """Generate a random feature model, the same one for the same arguments.
+
+    The features are named `f0` to `f<feature_count - 1>` in breadth-first order.
+    The tree is built level by level, giving every feature above `max_depth`
+    between one and `max_children` children, and more where the remaining levels
+    could not hold the remaining features otherwise, until the feature count is
+    reached. Each group is an and, or or alternative
+    group, and its group cardinalities are derived from the children's instance
+    cardinalities, as the UVL and FeatureIDE importers do.
+
+    A child is a clonable feature with a bounded upper instance cardinality above
+    one with `clone_probability`, and unbounded with `unbounded_probability`.
+    Otherwise it is a boolean feature. There are `constraint_density` constraints
+    per feature, each starting at an optional child of an and group, so that the
+    model stays satisfiable.
+    """
+
+    if feature_count < 1:
+        raise ValueError("A feature model needs at least one feature")
+
+    if max_children < 1:
+        raise ValueError("Features need to be allowed at least one child")
+
+    rng = random.Random(seed)
+    one = Cardinality([Interval(1, 1)])
+    root = Feature("f0", one, Cardinality([]), Cardinality([]), None, [])
+    features = [root]
+    level = [root]
+    depth = 0
+
+    while len(features) < feature_count:
+        remaining = feature_count - len(features)
+
+        # Every child of this level has room for at most this many features in its
+        # subtree, so the level needs enough children to hold the remaining ones
+        subtree_size = sum(max_children**i for i in range(max_depth - depth))
+        required = -(-remaining // subtree_size) if subtree_size else remaining + 1
+
+        if required > len(level) * max_children:
+            raise ValueError(
+                f"A tree of depth {max_depth} cannot hold {feature_count} features"
+            )
+
+        child_counts = [rng.randint(1, max_children) for _ in level]
+        missing = required - sum(child_counts)
+        if missing > 0:
+            positions = list(range(len(level)))
+            rng.shuffle(positions)
+            for i in positions:
+                added = min(missing, max_children - child_counts[i])
+                child_counts[i] += added
+                missing -= added
+
+        next_level = []
+        for parent, child_count in zip(level, child_counts):
+            for _ in range(min(child_count, feature_count - len(features))):
+                child = Feature(
+                    f"f{len(features)}",
+                    one,
+                    Cardinality([]),
+                    Cardinality([]),
+                    parent,
+                    [],
+                )
+                parent.children.append(child)
+                features.append(child)
+                next_level.append(child)
+
+        level = next_level
+        depth += 1
+
+    optional_and_children: list[Feature] = []
+    for feature in features:
+        if feature.children:
+            # A single child of an or or alternative group would be mandatory in
+            # disguise, which the one-wise sampler cannot cover
+            kind = rng.choice(GROUP_KINDS) if len(feature.children) > 1 else "and"
+            generate_group(feature, kind, rng, clone_probability, unbounded_probability)
+            if kind == "and":
+                optional_and_children.extend(
+                    child for child in feature.children if not child.is_required
+                )
+
+    constraints = []
+    if len(features) > 1:
+        at_least_one = Cardinality([Interval(1, None)])
+        for _ in range(round(constraint_density * feature_count)):
+            if not optional_and_children:
+                break
+
+            first_feature = rng.choice(optional_and_children)
+            second_feature = rng.choice(features[1:])
+            while second_feature is first_feature:
+                second_feature = rng.choice(features[1:])
+
+            constraints.append(
+                Constraint(
+                    require=rng.random() < 0.5,
+                    first_feature=first_feature,
+                    first_cardinality=at_least_one,
+                    second_feature=second_feature,
+                    second_cardinality=at_least_one,
+                )
+            )
+
+    return CFM(root, constraints)
+
+
+def generate_group(
+    feature: Feature,
+    kind: str,
+    rng: random.Random,
+    clone_probability: float,
+    unbounded_probability: float,
+) -> None:
+    """Set the instance cardinalities of a feature's children and the matching group cardinalities."""
+
+    child_count = len(feature.children)
+    lowers = []
+    uppers: list[int | None] = []
+
+    for child in feature.children:
+        # Only and groups have mandatory children
+        lower = 1 if kind == "and" and rng.random() < 0.5 else 0
+
+        draw = rng.random()
+        if draw < unbounded_probability:
+            upper: int | None = None
+        elif draw < unbounded_probability + clone_probability:
+            upper = rng.randint(2, MAX_CLONES)
+        else:
+            upper = 1
+
+        child.instance_cardinality = Cardinality([Interval(lower, upper)])
+        lowers.append(lower)
+        uppers.append(upper)
+
+    if kind == "and":
+        group_type = Interval(sum(lowers), child_count)
+        group_instance = Interval(sum(lowers), _sum_uppers(uppers))
+    elif kind == "or":
+        group_type = Interval(1, child_count)
+        group_instance = Interval(1, _sum_uppers(uppers))
+    else:
+        group_type = Interval(1, 1)
+        group_instance = Interval(
+            1, None if None in uppers else max(upper or 0 for upper in uppers)
+        )
+
+    feature.group_type_cardinality = Cardinality([group_type])
+    feature.group_instance_cardinality = Cardinality([group_instance])
+
+
+def _sum_uppers(uppers: list[int | None]) -> int | None:
+    if None in uppers:
+        return None
+
+    return sum(upper or 0 for upper in uppers)
@@ -1,10 +1,16 @@
-from collections import defaultdict
-from dataclasses import dataclass
+from bisect import bisect_right
+from collections.abc import Iterable
+from dataclasses import dataclass, field
 
 
-@dataclass
 class Interval:
-    """Dataclass representing a cardinality interval."""
+    """Immutable class representing a cardinality interval.
+
+    Intervals are interned, so constructing an interval with the same bounds as an
+    existing one returns the existing instance.
+    """
+
+    __slots__ = ("lower", "upper")
 
     lower: int
     """Lower bound of the interval."""
@@ -12,36 +18,369 @@ class Interval:
     upper: int | None
     """Upper bound of the interval. None if unbounded."""
 
+    def __new__(cls, lower: int, upper: int | None) -> "Interval":
+        key = (lower, upper)
+        interval = _interned_intervals.get(key)
+
+        if interval is None:
+            interval = super().__new__(cls)
+            object.__setattr__(interval, "lower", lower)
+            object.__setattr__(interval, "upper", upper)
+            interval = _interned_intervals.setdefault(key, interval)
+
+        return interval
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError(f"cannot assign to field '{name}' of immutable Interval")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"cannot delete field '{name}' of immutable Interval")
+
+    def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
+
+        if not isinstance(other, Interval):
+            return NotImplemented
+
+        return self.lower == other.lower and self.upper == other.upper
+
+    def __hash__(self) -> int:
+        return hash((self.lower, self.upper))
+
+    def __reduce__(self):
+        return (Interval, (self.lower, self.upper))
+
+    def __copy__(self) -> "Interval":
+        return self
+
+    def __deepcopy__(self, memo: dict) -> "Interval":
+        return self
+
+    def __repr__(self) -> str:
+        return f"Interval(lower={self.lower!r}, upper={self.upper!r})"
+
     def __str__(self) -> str:
         lower_formatted = self.lower
         upper_formatted = "*" if self.upper is None else self.upper
         return f"{lower_formatted}..{upper_formatted}"
 
+    @property
+    def is_empty(self) -> bool:
+        """Check if the interval contains no values."""
+
+        return self.upper is not None and self.upper < self.lower
+
 
-@dataclass
 class Cardinality:
-    """Dataclass representing a cardinality."""
+    """Immutable class representing a cardinality.
+
+    Cardinalities are interned, so constructing a cardinality from the same intervals
+    as an existing one returns the existing instance.
+    """
+
+    __slots__ = ("intervals", "_normalized_intervals", "_lowers", "_uppers")
+
+    intervals: tuple[Interval, ...]
+    """Ordered intervals of the cardinality."""
+
+    _normalized_intervals: tuple[Interval, ...]
+    _lowers: tuple[int, ...]
+    _uppers: tuple[int | None, ...]
+
+    def __new__(cls, intervals: Iterable[Interval]) -> "Cardinality":
+        key = tuple(intervals)
+        cardinality = _interned_cardinalities.get(key)
+
+        if cardinality is None:
+            normalized_intervals = _normalize_intervals(key)
+            # Sharing the tuple of normalized cardinalities lets `normalized` skip
+            # the lookup of the interned cardinality
+            if normalized_intervals == key:
+                normalized_intervals = key
+
+            cardinality = super().__new__(cls)
+            object.__setattr__(cardinality, "intervals", key)
+            object.__setattr__(
+                cardinality, "_normalized_intervals", normalized_intervals
+            )
+            object.__setattr__(
+                cardinality,
+                "_lowers",
+                tuple(interval.lower for interval in normalized_intervals),
+            )
+            object.__setattr__(
+                cardinality,
+                "_uppers",
+                tuple(interval.upper for interval in normalized_intervals),
+            )
+            cardinality = _interned_cardinalities.setdefault(key, cardinality)
+
+        return cardinality
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError(
+            f"cannot assign to field '{name}' of immutable Cardinality"
+        )
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"cannot delete field '{name}' of immutable Cardinality")
+
+    def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
+
+        if not isinstance(other, Cardinality):
+            return NotImplemented
+
+        return self.intervals == other.intervals
 
-    intervals: list[Interval]
-    """Ordered list of cardinality intervals."""
+    def __hash__(self) -> int:
+        return hash(self.intervals)
+
+    def __reduce__(self):
+        return (Cardinality, (self.intervals,))
+
+    def __copy__(self) -> "Cardinality":
+        return self
+
+    def __deepcopy__(self, memo: dict) -> "Cardinality":
+        return self
+
+    def __repr__(self) -> str:
+        return f"Cardinality(intervals={list(self.intervals)!r})"
 
     def __str__(self) -> str:
         return ", ".join(map(str, self.intervals))
 
+    @property
+    def is_empty(self) -> bool:
+        """Check if the cardinality allows no values at all."""
+
+        return not self._normalized_intervals
+
+    def normalized(self) -> "Cardinality":
+        """Equivalent cardinality with sorted, disjoint, non-adjacent and non-empty intervals."""
+
+        if self._normalized_intervals is self.intervals:
+            return self
+
+        return Cardinality(self._normalized_intervals)
+
     def is_valid_cardinality(self, value: int) -> bool:
         """Check if a value is a valid cardinality for the given intervals."""
 
-        for interval in self.intervals:
-            if (interval.lower <= value) and (
-                interval.upper is None or interval.upper >= value
+        # Binary search over the normalized intervals, whose lower bounds are sorted
+        position = bisect_right(self._lowers, value) - 1
+
+        if position < 0:
+            return False
+
+        upper = self._uppers[position]
+        return upper is None or value <= upper
+
+    def union(self, other: "Cardinality") -> "Cardinality":
+        """Cardinality allowing every value allowed by either cardinality."""
+
+        return Cardinality(
+            _normalize_intervals(
+                self._normalized_intervals + other._normalized_intervals
+            )
+        )
+
+    def intersection(self, other: "Cardinality") -> "Cardinality":
+        """Cardinality allowing every value allowed by both cardinalities."""
+
+        first_intervals = self._normalized_intervals
+        second_intervals = other._normalized_intervals
+
+        if first_intervals is second_intervals or not first_intervals:
+            return self.normalized()
+
+        if not second_intervals:
+            return other.normalized()
+
+        if len(first_intervals) == 1 and len(second_intervals) == 1:
+            lower = max(first_intervals[0].lower, second_intervals[0].lower)
+            upper = _min_upper(first_intervals[0].upper, second_intervals[0].upper)
+            return Cardinality(
+                (Interval(lower, upper),) if upper is None or lower <= upper else ()
+            )
+
+        intervals = []
+        i = j = 0
+
+        while i < len(first_intervals) and j < len(second_intervals):
+            first = first_intervals[i]
+            second = second_intervals[j]
+
+            lower = max(first.lower, second.lower)
+            upper = _min_upper(first.upper, second.upper)
+
+            if upper is None or lower <= upper:
+                intervals.append(Interval(lower, upper))
+
+            # Advance past the interval that ends first
+            if first.upper is not None and (
+                second.upper is None or first.upper < second.upper
             ):
-                return True
-        return False
+                i += 1
+            else:
+                j += 1
 
+        return Cardinality(intervals)
 
-@dataclass
+    def __add__(self, other: "Cardinality") -> "Cardinality":
+        """Minkowski sum: all values `a + b` with `a` in this and `b` in the other cardinality."""
+
+        if not isinstance(other, Cardinality):
+            return NotImplemented
+
+        # The sum of two intervals is a single interval, which needs no normalizing
+        if (
+            len(self._normalized_intervals) == 1
+            and len(other._normalized_intervals) == 1
+        ):
+            first = self._normalized_intervals[0]
+            second = other._normalized_intervals[0]
+            return Cardinality(
+                (
+                    Interval(
+                        first.lower + second.lower,
+                        None
+                        if first.upper is None or second.upper is None
+                        else first.upper + second.upper,
+                    ),
+                )
+            )
+
+        return Cardinality(
+            _normalize_intervals(
+                tuple(
+                    Interval(
+                        first.lower + second.lower,
+                        None
+                        if first.upper is None or second.upper is None
+                        else first.upper + second.upper,
+                    )
+                    for first in self._normalized_intervals
+                    for second in other._normalized_intervals
+                )
+            )
+        )
+
+    def __sub__(self, other: "Cardinality") -> "Cardinality":
+        """Minkowski difference: all values `a - b` with `a` in this and `b` in the other cardinality.
+
+        The other cardinality must be bounded, as the differences would have no lower
+        bound otherwise.
+        """
+
+        if not isinstance(other, Cardinality):
+            return NotImplemented
+
+        if other._uppers and other._uppers[-1] is None:
+            raise ValueError("Cannot subtract unbounded cardinalities")
+
+        if (
+            len(self._normalized_intervals) == 1
+            and len(other._normalized_intervals) == 1
+        ):
+            first = self._normalized_intervals[0]
+            second_lower, second_upper = other._lowers[0], other._uppers[0]
+            assert second_upper is not None
+            return Cardinality(
+                (
+                    Interval(
+                        first.lower - second_upper,
+                        None if first.upper is None else first.upper - second_lower,
+                    ),
+                )
+            )
+
+        return Cardinality(
+            _normalize_intervals(
+                tuple(
+                    Interval(
+                        first.lower - second.upper,
+                        None if first.upper is None else first.upper - second.lower,
+                    )
+                    for first in self._normalized_intervals
+                    for second in other._normalized_intervals
+                    if second.upper is not None
+                )
+            )
+        )
+
+    def difference(self, other: "Cardinality") -> "Cardinality":
+        """Cardinality allowing every value allowed by this but not by the other cardinality."""
+
+        intervals = []
+        lower: int | None = self._lowers[0] if self._lowers else None
+
+        # The gaps between the other cardinality's intervals, starting at this one's
+        # lowest value, are intersected with this cardinality
+        for interval in other._normalized_intervals:
+            if lower is None:
+                break
+            if interval.lower > lower:
+                intervals.append(Interval(lower, interval.lower - 1))
+            lower = None if interval.upper is None else max(lower, interval.upper + 1)
+
+        if lower is not None:
+            intervals.append(Interval(lower, None))
+
+        return self.intersection(Cardinality(intervals))
+
+
+_interned_intervals: dict[tuple[int, int | None], Interval] = {}
+_interned_cardinalities: dict[tuple[Interval, ...], Cardinality] = {}
+
+
+def _normalize_intervals(intervals: tuple[Interval, ...]) -> tuple[Interval, ...]:
+    # Sort by lower bound and merge overlapping or adjacent intervals, dropping empty ones
+    normalized: list[Interval] = []
+
+    for interval in sorted(
+        (interval for interval in intervals if not interval.is_empty),
+        key=lambda interval: interval.lower,
+    ):
+        if normalized:
+            previous = normalized[-1]
+            if previous.upper is None:
+                break
+            if interval.lower <= previous.upper + 1:
+                upper = (
+                    None
+                    if interval.upper is None
+                    else max(previous.upper, interval.upper)
+                )
+                normalized[-1] = Interval(previous.lower, upper)
+                continue
+
+        normalized.append(interval)
+
+    return tuple(normalized)
+
+
+def _min_upper(first: int | None, second: int | None) -> int | None:
+    if first is None:
+        return second
+
+    if second is None:
+        return first
+
+    return min(first, second)
+
+
+@dataclass(eq=False)
 class Feature:
-    """Dataclass representing a feature in a feature model."""
+    """Dataclass representing a feature in a feature model.
+
+    Features compare and hash by identity, so they can be used as set members and
+    dictionary keys. Use [structurally_equal][cfmtoolbox.models.structurally_equal]
+    to compare feature models by their contents.
+    """
 
     name: str
     """Globally unique name of the feature."""
@@ -102,6 +441,48 @@ class Constraint:
         return f"{self.first_feature.name} => {self.second_feature.name}"
 
 
+@dataclass
+class FeatureIndex:
+    """Dataclass representing a precomputed lookup index over the features of a feature model."""
+
+    features: list[Feature]
+    """List of all features in breadth-first order."""
+
+    features_by_name: dict[str, Feature]
+    """Mapping of feature names to features."""
+
+    ids: dict[str, int]
+    """Mapping of feature names to their position in the list of features."""
+
+    parents: list[int]
+    """Position of each feature's parent in the list of features. -1 for the root feature."""
+
+    depths: list[int]
+    """Depth of each feature in the tree. 0 for the root feature."""
+
+    @classmethod
+    def from_root(cls, root: Feature) -> "FeatureIndex":
+        """Build the index with a single breadth-first walk starting at the root feature."""
+
+        features = [root]
+        parents = [-1]
+        depths = [0]
+
+        for position, feature in enumerate(features):
+            for child in feature.children:
+                features.append(child)
+                parents.append(position)
+                depths.append(depths[position] + 1)
+
+        ids: dict[str, int] = {}
+        for position, feature in enumerate(features):
+            ids.setdefault(feature.name, position)
+
+        features_by_name = {name: features[position] for name, position in ids.items()}
+
+        return cls(features, features_by_name, ids, parents, depths)
+
+
 @dataclass
 class CFM:
     """Dataclass representing a feature model."""
@@ -112,16 +493,30 @@ class CFM:
     constraints: list[Constraint]
     """List of constraints in the feature model."""
 
+    _feature_index: FeatureIndex | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def __setattr__(self, name: str, value) -> None:
+        if name == "root":
+            super().__setattr__("_feature_index", None)
+
+        super().__setattr__(name, value)
+
     @property
-    def features(self) -> list[Feature]:
-        """Dynamically computed list of all features in the feature model."""
+    def feature_index(self) -> FeatureIndex:
+        """Cached index of all features, built on first access."""
 
-        features = [self.root]
+        if self._feature_index is None:
+            self._feature_index = FeatureIndex.from_root(self.root)
 
-        for feature in features:
-            features.extend(feature.children)
+        return self._feature_index
 
-        return features
+    @property
+    def features(self) -> list[Feature]:
+        """Cached list of all features in the feature model in breadth-first order."""
+
+        return self.feature_index.features
 
     @property
     def is_unbound(self) -> bool:
@@ -129,103 +524,127 @@ class CFM:
 
         return self.root.is_unbound
 
+    def find_feature(self, name: str) -> Feature | None:
+        """Look up a feature by its name. None if there is no such feature."""
 
-@dataclass
-class ConfigurationNode:
-    """Dataclass representing configuration of a CFM feature."""
+        return self.feature_index.features_by_name.get(name)
 
-    value: str
-    """Value of the feature node."""
+    def add_feature(self, feature: Feature, parent: Feature) -> None:
+        """Attach a feature as the last child of the given parent feature."""
 
-    children: list["ConfigurationNode"]
-    """List of child feature nodes."""
+        feature.parent = parent
+        parent.children.append(feature)
+        self.invalidate_feature_index()
 
-    def validate(self, cfm: CFM) -> bool:
-        """Validate the feature node against the feature model."""
+    def remove_feature(self, feature: Feature) -> None:
+        """Detach a non-root feature and its subtree from the feature model."""
 
-        # Check if root feature is valid
-        if cfm.root.name != self.value.split("#")[0]:
-            return False
+        if feature.parent is None:
+            raise ValueError("The root feature cannot be removed")
 
-        if not self.validate_children(cfm.root):
-            return False
+        feature.parent.children.remove(feature)
+        feature.parent = None
+        self.invalidate_feature_index()
 
-        return self.validate_constraints(cfm)
+    def invalidate_feature_index(self) -> None:
+        """Discard the cached feature index after the tree was modified directly."""
 
-    def validate_constraints(self, cfm: CFM) -> bool:
-        global_feature_count: defaultdict[str, int] = defaultdict(int)
-        self.initialize_global_feature_count(global_feature_count)
+        self._feature_index = None
 
-        for constraint in cfm.constraints:
-            if not constraint.first_cardinality.is_valid_cardinality(
-                global_feature_count[constraint.first_feature.name]
-            ):
-                continue
 
-            if (
-                constraint.require
-                and not constraint.second_cardinality.is_valid_cardinality(
-                    global_feature_count[constraint.second_feature.name]
-                )
-            ):
-                return False
+def structurally_equal(first: CFM, second: CFM) -> bool:
+    """Check if two feature models have the same features, cardinalities and constraints."""
 
-            if (
-                not constraint.require
-                and constraint.second_cardinality.is_valid_cardinality(
-                    global_feature_count[constraint.second_feature.name]
-                )
-            ):
-                return False
+    matches: dict[int, Feature] = {}
 
-        return True
+    if not _features_structurally_equal(first.root, second.root, matches):
+        return False
+
+    if len(first.constraints) != len(second.constraints):
+        return False
 
-    def initialize_global_feature_count(
-        self, global_feature_count: defaultdict[str, int]
+    for first_constraint, second_constraint in zip(
+        first.constraints, second.constraints
     ):
-        global_feature_count[self.value.split("#")[0]] += 1
+        if (
+            first_constraint.require != second_constraint.require
+            or first_constraint.first_cardinality != second_constraint.first_cardinality
+            or first_constraint.second_cardinality
+            != second_constraint.second_cardinality
+            or not _features_structurally_equal(
+                first_constraint.first_feature,
+                second_constraint.first_feature,
+                matches,
+            )
+            or not _features_structurally_equal(
+                first_constraint.second_feature,
+                second_constraint.second_feature,
+                matches,
+            )
+        ):
+            return False
+
+    return True
+
 
-        for child in self.children:
-            child.initialize_global_feature_count(global_feature_count)
+def _features_structurally_equal(
+    first: Feature, second: Feature, matches: dict[int, Feature]
+) -> bool:
+    # Pairs of features that were already found to be equal are remembered in
+    # `matches`, so shared subtrees and constraint features are compared only once.
+    pending = [(first, second)]
 
-    def validate_children(self, feature: Feature) -> bool:
-        if not feature.children:
-            return not self.children
+    while pending:
+        first_feature, second_feature = pending.pop()
 
-        # Check group instance cardinality of feature
-        if not feature.group_instance_cardinality.is_valid_cardinality(
-            len(self.children)
+        matched_feature = matches.get(id(first_feature))
+        if matched_feature is not None:
+            if matched_feature is not second_feature:
+                return False
+            continue
+
+        if (
+            first_feature.name != second_feature.name
+            or first_feature.instance_cardinality != second_feature.instance_cardinality
+            or first_feature.group_type_cardinality
+            != second_feature.group_type_cardinality
+            or first_feature.group_instance_cardinality
+            != second_feature.group_instance_cardinality
+            or len(first_feature.children) != len(second_feature.children)
         ):
             return False
 
-        # Check group type cardinality of feature
-        partitioned_children = self.partition_children(feature)
-        if not feature.group_type_cardinality.is_valid_cardinality(
-            len([1 for i in partitioned_children if i])
+        matches[id(first_feature)] = second_feature
+
+        if (first_feature.parent is None) != (second_feature.parent is None) or (
+            first_feature.parent is not None
+            and second_feature.parent is not None
+            and first_feature.parent.name != second_feature.parent.name
         ):
             return False
 
-        # Check instance cardinality of children
-        for model_child, children in zip(feature.children, partitioned_children):
-            if not model_child.instance_cardinality.is_valid_cardinality(len(children)):
-                return False
+        pending.extend(zip(first_feature.children, second_feature.children))
 
-            # Check children recursively
-            if any(not child.validate_children(model_child) for child in children):
-                return False
+    return True
+
+
+@dataclass
+class ConfigurationNode:
+    """Dataclass representing configuration of a CFM feature."""
+
+    value: str
+    """Value of the feature node."""
+
+    children: list["ConfigurationNode"]
+    """List of child feature nodes."""
+
+    def validate(self, cfm: CFM) -> bool:
+        """Validate the feature node against the feature model.
+
+        Use a [ConfigurationValidator][cfmtoolbox.validation.ConfigurationValidator]
+        to validate many configurations or to find out why one is invalid.
+        """
+
+        from cfmtoolbox.validation import ConfigurationValidator
 
-        return True
-
-    def partition_children(self, feature: Feature) -> list[list["ConfigurationNode"]]:
-        sublists = []
-        i = 0
-        for model_child in feature.children:
-            sublist = []
-            while i < len(self.children):
-                if self.children[i].value.split("#")[0] == model_child.name:
-                    sublist.append(self.children[i])
-                    i += 1
-                else:
-                    break
-            sublists.append(sublist)
-        return sublists
+        return ConfigurationValidator(cfm).validate(self) is None
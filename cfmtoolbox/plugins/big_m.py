@@ -1,10 +1,11 @@
 from cfmtoolbox import app
-from cfmtoolbox.models import CFM, Feature
+from cfmtoolbox.flat import FlatCFM
+from cfmtoolbox.models import CFM, Cardinality, Feature, Interval
 
 
 @app.command()
 def apply_big_m(model: CFM) -> CFM:
-    global_upper_bound = get_global_upper_bound(model.root)
+    global_upper_bound = get_flat_global_upper_bound(FlatCFM.from_cfm(model))
 
     replace_infinite_upper_bound_with_global_upper_bound(model.root, global_upper_bound)
 
@@ -14,39 +15,67 @@ def apply_big_m(model: CFM) -> CFM:
 
 
 def get_global_upper_bound(feature: Feature) -> int:
-    global_upper_bound = feature.instance_cardinality.intervals[-1].upper
+    return get_flat_global_upper_bound(FlatCFM.from_cfm(CFM(feature, [])))
 
-    # Terminate calculation if the upper bound is infinite
-    if global_upper_bound is None:
-        return 0
 
-    local_upper_bound = global_upper_bound
+def get_flat_global_upper_bound(flat_cfm: FlatCFM) -> int:
+    # The global upper bound is the maximum product of the upper bounds along the
+    # paths from the root, excluding paths through features with an infinite upper
+    # bound. Children are visited before their parents by walking the breadth-first
+    # ids backwards.
+    global_upper_bounds = [0] * flat_cfm.feature_count
 
-    # Recursively calculate the global upper bound by multiplying the upper bounds of all paths
-    # from the root feature excluding paths that contain a feature with an infinite upper bound
-    for child in feature.children:
-        global_upper_bound = max(
-            global_upper_bound,
-            local_upper_bound * get_global_upper_bound(child),
+    for feature_id in reversed(range(flat_cfm.feature_count)):
+        cardinality = flat_cfm.cardinalities[
+            flat_cfm.instance_cardinalities[feature_id]
+        ]
+        local_upper_bound = cardinality.intervals[-1].upper
+
+        if local_upper_bound is None:
+            continue
+
+        global_upper_bounds[feature_id] = max(
+            [
+                local_upper_bound,
+                *(
+                    local_upper_bound * global_upper_bounds[child_id]
+                    for child_id in flat_cfm.children(feature_id)
+                ),
+            ]
         )
 
-    return global_upper_bound
+    return global_upper_bounds[0]
 
 
 def replace_infinite_upper_bound_with_global_upper_bound(
     feature: Feature, global_upper_bound: int
 ):
-    for child in feature.children:
-        if child.instance_cardinality.intervals[-1].upper is None:
-            child.instance_cardinality.intervals[-1].upper = global_upper_bound
-        replace_infinite_upper_bound_with_global_upper_bound(child, global_upper_bound)
-
-    if (
-        feature.children
-        and feature.group_instance_cardinality.intervals[-1].upper is None
-    ):
-        new_upper_bound = 0
+    pending = [feature]
+
+    while pending:
+        feature = pending.pop()
+
         for child in feature.children:
-            if child.instance_cardinality.intervals[-1].upper is not None:
-                new_upper_bound += child.instance_cardinality.intervals[-1].upper
-        feature.group_instance_cardinality.intervals[-1].upper = new_upper_bound
+            if child.instance_cardinality.intervals[-1].upper is None:
+                child.instance_cardinality = replace_last_upper_bound(
+                    child.instance_cardinality, global_upper_bound
+                )
+
+        if (
+            feature.children
+            and feature.group_instance_cardinality.intervals[-1].upper is None
+        ):
+            new_upper_bound = 0
+            for child in feature.children:
+                if child.instance_cardinality.intervals[-1].upper is not None:
+                    new_upper_bound += child.instance_cardinality.intervals[-1].upper
+            feature.group_instance_cardinality = replace_last_upper_bound(
+                feature.group_instance_cardinality, new_upper_bound
+            )
+
+        pending.extend(feature.children)
+
+
+def replace_last_upper_bound(cardinality: Cardinality, upper_bound: int) -> Cardinality:
+    *intervals, last_interval = cardinality.intervals
+    return Cardinality([*intervals, Interval(last_interval.lower, upper_bound)])
@@ -0,0 +1,82 @@
+import sys
+from array import array
+from io import BytesIO
+from typing import BinaryIO
+
+from cfmtoolbox import CFM, app
+from cfmtoolbox.flat import FlatCFM
+from cfmtoolbox.plugins.cfmb_import import HEADER, MAGIC, UNBOUNDED, VERSION
+
+
+def export_cfmb(cfm: CFM) -> bytes:
+    buffer = BytesIO()
+    write_cfmb(cfm, buffer)
+    return buffer.getvalue()
+
+
+@app.stream_exporter(".cfmb")
+def write_cfmb(cfm: CFM, file: BinaryIO) -> None:
+    # Features are numbered in breadth-first order, so parents precede children
+    flat_cfm = FlatCFM.from_cfm(cfm)
+
+    encoded_names = [name.encode() for name in flat_cfm.names]
+    name_offsets = array("q", [0])
+    for encoded_name in encoded_names:
+        name_offsets.append(name_offsets[-1] + len(encoded_name))
+
+    # The cardinalities are stored as they are, not in the normalized form of the
+    # flat model's interval tables
+    interval_offsets = array("q", [0])
+    interval_lowers = array("q")
+    interval_uppers = array("q")
+    for cardinality in flat_cfm.cardinalities:
+        for interval in cardinality.intervals:
+            interval_lowers.append(interval.lower)
+            interval_uppers.append(
+                UNBOUNDED if interval.upper is None else interval.upper
+            )
+        interval_offsets.append(len(interval_lowers))
+
+    constraint_records = array("q")
+    for i in range(flat_cfm.constraint_count):
+        constraint_records.extend(
+            (
+                flat_cfm.constraint_requires[i],
+                flat_cfm.constraint_first_features[i],
+                flat_cfm.constraint_first_cardinalities[i],
+                flat_cfm.constraint_second_features[i],
+                flat_cfm.constraint_second_cardinalities[i],
+            )
+        )
+
+    file.write(
+        HEADER.pack(
+            MAGIC,
+            VERSION,
+            0,
+            flat_cfm.feature_count,
+            len(flat_cfm.cardinalities),
+            len(interval_lowers),
+            flat_cfm.constraint_count,
+            name_offsets[-1],
+        )
+    )
+
+    for section in (
+        name_offsets,
+        flat_cfm.parents,
+        flat_cfm.instance_cardinalities,
+        flat_cfm.group_type_cardinalities,
+        flat_cfm.group_instance_cardinalities,
+        interval_offsets,
+        interval_lowers,
+        interval_uppers,
+        constraint_records,
+    ):
+        if sys.byteorder == "big":
+            section = array("q", section)
+            section.byteswap()
+        file.write(memoryview(section))
+
+    for encoded_name in encoded_names:
+        file.write(encoded_name)
@@ -0,0 +1,206 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+from io import UnsupportedOperation
+from typing import BinaryIO, TypeVar
+
+from cfmtoolbox import CFM, Cardinality, Constraint, Feature, Interval, app
+
+MAGIC = b"CFMB"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHHqqqqq")
+"""Magic, version, reserved and the feature, cardinality, interval, constraint and name byte counts."""
+
+CONSTRAINT_FIELDS = 5
+"""Require flag, first feature, first cardinality, second feature and second cardinality."""
+
+UNBOUNDED = -1
+"""Value stored for unbounded upper interval bounds."""
+
+T = TypeVar("T")
+
+
+def import_cfmb(raw_data: bytes) -> CFM:
+    return parse_cfmb(raw_data)
+
+
+@app.stream_importer(".cfmb")
+def read_cfmb(file: BinaryIO) -> CFM:
+    # Files are memory-mapped, so only the pages that are read are loaded
+    try:
+        fileno = file.fileno()
+    except (AttributeError, OSError, UnsupportedOperation):
+        return parse_cfmb(file.read())
+
+    if os.fstat(fileno).st_size == 0:
+        return parse_cfmb(b"")
+
+    with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as buffer:
+        return parse_cfmb(buffer)
+
+
+def parse_cfmb(data: bytes | mmap.mmap) -> CFM:
+    with memoryview(data) as view:
+        if len(view) < HEADER.size:
+            raise ValueError("CFMB file is truncated")
+
+        (
+            magic,
+            version,
+            _,
+            feature_count,
+            cardinality_count,
+            interval_count,
+            constraint_count,
+            name_byte_count,
+        ) = HEADER.unpack_from(view)
+
+        if magic != MAGIC:
+            raise ValueError("Not a CFMB file")
+
+        if version != VERSION:
+            raise ValueError(f"Unsupported CFMB version: {version}")
+
+        if feature_count < 1:
+            raise ValueError("CFMB file has no root feature")
+
+        section_lengths = [
+            feature_count + 1,  # Name offsets
+            feature_count,  # Parents
+            feature_count,  # Instance cardinalities
+            feature_count,  # Group type cardinalities
+            feature_count,  # Group instance cardinalities
+            cardinality_count + 1,  # Interval offsets
+            interval_count,  # Interval lower bounds
+            interval_count,  # Interval upper bounds
+            constraint_count * CONSTRAINT_FIELDS,  # Constraint records
+        ]
+        names_offset = HEADER.size + 8 * sum(section_lengths)
+
+        if len(view) < names_offset + name_byte_count:
+            raise ValueError("CFMB file is truncated")
+
+        sections = []
+        offset = HEADER.size
+        for length in section_lengths:
+            sections.append(read_section(view, offset, length))
+            offset += 8 * length
+
+        try:
+            return build_cfm(
+                sections, bytes(view[names_offset : names_offset + name_byte_count])
+            )
+        finally:
+            for section in sections:
+                if isinstance(section, memoryview):
+                    section.release()
+
+
+def read_section(view: memoryview, offset: int, length: int) -> Sequence[int]:
+    """View a section of little-endian 64 bit integers without copying it."""
+
+    section = view[offset : offset + 8 * length]
+
+    if sys.byteorder == "little":
+        return section.cast("q")
+
+    swapped = array("q", section)
+    swapped.byteswap()
+    return swapped
+
+
+def build_cfm(sections: Sequence[Sequence[int]], names: bytes) -> CFM:
+    (
+        name_offsets,
+        parents,
+        instance_cardinalities,
+        group_type_cardinalities,
+        group_instance_cardinalities,
+        interval_offsets,
+        interval_lowers,
+        interval_uppers,
+        constraint_records,
+    ) = sections
+
+    check_offsets(name_offsets, len(names), "name")
+    check_offsets(interval_offsets, len(interval_lowers), "interval")
+
+    cardinalities = [
+        Cardinality(
+            Interval(
+                interval_lowers[i],
+                None if interval_uppers[i] == UNBOUNDED else interval_uppers[i],
+            )
+            for i in range(interval_offsets[c], interval_offsets[c + 1])
+        )
+        for c in range(len(interval_offsets) - 1)
+    ]
+
+    # Parents are stored before their children, so every parent already exists
+    features: list[Feature] = []
+
+    for feature_id in range(len(parents)):
+        parent_id = parents[feature_id]
+        if parent_id >= feature_id or (parent_id < 0) != (feature_id == 0):
+            raise ValueError(f"Feature {feature_id} has an invalid parent: {parent_id}")
+
+        parent = features[parent_id] if parent_id >= 0 else None
+        feature = Feature(
+            name=names[
+                name_offsets[feature_id] : name_offsets[feature_id + 1]
+            ].decode(),
+            instance_cardinality=lookup(
+                cardinalities, instance_cardinalities[feature_id], "cardinality"
+            ),
+            group_type_cardinality=lookup(
+                cardinalities, group_type_cardinalities[feature_id], "cardinality"
+            ),
+            group_instance_cardinality=lookup(
+                cardinalities, group_instance_cardinalities[feature_id], "cardinality"
+            ),
+            parent=parent,
+            children=[],
+        )
+
+        if parent is not None:
+            parent.children.append(feature)
+
+        features.append(feature)
+
+    constraints = [
+        Constraint(
+            require=bool(constraint_records[i]),
+            first_feature=lookup(features, constraint_records[i + 1], "feature"),
+            first_cardinality=lookup(
+                cardinalities, constraint_records[i + 2], "cardinality"
+            ),
+            second_feature=lookup(features, constraint_records[i + 3], "feature"),
+            second_cardinality=lookup(
+                cardinalities, constraint_records[i + 4], "cardinality"
+            ),
+        )
+        for i in range(0, len(constraint_records), CONSTRAINT_FIELDS)
+    ]
+
+    return CFM(root=features[0], constraints=constraints)
+
+
+def check_offsets(offsets: Sequence[int], end: int, table_name: str) -> None:
+    """Check that the offsets into a table are ascending and within the table."""
+
+    previous = 0
+    for offset in offsets:
+        if not previous <= offset <= end:
+            raise ValueError(f"CFMB file has an invalid {table_name} offset: {offset}")
+        previous = offset
+
+
+def lookup(table: Sequence[T], index: int, table_name: str) -> T:
+    # Negative indices would silently wrap around
+    if not 0 <= index < len(table):
+        raise ValueError(f"CFMB file has an invalid {table_name} index: {index}")
+    return table[index]
@@ -0,0 +1,122 @@
+import json
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Annotated
+
+import typer
+
+from cfmtoolbox import app
+from cfmtoolbox.models import CFM, ConfigurationNode
+from cfmtoolbox.plugins.json_import import JSON
+from cfmtoolbox.validation import Violation, validate_many
+
+
+@app.command()
+def validate_configurations(
+    model: CFM,
+    configurations: Path | None = None,
+    workers: Annotated[int, typer.Option(min=1)] = 1,
+    chunk_size: Annotated[int, typer.Option(min=1)] = 64,
+) -> CFM:
+    if configurations is None:
+        app.err_console.print(
+            "Please provide configurations via the --configurations option."
+        )
+        raise typer.Exit(code=1)
+
+    start = time.perf_counter()
+    count = 0
+    valid_count = 0
+
+    verdicts = validate_many(
+        model, read_configurations(configurations), workers, chunk_size
+    )
+
+    for index, violation in enumerate(verdicts):
+        count += 1
+        if violation is None:
+            valid_count += 1
+        print(json.dumps(format_verdict(index, violation)))
+
+    duration = time.perf_counter() - start
+    throughput = count / duration if duration > 0 else 0.0
+    app.err_console.print(
+        f"Validated {count} configurations ({valid_count} valid) in {duration:.2f}s "
+        f"({throughput:.0f} configurations/s)"
+    )
+
+    return model
+
+
+def read_configurations(path: Path) -> Iterator[ConfigurationNode]:
+    """Read configurations from a JSON list or from a JSON Lines file with one configuration per line."""
+
+    if path.suffix == ".jsonl":
+        with path.open() as file:
+            for line in file:
+                if line.strip():
+                    yield parse_configuration(json.loads(line))
+        return
+
+    serialized_configurations = json.loads(path.read_bytes())
+
+    if not isinstance(serialized_configurations, list):
+        raise typer.Abort("Configurations must be a list")
+
+    for serialized_configuration in serialized_configurations:
+        yield parse_configuration(serialized_configuration)
+
+
+def parse_configuration(serialized_configuration: JSON) -> ConfigurationNode:
+    # Nodes are parsed with an explicit stack, so deep configurations do not hit
+    # the recursion limit
+    root = ConfigurationNode("", [])
+    pending = [(serialized_configuration, root)]
+
+    while pending:
+        serialized_node, node = pending.pop()
+
+        if not isinstance(serialized_node, dict):
+            raise TypeError(f"Configuration node must be an object: {serialized_node}")
+
+        missing_keys = [
+            key for key in ("value", "children") if key not in serialized_node
+        ]
+        if missing_keys:
+            raise TypeError(
+                f"Configuration node is missing {', '.join(missing_keys)}: {serialized_node}"
+            )
+
+        if not isinstance(serialized_node["value"], str):
+            raise TypeError(
+                f"Configuration node value must be a string: {serialized_node['value']}"
+            )
+
+        if not isinstance(serialized_node["children"], list):
+            raise TypeError(
+                f"Configuration node children must be a list: {serialized_node['children']}"
+            )
+
+        node.value = serialized_node["value"]
+        node.children = [ConfigurationNode("", []) for _ in serialized_node["children"]]
+        pending.extend(zip(serialized_node["children"], node.children))
+
+    return root
+
+
+def format_verdict(index: int, violation: Violation | None) -> JSON:
+    if violation is None:
+        return {"configuration": index, "valid": True}
+
+    return {
+        "configuration": index,
+        "valid": False,
+        "violation": {
+            "kind": violation.kind.value,
+            "message": violation.message,
+            "path": list(violation.path),
+            "feature": violation.feature,
+            "count": violation.count,
+        },
+    }
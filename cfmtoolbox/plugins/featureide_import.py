@@ -1,5 +1,6 @@
 import sys
 from enum import Enum
+from typing import BinaryIO
 from xml.etree import ElementTree
 from xml.etree.ElementTree import Element
 
@@ -85,26 +86,14 @@ def parse_feature(feature_element: Element, parent: Feature | None) -> Feature:
     return feature
 
 
-def parse_root(root_element: Element) -> tuple[Feature, list[Feature]]:
-    root = parse_feature(root_element, parent=None)
-
-    features = [root]
-
-    for feature in features:
-        features.extend(feature.children)
-
-    return root, features
-
-
 def parse_formula_value_and_feature(
-    formula: Element, features: list[Feature]
+    formula: Element, features: dict[str, Feature]
 ) -> tuple[bool, Feature]:
     if formula.tag == FormulaTypes.VAR.value and len(formula) == 0:
         if formula.text is None:
             raise TypeError("No valid feature name found in formula")
 
-        feature = next(f for f in features if f.name == formula.text)
-        return (True, feature)
+        return (True, features[formula.text])
 
     if formula.tag == FormulaTypes.NOT.value and len(formula) == 1:
         value, feature = parse_formula_value_and_feature(formula[0], features)
@@ -114,7 +103,7 @@ def parse_formula_value_and_feature(
 
 
 def parse_constraints(
-    constraints_element: Element | None, features: list[Feature]
+    constraints_element: Element | None, features: dict[str, Feature]
 ) -> tuple[list[Constraint], list[Element]]:
     constraints: list[Constraint] = []
     eliminated_constraints: list[Element] = []
@@ -176,10 +165,10 @@ def parse_cfm(root_element: Element) -> CFM:
         raise TypeError("No valid Feature structure found in XML file")
 
     root_struct = struct[0]
-    root_feature, all_features = parse_root(root_struct)
+    cfm = CFM(parse_feature(root_struct, parent=None), [])
 
     constraints, eliminated_constraints = parse_constraints(
-        root_element.find("constraints"), all_features
+        root_element.find("constraints"), cfm.feature_index.features_by_name
     )
 
     formatted_eliminated_constraints = [
@@ -194,10 +183,18 @@ def parse_cfm(root_element: Element) -> CFM:
             file=sys.stderr,
         )
 
-    return CFM(root_feature, constraints)
+    cfm.constraints = constraints
+
+    return cfm
 
 
-@app.importer(".xml")
 def import_featureide(raw_data: bytes) -> CFM:
     feature_ide = ElementTree.fromstring(raw_data)
     return parse_cfm(feature_ide)
+
+
+@app.stream_importer(".xml")
+def read_featureide(file: BinaryIO) -> CFM:
+    # The parser reads the file in chunks instead of holding all of it in memory
+    feature_ide = ElementTree.parse(file).getroot()
+    return parse_cfm(feature_ide)
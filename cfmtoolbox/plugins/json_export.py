@@ -1,10 +1,18 @@
 import json
+from io import BytesIO, TextIOWrapper
+from typing import BinaryIO
 
 from cfmtoolbox import CFM, Cardinality, Constraint, Feature, Interval, app
 
 
-@app.exporter(".json")
 def export_json(cfm: CFM) -> bytes:
+    buffer = BytesIO()
+    write_json(cfm, buffer)
+    return buffer.getvalue()
+
+
+@app.stream_exporter(".json")
+def write_json(cfm: CFM, file: BinaryIO) -> None:
     serialized_root = serialize_feature(cfm.root)
     serialized_constraints = list(map(serialize_constraint, cfm.constraints))
 
@@ -13,7 +21,10 @@ def export_json(cfm: CFM) -> bytes:
         "constraints": serialized_constraints,
     }
 
-    return json.dumps(serialized_cfm, indent=2).encode()
+    # The JSON text is written in chunks while it is encoded
+    text_file = TextIOWrapper(file, encoding="utf-8", newline="")
+    json.dump(serialized_cfm, text_file, indent=2)
+    text_file.detach()
 
 
 def serialize_feature(feature: Feature) -> dict:
@@ -20,25 +20,17 @@ def parse_cfm(serialized_cfm: JSON) -> CFM:
             f"CFM constraints must be a list: {serialized_cfm['constraints']}"
         )
 
-    root, features = parse_root(serialized_cfm["root"])
+    root = parse_feature(serialized_cfm["root"], parent=None)
+    cfm = CFM(root=root, constraints=[])
 
-    constraints = [
+    features = cfm.feature_index.features_by_name
+
+    cfm.constraints = [
         parse_constraint(serialized_constraint, features)
         for serialized_constraint in serialized_cfm["constraints"]
     ]
 
-    return CFM(root=root, constraints=constraints)
-
-
-def parse_root(serialized_root: JSON) -> tuple[Feature, list[Feature]]:
-    root = parse_feature(serialized_root, parent=None)
-
-    features = [root]
-
-    for feature in features:
-        features.extend(feature.children)
-
-    return root, features
+    return cfm
 
 
 def parse_feature(serialized_feature: JSON, /, parent: Feature | None) -> Feature:
@@ -116,7 +108,7 @@ def parse_interval(serialized_interval: JSON) -> Interval:
 
 
 def parse_constraint(
-    serialized_constraint: JSON, /, features: list[Feature]
+    serialized_constraint: JSON, /, features: dict[str, Feature]
 ) -> Constraint:
     if not isinstance(serialized_constraint, dict):
         raise TypeError(f"Constraint must be an object: {serialized_constraint}")
@@ -159,8 +151,8 @@ def parse_constraint(
     )
 
 
-def require_feature(feature_name: str, features: list[Feature]) -> Feature:
+def require_feature(feature_name: str, features: dict[str, Feature]) -> Feature:
     try:
-        return next(feature for feature in features if feature.name == feature_name)
-    except StopIteration:
+        return features[feature_name]
+    except KeyError:
         raise ValueError(f"Feature {feature_name} not found")
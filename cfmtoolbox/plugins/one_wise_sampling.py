@@ -1,26 +1,44 @@
-import json
-import secrets
-from collections import defaultdict
-from dataclasses import asdict
-from typing import NamedTuple
+import random
+from collections.abc import Iterator
+from pathlib import Path
+from typing import NamedTuple, Optional
 
 import typer
 
 from cfmtoolbox import app
+from cfmtoolbox.flat import FlatConfiguration
 from cfmtoolbox.models import CFM, Cardinality, ConfigurationNode, Feature
+from cfmtoolbox.propagation import ConstraintPropagator, DeadEnd, point
+from cfmtoolbox.randomness import create_random_generator
+from cfmtoolbox.samples import write_samples
+from cfmtoolbox.validation import ConfigurationValidator
 
 
 @app.command()
-def one_wise_sampling(model: CFM) -> CFM:
+def one_wise_sampling(
+    model: CFM,
+    seed: Optional[int] = None,
+    secure: bool = False,
+    jsonl: bool = False,
+    output: Optional[Path] = None,
+) -> CFM:
     if model.is_unbound:
         raise typer.Abort("Model is unbound. Please apply big-m global bound first.")
 
-    print(
-        json.dumps(
-            [asdict(sample) for sample in OneWiseSampler(model).one_wise_sampling()],
-            indent=2,
+    try:
+        random_generator = create_random_generator(seed, secure)
+    except ValueError as error:
+        raise typer.BadParameter(str(error))
+
+    one_wise_sampler = OneWiseSampler(model, random_generator)
+    write_samples(one_wise_sampler.one_wise_flat_samplings(), jsonl, output)
+
+    if one_wise_sampler.retries:
+        app.err_console.print(
+            f"Discarded {one_wise_sampler.retries} samples violating constraints, "
+            f"{one_wise_sampler.pruned} of them before they were complete "
+            f"(acceptance rate {one_wise_sampler.acceptance_rate:.1%})"
         )
-    )
 
     return model
 
@@ -29,11 +47,19 @@ ChildAndCardinalityPair = NamedTuple(
     "ChildAndCardinalityPair", [("child", Feature), ("cardinality", int)]
 )
 
+MAX_GROUP_ATTEMPTS = 100
+"""Number of choices of a group tried under constraint propagation before the sample is abandoned."""
+
 
 # The OneWiseSampler class is responsible for generating one-wise samples under the definitions of Instance-Set, Boundary-Interior Coverage and global constraints
 class OneWiseSampler:
-    def __init__(self, model: CFM):
-        self.global_feature_count: defaultdict[str, int] = defaultdict(int)
+    def __init__(
+        self,
+        model: CFM,
+        random_generator: random.Random | None = None,
+        propagate_constraints: bool = True,
+    ):
+        self.global_feature_count = [0] * len(model.features)
         # An assignment describes a feature and the number of instances it should have
         self.assignments: set[tuple[str, int]] = set()
         # Covered assignments are all assignments of that appear in a sample and gets filled while generating the sample
@@ -41,20 +67,54 @@ class OneWiseSampler:
         # The chosen assignment is the assignment that is currently being used to generate a sample
         self.chosen_assignment: tuple[str, int]
         self.model = model
-        self.random_generator = secrets.SystemRandom()
+        self.validator = ConfigurationValidator(model)
+        self.feature_ids = {feature: i for i, feature in enumerate(model.features)}
+        self.random_generator = random_generator or create_random_generator()
+        self.accepted = 0
+        # Samples discarded for violating constraints, and those of them that were
+        # abandoned by the constraint propagation before they were complete
+        self.retries = 0
+        self.pruned = 0
+        self.propagator = (
+            ConstraintPropagator(self.validator.flat_cfm)
+            if propagate_constraints and model.constraints
+            else None
+        )
+        self.instance_cardinalities = [
+            feature.instance_cardinality.normalized() for feature in model.features
+        ]
+
+    @property
+    def acceptance_rate(self) -> float:
+        """Share of the drawn samples that satisfied the constraints."""
+
+        drawn = self.accepted + self.retries
+        return self.accepted / drawn if drawn else 1.0
 
     def one_wise_sampling(self) -> list[ConfigurationNode]:
+        return [
+            sample.to_configuration_node() for sample in self.one_wise_flat_sampling()
+        ]
+
+    def one_wise_flat_sampling(self) -> list[FlatConfiguration]:
+        return list(self.one_wise_flat_samplings())
+
+    def one_wise_flat_samplings(self) -> Iterator[FlatConfiguration]:
+        """Yield the samples one by one, each as soon as it is drawn."""
+
         self.calculate_border_assignments(self.model.root)
 
-        samples = []
+        # Assignments are chosen in a fixed order instead of the order of the set,
+        # which changes with the hash seed, so seeded samplings are reproducible
+        for assignment in sorted(self.assignments):
+            if assignment not in self.assignments:
+                continue
 
-        while self.assignments:
-            self.chosen_assignment = self.assignments.pop()
-            samples.append(self.generate_valid_sample())
+            self.assignments.remove(assignment)
+            self.chosen_assignment = assignment
+            yield self.generate_valid_sample()
             self.delete_covered_assignments()
 
-        return samples
-
     def delete_covered_assignments(self):
         for assignment in self.covered_assignments:
             self.assignments.discard(assignment)
@@ -67,35 +127,73 @@ class OneWiseSampler:
         for child in feature.children:
             self.calculate_border_assignments(child)
 
-    def generate_valid_sample(self):
+    def generate_valid_sample(self) -> FlatConfiguration:
         while True:
-            self.global_feature_count = defaultdict(int)
+            self.global_feature_count = [0] * len(self.model.features)
             self.covered_assignments = set()
             self.covered_assignments.add((self.model.root.name, 1))
-            random_feature_node = self.generate_random_feature_node_with_assignment(
-                self.model.root
-            )
-            if (
-                random_feature_node.validate(self.model)
-                and self.chosen_assignment in self.covered_assignments
-            ):
-                break
-        return random_feature_node
+            configuration = FlatConfiguration(self.validator.flat_cfm.names)
+
+            if self.propagator is not None:
+                self.propagator.reset()
+
+            try:
+                self.generate_random_feature_node_with_assignment(
+                    self.model.root, configuration
+                )
+            except DeadEnd:
+                self.pruned += 1
+                self.retries += 1
+                continue
+
+            if self.validator.validate_flat(configuration) is not None:
+                self.retries += 1
+            elif self.chosen_assignment in self.covered_assignments:
+                self.accepted += 1
+                return configuration
 
     def generate_random_feature_node_with_assignment(
         self,
         feature: Feature,
-    ):
-        feature_node = ConfigurationNode(
-            value=f"{feature.name}#{self.global_feature_count[feature.name]}",
-            children=[],
+        configuration: FlatConfiguration,
+        last: bool = True,
+    ) -> int:
+        """Generate an instance of a feature with its subtree.
+
+        `last` tells if no further instances of the feature follow this one, so
+        the counts of its children become final once they are chosen.
+        """
+
+        feature_id = self.feature_ids[feature]
+        feature_node = configuration.open_node(
+            feature_id, self.global_feature_count[feature_id]
         )
 
-        self.global_feature_count[feature.name] += 1
+        self.global_feature_count[feature_id] += 1
 
         if not feature.children:
             return feature_node
 
+        # Below the last instance of a feature, the chosen numbers of instances
+        # complete the global counts of the children, so they are drawn from those
+        # allowed by the decided constraints of the children and descendants
+        propagator = self.propagator
+        allowed_instances = None
+        if (
+            last
+            and propagator is not None
+            and propagator.constrained_descendants[feature_id]
+        ):
+            allowed_instances = [
+                propagator.allowed_instances(
+                    self.feature_ids[child],
+                    self.instance_cardinalities[self.feature_ids[child]],
+                    self.global_feature_count,
+                )
+                for child in feature.children
+            ]
+        attempts = 0
+
         # Generate until both the group instance and group type cardinalities are valid
         while True:
             (
@@ -103,23 +201,39 @@ class OneWiseSampler:
                 summed_random_instance_cardinality,
                 summed_random_group_type_cardinality,
             ) = self.generate_random_children_with_random_cardinality_with_assignment(
-                feature
+                feature, allowed_instances
             )
-            if feature.group_instance_cardinality.is_valid_cardinality(
-                summed_random_instance_cardinality
-            ) and feature.group_type_cardinality.is_valid_cardinality(
-                summed_random_group_type_cardinality
+            if (
+                feature.group_instance_cardinality.is_valid_cardinality(
+                    summed_random_instance_cardinality
+                )
+                and feature.group_type_cardinality.is_valid_cardinality(
+                    summed_random_group_type_cardinality
+                )
+                and (
+                    allowed_instances is None
+                    or self.finalize_children(random_children, propagator)
+                )
             ):
                 break
 
+            # A group the constraints keep from becoming valid abandons the sample
+            if allowed_instances is not None:
+                attempts += 1
+                if attempts == MAX_GROUP_ATTEMPTS:
+                    raise DeadEnd()
+
         for child, random_instance_cardinality in random_children:
             # Store already covered assignments while generating for later validation
             self.covered_assignments.add((child.name, random_instance_cardinality))
-            for _ in range(random_instance_cardinality):
-                feature_node.children.append(
-                    self.generate_random_feature_node_with_assignment(child)
+            for instance in range(random_instance_cardinality):
+                self.generate_random_feature_node_with_assignment(
+                    child,
+                    configuration,
+                    last and instance == random_instance_cardinality - 1,
                 )
 
+        configuration.close_node(feature_node)
         return feature_node
 
     def get_random_cardinality(self, cardinality_list: Cardinality):
@@ -130,21 +244,66 @@ class OneWiseSampler:
         )
         return random_cardinality
 
+    def finalize_children(
+        self,
+        random_children: list[ChildAndCardinalityPair],
+        propagator: ConstraintPropagator | None,
+    ) -> bool:
+        """Finalize the counts of the children of a group, if their constraints keep being satisfied.
+
+        The allowed numbers of instances were decided before the group was drawn,
+        so the constraints between the children are checked child by child, and
+        the final counts are undone if one of them is violated.
+        """
+
+        assert propagator is not None
+        checkpoint = propagator.checkpoint()
+
+        for child, random_instance_cardinality in random_children:
+            child_id = self.feature_ids[child]
+            if not propagator.allowed_instances(
+                child_id,
+                point(random_instance_cardinality),
+                self.global_feature_count,
+            ).is_valid_cardinality(random_instance_cardinality):
+                propagator.restore(checkpoint)
+                return False
+
+            propagator.finalize(
+                child_id,
+                self.global_feature_count[child_id] + random_instance_cardinality,
+            )
+            if not random_instance_cardinality:
+                propagator.finalize_subtree(child_id, self.global_feature_count)
+
+        return True
+
     def generate_random_children_with_random_cardinality_with_assignment(
-        self, feature: Feature
+        self, feature: Feature, allowed_instances: list[Cardinality] | None = None
     ):
         summed_random_instance_cardinality = 0
         summed_random_group_type_cardinality = 0
         child_with_random_instance_cardinality: list[ChildAndCardinalityPair] = []
 
-        for child in feature.children:
+        for position, child in enumerate(feature.children):
+            allowed = allowed_instances[position] if allowed_instances else None
+
             # Enforces the feature of the chosen assignment to have the chosen number of instances
             if child.name == self.chosen_assignment[0]:
                 random_instance_cardinality = self.chosen_assignment[1]
+                if allowed is not None and not allowed.is_valid_cardinality(
+                    random_instance_cardinality
+                ):
+                    raise DeadEnd()
+            elif allowed is not None:
+                if allowed.is_empty:
+                    raise DeadEnd()
+                random_instance_cardinality = self.get_random_cardinality(allowed)
             else:
                 random_instance_cardinality = self.get_random_cardinality(
                     child.instance_cardinality
                 )
+
             if random_instance_cardinality != 0:
                 summed_random_group_type_cardinality += 1
             summed_random_instance_cardinality += random_instance_cardinality
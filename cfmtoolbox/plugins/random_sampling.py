@@ -1,25 +1,60 @@
-import json
-import secrets
-from collections import defaultdict
-from dataclasses import asdict
-from typing import NamedTuple
+import random
+from array import array
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Annotated, NamedTuple, Optional, TypeAlias
 
 import typer
 
 from cfmtoolbox import app
-from cfmtoolbox.models import CFM, Cardinality, ConfigurationNode, Feature
+from cfmtoolbox.flat import FlatCFM, FlatConfiguration
+from cfmtoolbox.models import CFM, Cardinality, ConfigurationNode, Feature, Interval
+from cfmtoolbox.propagation import (
+    SOME_INSTANCES,
+    ConstraintPropagator,
+    DeadEnd,
+    point,
+)
+from cfmtoolbox.randomness import create_random_generator, derive_seeds
+from cfmtoolbox.samples import write_samples
+from cfmtoolbox.validation import ConfigurationValidator
 
 
 @app.command()
-def random_sampling(model: CFM, num_samples: int = 1) -> CFM:
+def random_sampling(
+    model: CFM,
+    num_samples: int = 1,
+    seed: Optional[int] = None,
+    secure: bool = False,
+    jobs: Annotated[int, typer.Option(min=1)] = 1,
+    jsonl: bool = False,
+    output: Optional[Path] = None,
+) -> CFM:
     if model.is_unbound:
         raise typer.Abort("Model is unbound. Please apply big-m global bound first.")
 
-    all_samples = [
-        asdict(RandomSampler(model).random_sampling()) for _ in range(num_samples)
-    ]
+    try:
+        random_generator = create_random_generator(seed, secure)
+    except ValueError as error:
+        raise typer.BadParameter(str(error))
+
+    try:
+        random_sampler = RandomSampler(model, random_generator)
+    except ValueError as error:
+        raise typer.Abort(str(error))
 
-    print(json.dumps(all_samples, indent=2))
+    write_samples(
+        random_sampler.random_flat_samplings(num_samples, jobs), jsonl, output
+    )
+
+    if random_sampler.retries:
+        app.err_console.print(
+            f"Discarded {random_sampler.retries} samples violating constraints, "
+            f"{random_sampler.pruned} of them before they were complete "
+            f"(acceptance rate {random_sampler.acceptance_rate:.1%})"
+        )
 
     return model
 
@@ -28,99 +63,378 @@ ChildAndCardinalityPair = NamedTuple(
     "ChildAndCardinalityPair", [("child", Feature), ("cardinality", int)]
 )
 
+NO_VALUES = Cardinality([])
+ZERO = Cardinality([Interval(0, 0)])
+
+SAMPLES_PER_STREAM = 100
+"""Number of samples drawn from each stream of random numbers by `random_flat_samplings`."""
+
+
+class GroupChoices(NamedTuple):
+    sums: list[list[Cardinality]]
+    """Possible sums of the instance counts of the children from each position on, by their number of selected children."""
+
+    starts: list[tuple[int, Cardinality]]
+    """Possible numbers of selected children, each with the possible sums of instance counts."""
+
+
+FlatSample: TypeAlias = tuple["array[int]", "array[int]", "array[int]"]
+"""Arrays of a flat configuration, which are sent from the workers without the feature names."""
+
+StreamResult: TypeAlias = tuple[list[FlatSample], int, int]
+"""Samples of a stream drawn by a worker, with the numbers of retries and pruned samples."""
+
+
+class SampleStream(NamedTuple):
+    seed: int | None
+    """Seed of the random generator of the stream, or None for a secure generator."""
+
+    size: int
+    """Number of samples drawn from the stream."""
+
 
 class RandomSampler:
-    def __init__(self, model: CFM):
-        self.global_feature_count: defaultdict[str, int] = defaultdict(int)
+    """Sampler drawing random configurations of a bound feature model.
+
+    Before sampling, the sampler computes for each feature which numbers of children
+    can be selected, and which sums of their instance counts go with each number,
+    using interval arithmetic over the instance cardinalities of the children. The
+    children of every instance are then drawn directly from these choices, so each
+    configuration satisfies all cardinalities without retrying.
+
+    Unless disabled, a [ConstraintPropagator][cfmtoolbox.propagation.ConstraintPropagator]
+    limits the instance counts to those allowed by the constraints that are already
+    decided, and abandons samples for which no count is left, which is counted in
+    `pruned`. Configurations violating constraints are drawn again, which is counted
+    in `retries`, together with the pruned ones.
+    """
+
+    def __init__(
+        self,
+        model: CFM,
+        random_generator: random.Random | None = None,
+        propagate_constraints: bool = True,
+    ):
         self.model = model
-        self.random_generator = secrets.SystemRandom()
+        self.validator = ConfigurationValidator(model)
+        self.feature_ids = {feature: i for i, feature in enumerate(model.features)}
+        self.global_feature_count = [0] * len(model.features)
+        self.random_generator = random_generator or create_random_generator()
+        self.accepted = 0
+        self.retries = 0
+        self.pruned = 0
+        self.propagator = (
+            ConstraintPropagator(self.validator.flat_cfm)
+            if propagate_constraints and model.constraints
+            else None
+        )
+
+        # Children precede their parents in reversed breadth-first order
+        self.instance_choices: list[Cardinality] = [NO_VALUES] * len(model.features)
+        self.group_choices: list[GroupChoices | None] = [None] * len(model.features)
+
+        for feature in reversed(model.features):
+            feature_id = self.feature_ids[feature]
+            instances = feature.instance_cardinality.normalized()
+            if instances.intervals and instances.intervals[-1].upper is None:
+                raise ValueError(
+                    f"{feature.name} is unbound. Please apply big-m global bound first."
+                )
+
+            if feature.children:
+                group_choices = self.compile_group(
+                    feature,
+                    [
+                        self.instance_choices[self.feature_ids[child]]
+                        for child in feature.children
+                    ],
+                )
+                self.group_choices[feature_id] = group_choices
+
+                # A feature whose children cannot satisfy its group cardinalities
+                # cannot have any instances
+                if group_choices is None:
+                    instances = instances.intersection(ZERO)
+
+            self.instance_choices[feature_id] = instances
+
+        if model.root.children and self.group_choices[0] is None:
+            raise ValueError("The model has no valid configurations")
+
+    def compile_group(
+        self, feature: Feature, instance_choices: list[Cardinality]
+    ) -> GroupChoices | None:
+        child_count = len(feature.children)
+        max_type_count = child_count
+        type_uppers = [
+            interval.upper for interval in feature.group_type_cardinality.intervals
+        ]
+        if type_uppers and None not in type_uppers:
+            max_type_count = min(child_count, max(upper or 0 for upper in type_uppers))
+
+        sums: list[list[Cardinality]] = [[] for _ in range(child_count + 1)]
+        sums[child_count] = [ZERO] + [NO_VALUES] * max_type_count
+
+        for position in reversed(range(child_count)):
+            instances = instance_choices[position]
+            skippable = instances.is_valid_cardinality(0)
+            selected = instances.intersection(SOME_INSTANCES)
+            later = sums[position + 1]
+
+            sums[position] = [
+                (later[type_count] if skippable else NO_VALUES).union(
+                    selected + later[type_count - 1] if type_count else NO_VALUES
+                )
+                for type_count in range(max_type_count + 1)
+            ]
+
+        starts = []
+        for type_count in range(max_type_count + 1):
+            if feature.group_type_cardinality.is_valid_cardinality(type_count):
+                possible_sums = sums[0][type_count].intersection(
+                    feature.group_instance_cardinality
+                )
+                if not possible_sums.is_empty:
+                    starts.append((type_count, possible_sums))
+
+        return GroupChoices(sums, starts) if starts else None
+
+    @property
+    def acceptance_rate(self) -> float:
+        """Share of the drawn samples that satisfied the constraints."""
+
+        drawn = self.accepted + self.retries
+        return self.accepted / drawn if drawn else 1.0
 
     def random_sampling(self) -> ConfigurationNode:
+        return self.random_flat_sampling().to_configuration_node()
+
+    def random_flat_sampling(self) -> FlatConfiguration:
+        flat_cfm = self.validator.flat_cfm
+
         while True:
-            self.global_feature_count = defaultdict(int)
-            random_feature_node = self.generate_random_feature_node(self.model.root)
-            if random_feature_node.validate(self.model):
-                break
-
-        return random_feature_node
-
-    def get_random_cardinality(self, cardinality_list: Cardinality):
-        random_interval = self.random_generator.choice(cardinality_list.intervals)
-        assert random_interval.upper is not None
-        random_cardinality = self.random_generator.randint(
-            random_interval.lower, random_interval.upper
-        )
-        return random_cardinality
+            self.global_feature_count = [0] * flat_cfm.feature_count
+            configuration = FlatConfiguration(flat_cfm.names)
 
-    def get_random_cardinality_without_zero(self, cardinality_list: Cardinality):
-        modified_cardinality_list_intervals = cardinality_list.intervals
-        first_interval = cardinality_list.intervals[0]
-        if first_interval.lower == 0 and first_interval.upper == 0:
-            modified_cardinality_list_intervals = cardinality_list.intervals[1:]
+            if self.propagator is not None:
+                self.propagator.reset()
 
-        random_interval = self.random_generator.choice(
-            modified_cardinality_list_intervals
-        )
-        assert random_interval.upper is not None
-        random_cardinality = self.random_generator.randint(
-            random_interval.lower if random_interval.lower != 0 else 1,
-            random_interval.upper,
+            try:
+                self.generate_random_feature_node(self.model.root, configuration)
+            except DeadEnd:
+                self.pruned += 1
+            else:
+                if flat_cfm.first_violated_constraint(self.global_feature_count) < 0:
+                    self.accepted += 1
+                    return configuration
+
+            self.retries += 1
+
+    def random_flat_samplings(
+        self, num_samples: int, jobs: int = 1
+    ) -> Iterator[FlatConfiguration]:
+        """Draw many samples, in a pool of worker processes if there is more than one job.
+
+        The samples are split into streams of `SAMPLES_PER_STREAM` samples, whose
+        random generators are seeded with seeds derived from one master seed drawn
+        from the sampler's random generator. A secure random generator is used for
+        every stream instead. Samples are yielded in the order of their streams, so
+        the samples of a seeded sampler do not depend on the number of jobs.
+        """
+
+        secure = isinstance(self.random_generator, random.SystemRandom)
+        stream_count = -(-num_samples // SAMPLES_PER_STREAM)
+        seeds = derive_seeds(self.random_generator.getrandbits(128), stream_count)
+        streams = [
+            SampleStream(
+                None if secure else seed,
+                min(SAMPLES_PER_STREAM, num_samples - i * SAMPLES_PER_STREAM),
+            )
+            for i, seed in enumerate(seeds)
+        ]
+
+        if jobs <= 1:
+            for stream in streams:
+                yield from self.sample_stream(stream)
+            return
+
+        flat_cfm = self.validator.flat_cfm
+        pending: deque[Future[StreamResult]] = deque()
+
+        with ProcessPoolExecutor(
+            jobs,
+            initializer=_initialize_worker,
+            initargs=(flat_cfm, self.propagator is not None),
+        ) as executor:
+            for stream in streams:
+                pending.append(executor.submit(_sample_stream, stream))
+
+                if len(pending) >= 2 * jobs:
+                    yield from self.collect_samples(pending.popleft().result())
+
+            while pending:
+                yield from self.collect_samples(pending.popleft().result())
+
+    def sample_stream(self, stream: SampleStream) -> Iterator[FlatConfiguration]:
+        """Draw the samples of one stream with the stream's own random generator, yielding each as soon as it is drawn."""
+
+        stream_generator = create_random_generator(
+            stream.seed, secure=stream.seed is None
         )
-        return random_cardinality
+
+        for _ in range(stream.size):
+            # The sampler's own generator is restored between samples, so other
+            # draws while the stream is suspended do not consume the stream's numbers
+            random_generator = self.random_generator
+            self.random_generator = stream_generator
+
+            try:
+                sample = self.random_flat_sampling()
+            finally:
+                self.random_generator = random_generator
+
+            yield sample
+
+    def collect_samples(self, result: StreamResult) -> list[FlatConfiguration]:
+        samples, retries, pruned = result
+        self.accepted += len(samples)
+        self.retries += retries
+        self.pruned += pruned
+        names = self.validator.flat_cfm.names
+
+        return [FlatConfiguration(names, *sample) for sample in samples]
+
+    def choose(self, values: Cardinality) -> int:
+        interval = self.random_generator.choice(values.intervals)
+        assert interval.upper is not None
+        return self.random_generator.randint(interval.lower, interval.upper)
 
     def generate_random_feature_node(
         self,
         feature: Feature,
-    ):
-        feature_node = ConfigurationNode(
-            value=f"{feature.name}#{self.global_feature_count[feature.name]}",
-            children=[],
+        configuration: FlatConfiguration,
+        last: bool = True,
+    ) -> int:
+        """Generate an instance of a feature with its subtree.
+
+        `last` tells if no further instances of the feature follow this one, so
+        the counts of its children become final once they are chosen.
+        """
+
+        feature_id = self.feature_ids[feature]
+        feature_node = configuration.open_node(
+            feature_id, self.global_feature_count[feature_id]
         )
 
-        self.global_feature_count[feature.name] += 1
+        self.global_feature_count[feature_id] += 1
 
         if not feature.children:
             return feature_node
 
-        while True:
-            (random_children, summed_random_instance_cardinality) = (
-                self.generate_random_children_with_random_cardinality(feature)
-            )
-            if feature.group_instance_cardinality.is_valid_cardinality(
-                summed_random_instance_cardinality
-            ):
-                break
+        random_children, _ = self.generate_random_children_with_random_cardinality(
+            feature, last
+        )
 
         for child, random_instance_cardinality in random_children:
-            for i in range(random_instance_cardinality):
-                feature_node.children.append(self.generate_random_feature_node(child))
+            for instance in range(random_instance_cardinality):
+                self.generate_random_feature_node(
+                    child,
+                    configuration,
+                    last and instance == random_instance_cardinality - 1,
+                )
 
+        configuration.close_node(feature_node)
         return feature_node
 
-    def generate_random_children_with_random_cardinality(self, feature: Feature):
-        random_group_type_cardinality = self.get_random_cardinality(
-            feature.group_type_cardinality
-        )
+    def generate_random_children_with_random_cardinality(
+        self, feature: Feature, last: bool = False
+    ):
+        feature_id = self.feature_ids[feature]
+        group_choices = self.group_choices[feature_id]
+        instance_choices = [
+            self.instance_choices[self.feature_ids[child]] for child in feature.children
+        ]
 
-        # Seperate required and optional children to only randomize the optional children
-        required_children = self.get_required_children(feature)
-        number_of_optional_children = random_group_type_cardinality - len(
-            required_children
-        )
-        optional_children_sample = self.get_sorted_sample(
-            self.get_optional_children(feature), number_of_optional_children
-        )
+        # Below the last instance of a feature, the chosen numbers of instances
+        # complete the global counts of the children, so the choices are limited to
+        # those allowed by the decided constraints of the children and descendants
+        propagator = self.propagator if last else None
+        if propagator is not None and propagator.constrained_descendants[feature_id]:
+            allowed_choices = [
+                propagator.allowed_instances(
+                    self.feature_ids[child], instances, self.global_feature_count
+                )
+                for child, instances in zip(feature.children, instance_choices)
+            ]
+            if allowed_choices != instance_choices:
+                instance_choices = allowed_choices
+                group_choices = self.compile_group(feature, instance_choices)
+                if group_choices is None:
+                    raise DeadEnd()
+        else:
+            propagator = None
+
+        assert group_choices is not None
+
+        # Choose the number of selected children first, then decide child by child
+        # among the choices that still allow the chosen number and sum
+        type_count, possible_sums = self.random_generator.choice(group_choices.starts)
+        child_count = len(feature.children)
 
         summed_random_instance_cardinality = 0
         child_with_random_instance_cardinality: list[ChildAndCardinalityPair] = []
 
-        for child in feature.children:
-            if child.is_required or child in optional_children_sample:
-                random_instance_cardinality = self.get_random_cardinality_without_zero(
-                    child.instance_cardinality
+        for position, child in enumerate(feature.children):
+            later = group_choices.sums[position + 1]
+            child_id = self.feature_ids[child]
+            instances = instance_choices[position]
+
+            # The counts of earlier children are final now, which may decide
+            # further constraints
+            if propagator is not None:
+                instances = propagator.allowed_instances(
+                    child_id, instances, self.global_feature_count
+                )
+
+            can_skip = (
+                instances.is_valid_cardinality(0)
+                and not possible_sums.intersection(later[type_count]).is_empty
+            )
+            selectable = (
+                instances.intersection(SOME_INSTANCES).intersection(
+                    possible_sums - later[type_count - 1]
                 )
+                if type_count
+                else NO_VALUES
+            )
+
+            if selectable.is_empty and not can_skip:
+                raise DeadEnd()
+
+            # Children are selected with the probability of a uniformly random
+            # choice of the remaining children, unless only one option is left
+            if not selectable.is_empty and (
+                not can_skip
+                or self.random_generator.random() * (child_count - position)
+                < type_count
+            ):
+                random_instance_cardinality = self.choose(selectable)
+                possible_sums = (
+                    possible_sums - point(random_instance_cardinality)
+                ).intersection(later[type_count - 1])
+                type_count -= 1
             else:
                 random_instance_cardinality = 0
+                possible_sums = possible_sums.intersection(later[type_count])
+
+            if propagator is not None:
+                propagator.finalize(
+                    child_id,
+                    self.global_feature_count[child_id] + random_instance_cardinality,
+                )
+                if not random_instance_cardinality:
+                    propagator.finalize_subtree(child_id, self.global_feature_count)
+
             summed_random_instance_cardinality += random_instance_cardinality
             child_with_random_instance_cardinality.append(
                 ChildAndCardinalityPair(child, random_instance_cardinality)
@@ -131,16 +445,30 @@ class RandomSampler:
             summed_random_instance_cardinality,
         )
 
-    def get_sorted_sample(self, features: list[Feature], sample_size: int):
-        return [
-            features[i]
-            for i in sorted(
-                self.random_generator.sample(range(len(features)), sample_size)
-            )
-        ]
 
-    def get_required_children(self, feature: Feature):
-        return [child for child in feature.children if child.is_required]
+_worker_sampler: RandomSampler | None = None
+
+
+def _initialize_worker(flat_cfm: FlatCFM, propagate_constraints: bool) -> None:
+    global _worker_sampler
+    _worker_sampler = RandomSampler(
+        flat_cfm.to_cfm(), propagate_constraints=propagate_constraints
+    )
+
+
+def _sample_stream(stream: SampleStream) -> StreamResult:
+    assert _worker_sampler is not None
+
+    retries = _worker_sampler.retries
+    pruned = _worker_sampler.pruned
+    # Samples are sent back in one batch per stream, to limit the messages
+    samples = list(_worker_sampler.sample_stream(stream))
 
-    def get_optional_children(self, feature: Feature):
-        return [child for child in feature.children if not child.is_required]
+    return (
+        [
+            (sample.feature_ids, sample.instances, sample.subtree_ends)
+            for sample in samples
+        ],
+        _worker_sampler.retries - retries,
+        _worker_sampler.pruned - pruned,
+    )
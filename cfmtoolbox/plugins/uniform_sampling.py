@@ -0,0 +1,172 @@
+import random
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Optional, TypeVar
+
+import typer
+
+from cfmtoolbox import app
+from cfmtoolbox.counting import ConfigurationCounter
+from cfmtoolbox.flat import FlatConfiguration
+from cfmtoolbox.models import CFM, ConfigurationNode, Feature
+from cfmtoolbox.randomness import create_random_generator
+from cfmtoolbox.samples import write_samples
+from cfmtoolbox.validation import ConfigurationValidator
+
+T = TypeVar("T")
+
+
+@app.command()
+def uniform_sampling(
+    model: CFM,
+    num_samples: int = 1,
+    seed: Optional[int] = None,
+    secure: bool = False,
+    jsonl: bool = False,
+    output: Optional[Path] = None,
+) -> CFM:
+    if model.is_unbound:
+        raise typer.Abort("Model is unbound. Please apply big-m global bound first.")
+
+    try:
+        random_generator = create_random_generator(seed, secure)
+    except ValueError as error:
+        raise typer.BadParameter(str(error))
+
+    try:
+        uniform_sampler = UniformSampler(model, random_generator)
+    except ValueError as error:
+        raise typer.Abort(str(error))
+
+    write_samples(
+        (uniform_sampler.uniform_flat_sampling() for _ in range(num_samples)),
+        jsonl,
+        output,
+    )
+
+    if uniform_sampler.retries:
+        app.err_console.print(
+            f"Discarded {uniform_sampler.retries} samples violating constraints"
+        )
+
+    return model
+
+
+class UniformSampler:
+    """Sampler drawing configurations of a bound feature model uniformly at random.
+
+    Every choice while building a configuration, from the number of selected
+    children of a group to the instance count of each child, is made with a
+    probability proportional to the number of configurations it leads to, as
+    counted by a [ConfigurationCounter][cfmtoolbox.counting.ConfigurationCounter].
+    This makes every configuration of the feature tree equally likely without
+    retrying. Configurations violating constraints are drawn again, which keeps the
+    samples uniform among the valid configurations, and is counted in `retries`.
+    """
+
+    def __init__(self, model: CFM, random_generator: random.Random | None = None):
+        self.model = model
+        self.counter = ConfigurationCounter(model)
+        self.validator = ConfigurationValidator(model)
+        self.global_feature_count = [0] * len(model.features)
+        self.random_generator = random_generator or create_random_generator()
+        self.retries = 0
+
+        if not self.counter.count:
+            raise ValueError("The model has no valid configurations")
+
+        # Totals of the children of each feature that satisfy its group cardinalities
+        self.group_starts: list[list[tuple[tuple[int, int], int]]] = [
+            [
+                (totals, count)
+                for totals, count in group_counts[0].items()
+                if feature.group_type_cardinality.is_valid_cardinality(totals[0])
+                and feature.group_instance_cardinality.is_valid_cardinality(totals[1])
+            ]
+            if group_counts
+            else []
+            for feature, group_counts in zip(model.features, self.counter.group_counts)
+        ]
+
+    def uniform_sampling(self) -> ConfigurationNode:
+        return self.uniform_flat_sampling().to_configuration_node()
+
+    def uniform_flat_sampling(self) -> FlatConfiguration:
+        flat_cfm = self.validator.flat_cfm
+
+        while True:
+            self.global_feature_count = [0] * flat_cfm.feature_count
+            configuration = FlatConfiguration(flat_cfm.names)
+            self.generate_feature_node(self.model.root, configuration)
+
+            if flat_cfm.first_violated_constraint(self.global_feature_count) < 0:
+                return configuration
+
+            self.retries += 1
+
+    def choose(self, options: Iterable[tuple[T, int]], total: int) -> T:
+        """Choose one of the options with a probability proportional to its count."""
+
+        target = self.random_generator.randrange(total)
+
+        for option, count in options:
+            if target < count:
+                return option
+            target -= count
+
+        raise AssertionError("The counts of the options are less than the total")
+
+    def generate_feature_node(
+        self, feature: Feature, configuration: FlatConfiguration
+    ) -> int:
+        feature_id = self.counter.feature_ids[feature]
+        feature_node = configuration.open_node(
+            feature_id, self.global_feature_count[feature_id]
+        )
+
+        self.global_feature_count[feature_id] += 1
+
+        if not feature.children:
+            return feature_node
+
+        for child, instances in self.generate_children(feature):
+            for _ in range(instances):
+                self.generate_feature_node(child, configuration)
+
+        configuration.close_node(feature_node)
+        return feature_node
+
+    def generate_children(self, feature: Feature) -> list[tuple[Feature, int]]:
+        """Choose the instance count of each child of one instance of a feature."""
+
+        feature_id = self.counter.feature_ids[feature]
+        group_counts = self.counter.group_counts[feature_id]
+
+        # The totals are the number of selected children and the sum of their
+        # instance counts that the remaining children still have to make up
+        totals = self.choose(
+            self.group_starts[feature_id],
+            self.counter.configuration_counts[feature_id],
+        )
+        remaining_count = group_counts[0][totals]
+
+        children = []
+        for position, child in enumerate(feature.children):
+            later_counts = group_counts[position + 1]
+            instance_counts = self.counter.instance_counts[
+                self.counter.feature_ids[child]
+            ]
+
+            options = []
+            for instances, count in instance_counts.items():
+                later_totals = (totals[0] - (instances > 0), totals[1] - instances)
+                later_count = later_counts.get(later_totals, 0)
+
+                if later_count:
+                    options.append(((instances, later_totals), count * later_count))
+
+            instances, totals = self.choose(options, remaining_count)
+            remaining_count = later_counts[totals]
+            children.append((child, instances))
+
+        return children
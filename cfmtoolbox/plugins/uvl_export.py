@@ -1,5 +1,7 @@
 from enum import Enum
+from io import BytesIO
 from textwrap import indent
+from typing import BinaryIO
 
 from cfmtoolbox import CFM, app
 from cfmtoolbox.models import Cardinality, Constraint, Feature
@@ -124,18 +126,23 @@ def serialize_constraints(constraints: list[Constraint]) -> str:
     return constraints_str
 
 
-@app.exporter(".uvl")
 def export_uvl(cfm: CFM) -> bytes:
-    includes = serialize_includes()
-    root = serialize_root_feature(cfm.root)
+    buffer = BytesIO()
+    write_uvl(cfm, buffer)
+    return buffer.getvalue()
 
-    feature_strings = [
-        indent(serialize_features(child), "\t\t\t") for child in cfm.root.children
-    ]
 
-    features = "".join(feature_strings) + "\n"
+@app.stream_exporter(".uvl")
+def write_uvl(cfm: CFM, file: BinaryIO) -> None:
+    # Constraints are serialized first, so a model that cannot be represented in UVL
+    # is rejected before anything is written
     constraints = serialize_constraints(cfm.constraints)
 
-    export = includes + root + features + constraints
+    file.write(serialize_includes().encode())
+    file.write(serialize_root_feature(cfm.root).encode())
 
-    return export.encode()
+    for child in cfm.root.children:
+        file.write(indent(serialize_features(child), "\t\t\t").encode())
+
+    file.write(b"\n")
+    file.write(constraints.encode())
@@ -65,9 +65,9 @@ class CustomListener(UVLPythonListener):
         for feature in group_specs:
             intervals = feature.instance_cardinality.intervals
             if len(intervals) >= 1 and intervals[0].lower != 0:
-                feature.instance_cardinality.intervals = [
-                    Interval(0, intervals[0].upper)
-                ]
+                feature.instance_cardinality = Cardinality(
+                    [Interval(0, intervals[0].upper)]
+                )
             elif len(intervals) == 0 or intervals[0].upper == 0:
                 feature.instance_cardinality = Cardinality([Interval(0, 1)])
         self.groups.append((Cardinality([Interval(-4, -4)]), group_specs))
@@ -78,7 +78,7 @@ class CustomListener(UVLPythonListener):
         for feature in group_specs:
             intervals = feature.instance_cardinality.intervals
             if len(intervals) == 0 or intervals[0].lower == 0:
-                feature.instance_cardinality.intervals = [Interval(1, 1)]
+                feature.instance_cardinality = Cardinality([Interval(1, 1)])
         self.groups.append((Cardinality([Interval(-1, -1)]), group_specs))
 
     # Extract cardinality from text and add group to groups list
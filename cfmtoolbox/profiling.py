@@ -0,0 +1,110 @@
+import cProfile
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from time import perf_counter
+from typing import NamedTuple
+
+from rich.table import Table
+
+
+class PhaseTiming(NamedTuple):
+    name: str
+    """Name of the phase, e.g. import, export or the name of a command."""
+
+    duration: float
+    """Wall time of the phase in seconds."""
+
+    peak_memory: int | None = None
+    """Peak size of the traced memory blocks during the phase in bytes, if memory is traced."""
+
+
+class Profiler:
+    """Records the wall time of the phases of a run, and optionally their peak memory and a cProfile.
+
+    Memory is traced with tracemalloc, which slows down allocations considerably, so
+    it is only enabled on request.
+    """
+
+    def __init__(self, trace_memory: bool = False, profile_path: Path | None = None):
+        self.trace_memory = trace_memory
+        self.profile_path = profile_path
+        self.phases: list[PhaseTiming] = []
+
+    @contextmanager
+    def run(self) -> Iterator["Profiler"]:
+        """Profile a run, writing the cProfile stats to the profile path afterwards."""
+
+        self.phases = []
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        profile = cProfile.Profile() if self.profile_path is not None else None
+
+        if started_tracing:
+            tracemalloc.start()
+
+        if profile is not None:
+            profile.enable()
+
+        try:
+            yield self
+        finally:
+            if profile is not None and self.profile_path is not None:
+                profile.disable()
+                profile.dump_stats(self.profile_path)
+
+            if started_tracing:
+                tracemalloc.stop()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+
+        if tracing:
+            tracemalloc.reset_peak()
+
+        start = perf_counter()
+        yield
+        duration = perf_counter() - start
+
+        peak_memory = tracemalloc.get_traced_memory()[1] if tracing else None
+        self.phases.append(PhaseTiming(name, duration, peak_memory))
+
+    def summary(self) -> Table:
+        """Table of the phases with their wall time and peak memory."""
+
+        table = Table(title="Profile")
+        table.add_column("Phase")
+        table.add_column("Time", justify="right")
+        table.add_column("Peak memory", justify="right")
+
+        for phase in self.phases:
+            table.add_row(
+                phase.name,
+                f"{phase.duration:.3f}s",
+                format_size(phase.peak_memory),
+            )
+
+        peak_memories = [
+            phase.peak_memory for phase in self.phases if phase.peak_memory is not None
+        ]
+        table.add_section()
+        table.add_row(
+            "total",
+            f"{sum(phase.duration for phase in self.phases):.3f}s",
+            format_size(max(peak_memories)) if peak_memories else "-",
+        )
+
+        return table
+
+
+def format_size(size: int | None) -> str:
+    if size is None:
+        return "-"
+
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024  # type: ignore[assignment]
+
+    return f"{size:.1f} GiB"
@@ -0,0 +1,242 @@
+from cfmtoolbox.flat import FlatCFM
+from cfmtoolbox.models import Cardinality, Interval
+
+NOT_FINAL = -1
+
+ANY_COUNT = Cardinality([Interval(0, None)])
+SOME_INSTANCES = Cardinality([Interval(1, None)])
+
+
+class DeadEnd(Exception):
+    """Raised when a partially generated sample can no longer satisfy the constraints."""
+
+
+class ConstraintPropagator:
+    """Decides the constraints of a feature model while a sample is generated.
+
+    Samplers generate the instances of a feature below each parent instance in
+    depth-first order, so once they choose the number of children of the last
+    instance of a feature, the global counts of these children are final. The
+    propagator records these final counts. Counts only grow while a sample is
+    generated, and are bounded by the products of the instance cardinalities along
+    the path from the root, so the counts a feature can still reach are known even
+    before they are final.
+
+    Using an index of the constraints of every feature, the propagator tells the
+    sampler which counts of a feature are allowed by the constraints that are
+    decided by the reachable counts of their other feature. Choosing only allowed
+    counts steers the sampler away from configurations that would be rejected
+    afterwards, and no allowed count means the sample can be abandoned. Skipping a
+    feature finalizes the counts of its whole subtree, so the propagator also keeps
+    the constrained descendants of every feature, to check that they can keep their
+    counts.
+
+    Final counts are recorded on a trail, so samplers that retry a choice can undo
+    the counts recorded since a checkpoint.
+    """
+
+    def __init__(self, flat_cfm: FlatCFM):
+        self.flat_cfm = flat_cfm
+
+        # Constraints between a feature and itself are left to the final check, as
+        # they are decided by a single count
+        self.constraint_index: list[list[int]] = [
+            [] for _ in range(flat_cfm.feature_count)
+        ]
+        for constraint in range(flat_cfm.constraint_count):
+            first_feature = flat_cfm.constraint_first_features[constraint]
+            second_feature = flat_cfm.constraint_second_features[constraint]
+
+            if first_feature != second_feature:
+                self.constraint_index[first_feature].append(constraint)
+                self.constraint_index[second_feature].append(constraint)
+
+        # Bounds of the global count of each feature in any configuration
+        self.minimum_counts = [1] * flat_cfm.feature_count
+        self.maximum_counts: list[int | None] = [1] * flat_cfm.feature_count
+        for feature_id in range(1, flat_cfm.feature_count):
+            parent_id = flat_cfm.parents[feature_id]
+            instances = flat_cfm.cardinalities[
+                flat_cfm.instance_cardinalities[feature_id]
+            ].normalized()
+
+            if instances.is_empty:
+                self.minimum_counts[feature_id] = self.maximum_counts[feature_id] = 0
+                continue
+
+            parent_maximum = self.maximum_counts[parent_id]
+            upper = instances.intervals[-1].upper
+            self.minimum_counts[feature_id] = (
+                self.minimum_counts[parent_id] * instances.intervals[0].lower
+            )
+            self.maximum_counts[feature_id] = (
+                None
+                if parent_maximum is None or upper is None
+                else parent_maximum * upper
+            )
+
+        self.constrained_descendants: list[list[int]] = [
+            [] for _ in range(flat_cfm.feature_count)
+        ]
+        for feature_id, constraints in enumerate(self.constraint_index):
+            if constraints:
+                ancestor = flat_cfm.parents[feature_id]
+                while ancestor >= 0:
+                    self.constrained_descendants[ancestor].append(feature_id)
+                    ancestor = flat_cfm.parents[ancestor]
+
+        self.final_counts = [NOT_FINAL] * flat_cfm.feature_count
+        """Final global count of each feature of the current sample, by feature id."""
+
+        self.trail: list[int] = []
+        """Ids of the features whose count became final, in the order they did."""
+
+    def reset(self) -> None:
+        """Start a new sample, in which only the single root instance is final."""
+
+        self.final_counts = [NOT_FINAL] * self.flat_cfm.feature_count
+        self.trail = []
+        self.finalize(0, 1)
+
+    def is_constrained(self, feature_id: int) -> bool:
+        return bool(self.constraint_index[feature_id])
+
+    def finalize(self, feature_id: int, count: int) -> None:
+        self.final_counts[feature_id] = count
+        self.trail.append(feature_id)
+
+    def finalize_subtree(
+        self, feature_id: int, global_feature_count: list[int]
+    ) -> None:
+        """Finalize the counts of a feature's descendants, after the feature got no further instances.
+
+        Only the final counts of constrained features are used, so the counts of
+        the other descendants are left open.
+        """
+
+        for descendant in self.constrained_descendants[feature_id]:
+            if self.final_counts[descendant] == NOT_FINAL:
+                self.finalize(descendant, global_feature_count[descendant])
+
+    def can_finalize_subtree(
+        self, feature_id: int, global_feature_count: list[int]
+    ) -> bool:
+        """Check if a feature and its descendants are allowed to keep their current counts."""
+
+        # The counts are finalized together on the trail, so constraints between
+        # them are decided as well, and restored afterwards
+        features = [feature_id, *self.constrained_descendants[feature_id]]
+        checkpoint = self.checkpoint()
+
+        for feature in features:
+            if self.final_counts[feature] == NOT_FINAL:
+                self.finalize(feature, global_feature_count[feature])
+
+        allowed = all(
+            self.allowed_counts(feature, global_feature_count).is_valid_cardinality(
+                self.final_counts[feature]
+            )
+            for feature in features
+        )
+
+        self.restore(checkpoint)
+        return allowed
+
+    def checkpoint(self) -> int:
+        return len(self.trail)
+
+    def restore(self, checkpoint: int) -> None:
+        """Undo the final counts recorded since the checkpoint."""
+
+        while len(self.trail) > checkpoint:
+            self.final_counts[self.trail.pop()] = NOT_FINAL
+
+    def allowed_instances(
+        self, feature_id: int, instances: Cardinality, global_feature_count: list[int]
+    ) -> Cardinality:
+        """Numbers of further instances of a feature that keep the decided constraints satisfied, once they complete its count."""
+
+        if not self.constraint_index[feature_id]:
+            if not self.constrained_descendants[feature_id]:
+                return instances
+        else:
+            allowed_counts = self.allowed_counts(feature_id, global_feature_count)
+            if allowed_counts is not ANY_COUNT:
+                instances = instances.intersection(
+                    allowed_counts - point(global_feature_count[feature_id])
+                )
+
+        # No further instances also complete the counts of the descendants
+        if instances.is_valid_cardinality(0) and not self.can_finalize_subtree(
+            feature_id, global_feature_count
+        ):
+            instances = instances.intersection(SOME_INSTANCES)
+
+        return instances
+
+    def reachable_counts(
+        self, feature_id: int, global_feature_count: list[int]
+    ) -> Cardinality:
+        """Global counts a feature can still have at the end of the current sample."""
+
+        final_count = self.final_counts[feature_id]
+        if final_count != NOT_FINAL:
+            return point(final_count)
+
+        lower = max(self.minimum_counts[feature_id], global_feature_count[feature_id])
+        return Cardinality([Interval(lower, self.maximum_counts[feature_id])])
+
+    def allowed_counts(
+        self, feature_id: int, global_feature_count: list[int]
+    ) -> Cardinality:
+        """Global counts of a feature that satisfy all constraints decided by the reachable counts of their other feature."""
+
+        flat_cfm = self.flat_cfm
+        cardinalities = flat_cfm.cardinalities
+        allowed = ANY_COUNT
+
+        for constraint in self.constraint_index[feature_id]:
+            first_feature = flat_cfm.constraint_first_features[constraint]
+            second_feature = flat_cfm.constraint_second_features[constraint]
+            first_cardinality = cardinalities[
+                flat_cfm.constraint_first_cardinalities[constraint]
+            ]
+            second_cardinality = cardinalities[
+                flat_cfm.constraint_second_cardinalities[constraint]
+            ]
+            require = bool(flat_cfm.constraint_requires[constraint])
+
+            if first_feature == feature_id:
+                # A second count that is sure to violate the consequence rules
+                # out every count of the feature that triggers the constraint
+                second_counts = self.reachable_counts(
+                    second_feature, global_feature_count
+                )
+                if require and second_counts.intersection(second_cardinality).is_empty:
+                    allowed = allowed.difference(first_cardinality)
+                elif not require and is_subset(second_counts, second_cardinality):
+                    allowed = allowed.difference(first_cardinality)
+            else:
+                # A first count that is sure to trigger the constraint decides
+                # which counts of the feature satisfy the consequence
+                first_counts = self.reachable_counts(
+                    first_feature, global_feature_count
+                )
+                if is_subset(first_counts, first_cardinality):
+                    allowed = (
+                        allowed.intersection(second_cardinality)
+                        if require
+                        else allowed.difference(second_cardinality)
+                    )
+
+        return allowed
+
+
+def point(value: int) -> Cardinality:
+    """Cardinality allowing only the given value."""
+
+    return Cardinality([Interval(value, value)])
+
+
+def is_subset(first: Cardinality, second: Cardinality) -> bool:
+    return first.intersection(second) == first.normalized()
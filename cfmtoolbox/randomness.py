@@ -0,0 +1,40 @@
+import hashlib
+import random
+import secrets
+
+
+def create_random_generator(
+    seed: int | None = None, secure: bool = False
+) -> random.Random:
+    """Random number generator for the samplers.
+
+    Defaults to the Mersenne Twister of the `random` module, which is fast and
+    produces the same samples for the same seed. Without a seed, it is seeded from
+    the operating system once. A secure generator asks the operating system for
+    every random number instead, which is considerably slower and cannot be seeded.
+    """
+
+    if secure:
+        if seed is not None:
+            raise ValueError("A secure random generator cannot be seeded")
+        return secrets.SystemRandom()
+
+    return random.Random(seed)
+
+
+def derive_seeds(seed: int | None, count: int) -> list[int]:
+    """Seeds of independent streams of random numbers, derived from one master seed.
+
+    Each seed is the SHA-256 hash of the master seed and the number of its stream,
+    so the same master seed always gives the same streams, and the streams do not
+    follow each other like the states of a single generator would. Without a master
+    seed, one is drawn from the operating system.
+    """
+
+    if seed is None:
+        seed = secrets.randbits(128)
+
+    return [
+        int.from_bytes(hashlib.sha256(f"{seed}/{stream}".encode()).digest())
+        for stream in range(count)
+    ]
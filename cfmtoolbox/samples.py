@@ -0,0 +1,38 @@
+import json
+import sys
+from collections.abc import Iterable
+from contextlib import ExitStack
+from pathlib import Path
+from typing import TextIO
+
+from cfmtoolbox.flat import FlatConfiguration
+
+
+def write_samples(
+    samples: Iterable[FlatConfiguration],
+    jsonl: bool = False,
+    output: Path | None = None,
+) -> None:
+    """Write samples to a file or to stdout.
+
+    By default, the samples are written as one indented JSON list once all are
+    drawn. As JSON Lines, every sample is written as one line of compact JSON and
+    flushed as soon as it is drawn, so the samples are never held in memory all at
+    once, and other tools can read them while the sampling goes on.
+    """
+
+    with ExitStack() as stack:
+        file: TextIO = (
+            sys.stdout if output is None else stack.enter_context(output.open("w"))
+        )
+
+        if not jsonl:
+            print(
+                json.dumps([sample.to_dict() for sample in samples], indent=2),
+                file=file,
+            )
+            return
+
+        for sample in samples:
+            file.write(json.dumps(sample.to_dict(), separators=(",", ":")) + "\n")
+            file.flush()
@@ -0,0 +1,245 @@
+import json
+import os
+import socket
+import socketserver
+import stat
+from collections import OrderedDict
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, TextIO
+
+from cfmtoolbox.batch import describe_error
+from cfmtoolbox.flat import FlatCFM
+from cfmtoolbox.models import CFM
+from cfmtoolbox.profiling import Profiler
+
+if TYPE_CHECKING:
+    from cfmtoolbox.toolbox import CFMToolbox
+
+DEFAULT_MAX_MODELS = 16
+"""Default number of imported models kept in memory by the server."""
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+
+class RequestError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+class ModelServer:
+    """Server running pipelines on request, keeping the imported models in memory.
+
+    Requests are JSON-RPC 2.0 messages, one per line. The `run` method takes the
+    `import` path, an optional `export` path and a list of `commands`, each given as
+    its command line arguments, and returns the text the commands printed together
+    with the timings of each stage. `models` lists the resident models and
+    `shutdown` stops the server.
+
+    Imported models are kept in a least recently used cache keyed by their path,
+    modification time and size, so a changed file is imported again. Every request
+    receives its own copy of the model, as commands may modify it.
+    """
+
+    def __init__(self, app: "CFMToolbox", max_models: int = DEFAULT_MAX_MODELS):
+        self.app = app
+        self.max_models = max_models
+        self.models: OrderedDict[tuple[str, int, int], FlatCFM] = OrderedDict()
+        self.running = True
+
+    def load_model(self, path: Path) -> CFM:
+        stat = path.stat()
+        key = (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+
+        flat_cfm = self.models.get(key)
+        if flat_cfm is not None:
+            self.models.move_to_end(key)
+            return flat_cfm.to_cfm()
+
+        self.app.import_path = path
+        cfm = self.app.import_model()
+        assert cfm is not None
+
+        try:
+            flat_cfm = FlatCFM.from_cfm(cfm)
+        except ValueError:
+            # Models with constraints on unknown features cannot be kept as a copy
+            return cfm
+
+        self.models[key] = flat_cfm
+        while len(self.models) > self.max_models:
+            self.models.popitem(last=False)
+
+        return cfm
+
+    def run(self, params: dict[str, Any]) -> dict[str, Any]:
+        import_path = params.get("import")
+        export_path = params.get("export")
+        commands = params.get("commands", [])
+
+        if not isinstance(import_path, str):
+            raise RequestError(INVALID_PARAMS, "import must be a path")
+
+        if export_path is not None and not isinstance(export_path, str):
+            raise RequestError(INVALID_PARAMS, "export must be a path")
+
+        if not isinstance(commands, list) or not all(
+            isinstance(command, list) and all(isinstance(arg, str) for arg in command)
+            for command in commands
+        ):
+            raise RequestError(
+                INVALID_PARAMS, "commands must be a list of argument lists"
+            )
+
+        profiler = Profiler()
+        output = StringIO()
+
+        # Commands print their results, which are returned instead of being mixed
+        # into the responses
+        with redirect_stdout(output), profiler.run():
+            stages = self.app.parse_pipeline(commands)
+
+            with profiler.phase("import"):
+                model = self.load_model(Path(import_path))
+
+            for stage in stages:
+                with profiler.phase(stage.name):
+                    model = stage.run(model)
+
+            if export_path is not None:
+                with profiler.phase("export"):
+                    self.app.export_path = Path(export_path)
+                    self.app.export_model(model)
+
+        timings = [(phase.name, phase.duration) for phase in profiler.phases]
+        return {"output": output.getvalue(), "timings": timings}
+
+    def handle(self, request: Any) -> dict[str, Any] | None:
+        """Handle a decoded request. Returns the response or None for notifications."""
+
+        request_id = request.get("id") if isinstance(request, dict) else None
+
+        try:
+            if (
+                not isinstance(request, dict)
+                or request.get("jsonrpc") != "2.0"
+                or not isinstance(request.get("method"), str)
+            ):
+                raise RequestError(INVALID_REQUEST, "Invalid request")
+
+            params = request.get("params", {})
+            if not isinstance(params, dict):
+                raise RequestError(INVALID_PARAMS, "params must be an object")
+
+            method = request["method"]
+            if method == "run":
+                result: Any = self.run(params)
+            elif method == "models":
+                result = [path for path, _, _ in self.models]
+            elif method == "shutdown":
+                self.running = False
+                result = None
+            else:
+                raise RequestError(METHOD_NOT_FOUND, f"Method not found: {method}")
+        except RequestError as error:
+            response = error_response(request_id, error.code, str(error))
+        except Exception as error:
+            response = error_response(request_id, SERVER_ERROR, describe_error(error))
+        else:
+            response = {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+        if isinstance(request, dict) and "id" not in request:
+            return None
+
+        return response
+
+    def handle_line(self, line: str) -> str | None:
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as error:
+            return json.dumps(error_response(None, PARSE_ERROR, str(error)))
+
+        response = self.handle(request)
+        return None if response is None else json.dumps(response)
+
+    def serve_stream(self, input: TextIO, output: TextIO) -> None:
+        """Serve requests read from a text stream, such as stdin, until shutdown."""
+
+        for line in input:
+            if not line.strip():
+                continue
+
+            response = self.handle_line(line)
+            if response is not None:
+                output.write(response + "\n")
+                output.flush()
+
+            if not self.running:
+                break
+
+    def serve_socket(self, path: Path) -> None:
+        """Serve requests on a Unix socket until shutdown, one connection at a time.
+
+        A stale socket at the path is replaced, but any other file is an error. The
+        socket is only accessible to the user running the server.
+        """
+
+        if not hasattr(socket, "AF_UNIX"):
+            raise OSError("Unix sockets are not supported on this platform")
+
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                for raw_line in self.rfile:
+                    line = raw_line.decode()
+                    if not line.strip():
+                        continue
+
+                    response = server.handle_line(line)
+                    if response is not None:
+                        self.wfile.write(response.encode() + b"\n")
+                        self.wfile.flush()
+
+                    if not server.running:
+                        break
+
+        # Only stale sockets of earlier servers are replaced, never other files
+        try:
+            mode = path.lstat().st_mode
+        except FileNotFoundError:
+            pass
+        else:
+            if not stat.S_ISSOCK(mode):
+                raise FileExistsError(f"{path} exists and is not a socket")
+            path.unlink()
+
+        with socketserver.UnixStreamServer(
+            str(path), Handler, bind_and_activate=False
+        ) as unix_server:
+            try:
+                # Requests import and export arbitrary paths, so other users must
+                # not be able to connect. The permissions are restricted before
+                # listening, so no connection is accepted before.
+                unix_server.server_bind()
+                os.chmod(path, 0o600)
+                unix_server.server_activate()
+
+                while self.running:
+                    unix_server.handle_request()
+            finally:
+                path.unlink(missing_ok=True)
+
+
+def error_response(request_id: Any, code: int, message: str) -> dict[str, Any]:
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "error": {"code": code, "message": message},
+    }
@@ -1,10 +1,19 @@
 import inspect
+import sys
+import threading
+from collections.abc import Sequence
+from functools import wraps
+from importlib import import_module
 from importlib.metadata import entry_points
+from io import BytesIO
 from pathlib import Path
+from time import perf_counter
 from types import ModuleType
 from typing import (
     Annotated,
+    BinaryIO,
     Callable,
+    NamedTuple,
     Optional,
     TypeAlias,
     TypeVar,
@@ -12,21 +21,123 @@ from typing import (
 
 import typer
 from rich.console import Console
+from typer.core import TyperGroup
 
+from cfmtoolbox.batch import find_models, is_batch_path, process_models
+from cfmtoolbox.cache import ModelCache, default_cache_directory
 from cfmtoolbox.models import CFM
+from cfmtoolbox.profiling import PhaseTiming, Profiler
+from cfmtoolbox.server import ModelServer
 
 Importer: TypeAlias = Callable[[bytes], CFM]
 Exporter: TypeAlias = Callable[[CFM], bytes]
+StreamImporter: TypeAlias = Callable[[BinaryIO], CFM]
+StreamExporter: TypeAlias = Callable[[CFM, BinaryIO], None]
 CommandF = TypeVar("CommandF", bound=Callable[[CFM], CFM])
 
 
+class PipelineStage(NamedTuple):
+    name: str
+    """Name of the command."""
+
+    run: Callable[[CFM], CFM]
+    """Run the command with its command line arguments on a model."""
+
+    args: Sequence[str] = ()
+    """Command line arguments of the stage, starting with the name of the command."""
+
+
+PLUGIN_GROUP = "cfmtoolbox.plugins"
+IMPORTER_GROUP = "cfmtoolbox.importers"
+EXPORTER_GROUP = "cfmtoolbox.exporters"
+COMMAND_GROUP = "cfmtoolbox.commands"
+PIPELINE_SEPARATOR = "then"
+VALUE_OPTIONS = (
+    "--import",
+    "--export",
+    "--export-format",
+    "--jobs",
+    "--socket",
+    "--profile-output",
+)
+"""Options of the toolbox that take a value."""
+
+UNCACHED_FORMATS = (".cfmb",)
+"""Formats that load faster from their files than from the model cache."""
+
+
+class UnsupportedFormatError(ValueError):
+    """Raised if no importer or exporter is registered for a format."""
+
+
+class UnknownCommandError(LookupError):
+    """Raised if no command is registered under a name."""
+
+
+class PipelineGroup(TyperGroup):
+    """Command group that runs several commands, separated by `then`, as one pipeline."""
+
+    def parse_args(self, ctx: typer.Context, args: list[str]) -> list[str]:  # type: ignore[override]
+        _, _, commands = parse_args(args)
+        ctx.meta["cfmtoolbox.pipeline"] = split_pipeline(commands)
+        return super().parse_args(ctx, args[: len(args) - len(commands)])
+
+    def invoke(self, ctx: typer.Context) -> object:  # type: ignore[override]
+        pipeline: list[list[str]] = ctx.meta.pop("cfmtoolbox.pipeline")
+
+        with ctx:
+            # The callback runs first, as options like --serve replace the pipeline
+            ctx.invoke(self.callback, **ctx.params)  # type: ignore[arg-type]
+
+            if not pipeline:
+                ctx.fail("Missing command.")
+
+            stages = self.parse_stages(ctx, pipeline)
+            return ctx.invoke(self._result_callback, stages, **ctx.params)  # type: ignore[arg-type]
+
+    def parse_stages(
+        self, ctx: typer.Context, pipeline: list[list[str]]
+    ) -> list[PipelineStage]:
+        stages = []
+
+        for stage_args in pipeline:
+            if not stage_args:
+                ctx.fail(f"Missing command around {PIPELINE_SEPARATOR!r}.")
+
+            name, command, command_args = self.resolve_command(ctx, stage_args)
+            assert command is not None
+            with command.make_context(name, command_args, parent=ctx) as sub_ctx:
+                stage = command.invoke(sub_ctx)
+
+            stages.append(stage._replace(args=stage_args))
+
+        return stages
+
+
 class CFMToolbox:
     def __init__(self) -> None:
         self.registered_importers: dict[str, Importer] = {}
         self.registered_exporters: dict[str, Exporter] = {}
+        self.registered_stream_importers: dict[str, StreamImporter] = {}
+        self.registered_stream_exporters: dict[str, StreamExporter] = {}
+        self.registered_commands: dict[str, Callable[..., CFM]] = {}
         self.import_path: Path | None = None
         self.export_path: Path | None = None
-        self.typer = typer.Typer(callback=self.prepare)
+        self.export_format: str | None = None
+        self.jobs = 1
+        self.cache: ModelCache | None = None
+        self.declared_importers: dict[str, str] = {}
+        self.declared_exporters: dict[str, str] = {}
+        self.declared_commands: dict[str, str] = {}
+        self.undeclared_plugins: list[str] = []
+        self.plugins_discovered = False
+        self.plugins_lock = threading.Lock()
+        self.show_timings = False
+        self.show_profile = False
+        self.profiler = Profiler()
+        self.typer = typer.Typer(
+            cls=PipelineGroup, callback=self.prepare, result_callback=self.run_pipeline
+        )
         self.err_console = Console(stderr=True)
 
     def __call__(self) -> None:
@@ -36,33 +147,397 @@ class CFMToolbox:
         self,
         import_path: Annotated[Optional[Path], typer.Option("--import")] = None,
         export_path: Annotated[Optional[Path], typer.Option("--export")] = None,
+        show_timings: Annotated[bool, typer.Option("--timings")] = False,
+        use_cache: Annotated[bool, typer.Option("--cache/--no-cache")] = False,
+        export_format: Annotated[Optional[str], typer.Option("--export-format")] = None,
+        jobs: Annotated[int, typer.Option("--jobs", min=1)] = 1,
+        serve: Annotated[bool, typer.Option("--serve")] = False,
+        socket_path: Annotated[Optional[Path], typer.Option("--socket")] = None,
+        show_profile: Annotated[bool, typer.Option("--profile")] = False,
+        profile_path: Annotated[
+            Optional[Path], typer.Option("--profile-output")
+        ] = None,
     ) -> None:
         self.import_path = import_path
         self.export_path = export_path
+        self.export_format = export_format
+        self.jobs = jobs
+        self.show_timings = show_timings
+        self.cache = ModelCache(default_cache_directory()) if use_cache else None
+        self.show_profile = show_profile or profile_path is not None
+        self.profiler = Profiler(self.show_profile, profile_path)
+
+        if serve:
+            self.serve(socket_path)
+            raise typer.Exit()
+
+    def serve(self, socket_path: Path | None = None) -> None:
+        """Serve JSON-RPC requests on a Unix socket, or on stdin and stdout without a socket path."""
+
+        server = ModelServer(self)
+
+        if socket_path is None:
+            server.serve_stream(sys.stdin, sys.stdout)
+        else:
+            self.err_console.print(f"Serving on {socket_path}")
+            try:
+                server.serve_socket(socket_path)
+            except FileExistsError as error:
+                self.err_console.print(str(error))
+                raise typer.Exit(code=1)
+
+    def run_pipeline(self, stages: list[PipelineStage], **kwargs) -> None:
+        """Import the model once, run the stages of all commands in the pipeline on it and export the result."""
+
+        if self.import_path is None:
+            self.err_console.print("Please provide a model via the --import option.")
+            raise typer.Exit(code=1)
+
+        if is_batch_path(self.import_path):
+            self.run_batch(stages)
+            return
+
+        self.process_model(stages)
+
+        if self.show_timings:
+            for timing in self.timings:
+                self.err_console.print(f"{timing.name}: {timing.duration:.3f}s")
+
+        if self.show_profile:
+            self.err_console.print(self.profiler.summary())
+
+    def process_model(self, stages: Sequence[PipelineStage]) -> None:
+        profiler = self.profiler
+
+        with profiler.run():
+            with profiler.phase("import"):
+                model = self.import_model()
+
+            if model is None:
+                raise typer.Abort("No model to import")
+
+            for stage in stages:
+                with profiler.phase(stage.name):
+                    model = stage.run(model)
+
+            if self.export_path is not None:
+                with profiler.phase("export"):
+                    self.export_model(model)
+
+    @property
+    def timings(self) -> list[PhaseTiming]:
+        """Timings of the phases of the last processed model."""
+
+        return self.profiler.phases
+
+    def run_batch(self, stages: Sequence[PipelineStage]) -> None:
+        """Run the pipeline on every model selected by the import directory or glob pattern.
+
+        Each model is exported into the export directory, with the extension of the
+        export format or of the imported file. Failures are reported per model.
+        """
+
+        assert self.import_path is not None
+        import_path, export_path = self.import_path, self.export_path
+
+        extensions = {
+            *self.registered_importers,
+            *self.registered_stream_importers,
+            *self.declared_importers,
+        }
+        import_paths = find_models(import_path, extensions)
+
+        if not import_paths:
+            self.err_console.print(f"No models found at {import_path}")
+            raise typer.Exit(code=1)
+
+        if export_path is not None:
+            export_path.mkdir(parents=True, exist_ok=True)
+
+        export_format = (
+            None if self.export_format is None else normalize_format(self.export_format)
+        )
+
+        models = [
+            (
+                path,
+                None
+                if export_path is None
+                else export_path / f"{path.stem}{export_format or path.suffix}",
+            )
+            for path in import_paths
+        ]
+
+        # Models with the same name would overwrite each other's export
+        exported_models: dict[Path, Path] = {}
+        for path, model_export_path in models:
+            if model_export_path is None:
+                continue
+            if model_export_path in exported_models:
+                self.err_console.print(
+                    f"{exported_models[model_export_path]} and {path} would both be "
+                    f"exported to {model_export_path}"
+                )
+                raise typer.Exit(code=1)
+            exported_models[model_export_path] = path
+
+        # Profiles are recorded for single models only, as the models of a batch
+        # would overwrite each other's profile
+        self.profiler = Profiler()
+
+        start = perf_counter()
+        failed = 0
+
+        try:
+            for result in process_models(self, stages, models, self.jobs):
+                if result.error is None:
+                    self.err_console.print(
+                        f"{result.import_path}: {result.duration:.3f}s"
+                    )
+                else:
+                    failed += 1
+                    self.err_console.print(
+                        f"{result.import_path}: failed after {result.duration:.3f}s: "
+                        f"{result.error}"
+                    )
+        finally:
+            self.import_path, self.export_path = import_path, export_path
+
+        self.err_console.print(
+            f"Processed {len(models)} models in {perf_counter() - start:.2f}s "
+            f"({failed} failed)"
+        )
+
+        if failed:
+            raise typer.Exit(code=1)
 
     def import_model(self) -> CFM | None:
         if self.import_path is None:
             return None
 
-        importer = self.registered_importers.get(self.import_path.suffix)
+        try:
+            return self.load(self.import_path, cache=self.cache)
+        except UnsupportedFormatError as error:
+            raise typer.Abort(str(error))
+
+    def export_model(self, model: CFM) -> None:
+        if self.export_path is None:
+            return
+
+        try:
+            self.save(model, self.export_path)
+        except UnsupportedFormatError as error:
+            raise typer.Abort(str(error))
+
+    def load(
+        self,
+        source: Path | str | bytes,
+        format: str | None = None,
+        cache: ModelCache | None = None,
+    ) -> CFM:
+        """Import a model from a file path or from the contents of a file.
+
+        The format is a file extension like `.uvl` and defaults to the extension of
+        the path. It is required for contents given as bytes. Unlike the command
+        line interface, this does not depend on any state of the toolbox, so models
+        can be loaded from several threads at once.
+        """
+
+        if isinstance(source, bytes):
+            if format is None:
+                raise ValueError("The format of a model given as bytes is required")
+            extension = normalize_format(format)
+        else:
+            source = Path(source)
+            extension = normalize_format(format) if format else source.suffix
+
+        importer = self.find_importer(extension)
 
         if importer is None:
-            message = f"Unsupported import format: {self.import_path.suffix}"
-            raise typer.Abort(message)
+            raise UnsupportedFormatError(f"Unsupported import format: {extension}")
 
-        return importer(self.import_path.read_bytes())
+        if extension in UNCACHED_FORMATS:
+            cache = None
 
-    def export_model(self, model: CFM) -> None:
-        if self.export_path is None:
+        if isinstance(source, bytes):
+            return import_file(BytesIO(source), importer, cache)
+
+        with source.open("rb") as file:
+            return import_file(file, importer, cache)
+
+    def dump(self, model: CFM, format: str) -> bytes:
+        """Export a model to the contents of a file in the format, a file extension like `.json`."""
+
+        exporter = self.find_exporter(normalize_format(format))
+
+        if exporter is None:
+            raise UnsupportedFormatError(f"Unsupported export format: {format}")
+
+        buffer = BytesIO()
+        exporter(model, buffer)
+        return buffer.getvalue()
+
+    def save(self, model: CFM, path: Path | str, format: str | None = None) -> None:
+        """Export a model to a file, in the format given by the file extension unless specified."""
+
+        path = Path(path)
+        extension = normalize_format(format) if format else path.suffix
+        exporter = self.find_exporter(extension)
+
+        if exporter is None:
+            raise UnsupportedFormatError(f"Unsupported export format: {extension}")
+
+        try:
+            with path.open("wb") as file:
+                exporter(model, file)
+        except BaseException:
+            # Do not leave a partially written export behind
+            path.unlink(missing_ok=True)
+            raise
+
+    def run(self, command: str, model: CFM, *args, **kwargs) -> CFM:
+        """Run a command on a model and return the resulting model.
+
+        The command is looked up by its command line name, such as `random-sampling`,
+        and receives the further arguments as the keyword arguments of its function,
+        e.g. `num_samples=10`. Commands print their results as they do on the command
+        line.
+        """
+
+        function = self.find_command(command)
+
+        if function is None:
+            raise UnknownCommandError(f"Unknown command: {command}")
+
+        return function(model, *args, **kwargs)
+
+    def find_command(self, name: str) -> Callable[..., CFM] | None:
+        """Find the function of a command by its command line name."""
+
+        self.discover_plugins()
+
+        if name not in self.registered_commands and name in self.declared_commands:
+            self.import_plugin(self.declared_commands[name])
+
+        return self.registered_commands.get(name)
+
+    def discover_plugins(self) -> None:
+        """Declare the installed plugins once, for the importers, exporters and commands to be found by name.
+
+        Plugins are only imported once one of their importers, exporters or commands
+        is needed, except for those that do not declare what they provide.
+        """
+
+        with self.plugins_lock:
+            if self.plugins_discovered:
+                return
+
+            if not (
+                self.declared_importers
+                or self.declared_exporters
+                or self.declared_commands
+            ):
+                self.declare_plugins()
+                for module_name in self.undeclared_plugins:
+                    self.import_plugin(module_name)
+
+            self.plugins_discovered = True
+
+    def import_plugin(self, module_name: str) -> None:
+        """Import a plugin and adopt what it registers, for toolboxes other than `cfmtoolbox.app`.
+
+        Plugins register their importers, exporters and commands on `cfmtoolbox.app`,
+        so other toolboxes copy them from there, keeping their own registrations.
+        """
+
+        import_module(module_name)
+
+        from cfmtoolbox import app as plugin_app
+
+        if plugin_app is self:
             return
 
-        exporter = self.registered_exporters.get(self.export_path.suffix)
+        # A format registered on this toolbox keeps its importer or exporter, even
+        # if the plugin provides one of the other kind, which would take precedence
+        own_importers = {*self.registered_importers, *self.registered_stream_importers}
+        own_exporters = {*self.registered_exporters, *self.registered_stream_exporters}
+
+        self.registered_importers.update(
+            (extension, importer)
+            for extension, importer in plugin_app.registered_importers.items()
+            if extension not in own_importers
+        )
+        self.registered_stream_importers.update(
+            (extension, importer)
+            for extension, importer in plugin_app.registered_stream_importers.items()
+            if extension not in own_importers
+        )
+        self.registered_exporters.update(
+            (extension, exporter)
+            for extension, exporter in plugin_app.registered_exporters.items()
+            if extension not in own_exporters
+        )
+        self.registered_stream_exporters.update(
+            (extension, exporter)
+            for extension, exporter in plugin_app.registered_stream_exporters.items()
+            if extension not in own_exporters
+        )
+        self.registered_commands.update(
+            (name, command)
+            for name, command in plugin_app.registered_commands.items()
+            if name not in self.registered_commands
+        )
+
+    def find_importer(self, extension: str) -> StreamImporter | None:
+        """Find the importer for a file extension, adapting bytes-based importers to read from a file."""
 
+        self.discover_plugins()
+
+        if (
+            extension not in self.registered_stream_importers
+            and extension not in self.registered_importers
+            and extension in self.declared_importers
+        ):
+            self.import_plugin(self.declared_importers[extension])
+
+        stream_importer = self.registered_stream_importers.get(extension)
+        if stream_importer is not None:
+            return stream_importer
+
+        importer = self.registered_importers.get(extension)
+        if importer is None:
+            return None
+
+        @wraps(importer)
+        def read_and_import(file: BinaryIO) -> CFM:
+            return importer(file.read())
+
+        return read_and_import
+
+    def find_exporter(self, extension: str) -> StreamExporter | None:
+        """Find the exporter for a file extension, adapting bytes-based exporters to write to a file."""
+
+        self.discover_plugins()
+
+        if (
+            extension not in self.registered_stream_exporters
+            and extension not in self.registered_exporters
+            and extension in self.declared_exporters
+        ):
+            self.import_plugin(self.declared_exporters[extension])
+
+        stream_exporter = self.registered_stream_exporters.get(extension)
+        if stream_exporter is not None:
+            return stream_exporter
+
+        exporter = self.registered_exporters.get(extension)
         if exporter is None:
-            message = f"Unsupported export format: {self.export_path.suffix}"
-            raise typer.Abort(message)
+            return None
+
+        def export_and_write(cfm: CFM, file: BinaryIO) -> None:
+            file.write(exporter(cfm))
 
-        self.export_path.write_bytes(exporter(model))
+        return export_and_write
 
     def importer(self, extension: str) -> Callable[[Importer], Importer]:
         def decorator(func: Importer) -> Importer:
@@ -78,6 +553,24 @@ class CFMToolbox:
 
         return decorator
 
+    def stream_importer(
+        self, extension: str
+    ) -> Callable[[StreamImporter], StreamImporter]:
+        def decorator(func: StreamImporter) -> StreamImporter:
+            self.registered_stream_importers[extension] = func
+            return func
+
+        return decorator
+
+    def stream_exporter(
+        self, extension: str
+    ) -> Callable[[StreamExporter], StreamExporter]:
+        def decorator(func: StreamExporter) -> StreamExporter:
+            self.registered_stream_exporters[extension] = func
+            return func
+
+        return decorator
+
     def command(self, *args, **kwargs) -> Callable[[CommandF], CommandF]:
         def decorator(internal_function: CommandF) -> CommandF:
             internal_signature = inspect.signature(internal_function)
@@ -85,17 +578,16 @@ class CFMToolbox:
             external_params = internal_params[1:]  # Omit the first/CFM parameter
             external_signature = internal_signature.replace(parameters=external_params)
 
-            def external_function(*args, **kwargs):
-                original_model = self.import_model()
-
-                if original_model is None:
-                    self.err_console.print(
-                        "Please provide a model via the --import option."
-                    )
-                    raise typer.Exit(code=1)
+            name = kwargs.get("name") or (args[0] if args else None)
+            if name is None:
+                name = internal_function.__name__.lower().replace("_", "-")
 
-                modified_model = internal_function(original_model, *args, **kwargs)
-                self.export_model(modified_model)
+            # Commands only describe a stage, which is run by run_pipeline together
+            # with the stages of the other commands in the pipeline
+            def external_function(*args, **kwargs) -> PipelineStage:
+                return PipelineStage(
+                    name, lambda model: internal_function(model, *args, **kwargs)
+                )
 
             external_function.__name__ = internal_function.__name__
             external_function.__module__ = internal_function.__module__
@@ -105,11 +597,148 @@ class CFMToolbox:
             setattr(external_function, "__signature__", external_signature)
 
             self.typer.command(*args, **kwargs)(external_function)
+            self.registered_commands[name] = internal_function
             return internal_function
 
         return decorator
 
+    def parse_pipeline(self, pipeline: list[list[str]]) -> list[PipelineStage]:
+        """Parse the command line arguments of each stage of a pipeline."""
+
+        group = typer.main.get_group(self.typer)
+        assert isinstance(group, PipelineGroup)
+        return group.parse_stages(typer.Context(group), pipeline)
+
     @classmethod
     def load_plugins(cls) -> list[ModuleType]:
-        plugin_entry_points = entry_points(group="cfmtoolbox.plugins")
+        plugin_entry_points = entry_points(group=PLUGIN_GROUP)
         return [ep.load() for ep in plugin_entry_points]
+
+    def declare_plugins(self) -> None:
+        """Read which importers, exporters and commands the installed plugins provide, without importing them."""
+
+        for group, declarations in (
+            (IMPORTER_GROUP, self.declared_importers),
+            (EXPORTER_GROUP, self.declared_exporters),
+            (COMMAND_GROUP, self.declared_commands),
+        ):
+            for ep in entry_points(group=group):
+                declarations[ep.name] = ep.value
+
+        declared_modules = {
+            *self.declared_importers.values(),
+            *self.declared_exporters.values(),
+            *self.declared_commands.values(),
+        }
+
+        # Plugins that do not declare what they provide have to be loaded eagerly
+        self.undeclared_plugins = [
+            ep.value
+            for ep in entry_points(group=PLUGIN_GROUP)
+            if ep.value not in declared_modules
+        ]
+
+    def load_plugins_for(self, args: Sequence[str]) -> list[ModuleType]:
+        """Load only the plugins needed to run the given command line arguments.
+
+        Falls back to loading all plugins if no declared command is selected, e.g.
+        for `--help`, so every command is listed.
+        """
+
+        self.declare_plugins()
+
+        import_path, export_path, commands = parse_args(args)
+
+        if not commands or commands[0] not in self.declared_commands:
+            return self.load_plugins()
+
+        # Every argument naming a declared command selects that command, as commands
+        # in a pipeline follow the arguments of the previous command
+        module_names = [
+            *self.undeclared_plugins,
+            *(
+                self.declared_commands[arg]
+                for arg in commands
+                if arg in self.declared_commands
+            ),
+        ]
+
+        if import_path is not None and import_path.suffix in self.declared_importers:
+            module_names.append(self.declared_importers[import_path.suffix])
+
+        if export_path is not None and export_path.suffix in self.declared_exporters:
+            module_names.append(self.declared_exporters[export_path.suffix])
+
+        return [import_module(name) for name in dict.fromkeys(module_names)]
+
+
+def parse_args(
+    args: Sequence[str],
+) -> tuple[Path | None, Path | None, Sequence[str]]:
+    """Split command line arguments into the import path, the export path and the commands with their arguments."""
+
+    import_path: Path | None = None
+    export_path: Path | None = None
+    position = 0
+
+    while position < len(args):
+        arg = args[position]
+        option, separator, value = arg.partition("=")
+
+        if option in VALUE_OPTIONS:
+            if not separator:
+                position += 1
+                value = args[position] if position < len(args) else ""
+
+            if option == "--import":
+                import_path = Path(value)
+            elif option == "--export":
+                export_path = Path(value)
+        elif not arg.startswith("-"):
+            return import_path, export_path, args[position:]
+
+        position += 1
+
+    return import_path, export_path, []
+
+
+def import_file(
+    file: BinaryIO, importer: StreamImporter, cache: ModelCache | None
+) -> CFM:
+    """Import a model from a file, through the model cache if given."""
+
+    if cache is None:
+        return importer(file)
+
+    key = cache.key(file, f"{importer.__module__}.{importer.__qualname__}")
+    cfm = cache.load(key)
+
+    if cfm is None:
+        file.seek(0)
+        cfm = importer(file)
+        cache.store(key, cfm)
+
+    return cfm
+
+
+def normalize_format(format: str) -> str:
+    """File extension of a format given with or without the leading dot, e.g. `uvl` or `.uvl`."""
+
+    return format if format.startswith(".") else f".{format}"
+
+
+def split_pipeline(args: Sequence[str]) -> list[list[str]]:
+    """Split the commands of a pipeline and their arguments at each `then`."""
+
+    if not args:
+        return []
+
+    pipeline: list[list[str]] = [[]]
+
+    for arg in args:
+        if arg == PIPELINE_SEPARATOR:
+            pipeline.append([])
+        else:
+            pipeline[-1].append(arg)
+
+    return pipeline
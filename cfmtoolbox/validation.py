@@ -0,0 +1,438 @@
+from array import array
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from functools import partial
+from itertools import islice
+
+from cfmtoolbox.flat import FlatCFM, FlatConfiguration
+from cfmtoolbox.models import CFM, ConfigurationNode
+
+
+class ViolationKind(Enum):
+    ROOT = "root"
+    UNEXPECTED_CHILD = "unexpected-child"
+    GROUP_INSTANCE_CARDINALITY = "group-instance-cardinality"
+    GROUP_TYPE_CARDINALITY = "group-type-cardinality"
+    INSTANCE_CARDINALITY = "instance-cardinality"
+    CONSTRAINT = "constraint"
+
+
+@dataclass
+class Violation:
+    """Dataclass describing the first violation found in a configuration."""
+
+    kind: ViolationKind
+    """Kind of rule that is violated."""
+
+    message: str
+    """Human readable description of the violation."""
+
+    path: list[str]
+    """Values of the configuration nodes from the root to the offending node."""
+
+    feature: str | None = None
+    """Name of the feature whose cardinality or constraint is violated."""
+
+    count: int | None = None
+    """Number of instances or groups that violates the cardinality."""
+
+
+# Stack entries are the configuration node, its feature id and the parent entry,
+# which is only followed to reconstruct the path when a violation is reported
+_Entry = tuple[ConfigurationNode, int, "_Entry | None"]
+
+
+class ConfigurationValidator:
+    """Validator for configurations of one feature model.
+
+    The feature model is compiled once into a [FlatCFM][cfmtoolbox.flat.FlatCFM], so
+    validating many configurations does not repeat any per-model work. Each
+    configuration is walked once without recursion, the feature of every node is
+    parsed once, and the global feature counts for the constraints are collected in
+    the same walk.
+    """
+
+    def __init__(self, model: CFM | FlatCFM):
+        self.flat_cfm = model if isinstance(model, FlatCFM) else FlatCFM.from_cfm(model)
+
+    def validate(self, configuration: ConfigurationNode) -> Violation | None:
+        """Validate a configuration. Returns the first violation or None if it is valid."""
+
+        global_feature_count = array("q", [0]) * self.flat_cfm.feature_count
+        violation = self.validate_tree(configuration, global_feature_count)
+
+        if violation is not None:
+            return violation
+
+        return self.validate_constraints(global_feature_count, configuration.value)
+
+    def validate_batch(
+        self, configurations: Sequence[ConfigurationNode]
+    ) -> list[Violation | None]:
+        """Validate configurations. Returns the first violation or None for each configuration.
+
+        The constraints are checked for all configurations with a valid tree at once,
+        on the matrix of their global feature counts.
+        """
+
+        feature_count = self.flat_cfm.feature_count
+        verdicts: list[Violation | None] = []
+        tree_valid: list[int] = []
+        global_feature_counts: list[array[int]] = []
+
+        for position, configuration in enumerate(configurations):
+            global_feature_count = array("q", [0]) * feature_count
+            violation = self.validate_tree(configuration, global_feature_count)
+            verdicts.append(violation)
+
+            if violation is None:
+                tree_valid.append(position)
+                global_feature_counts.append(global_feature_count)
+
+        for position, global_feature_count, constraint in zip(
+            tree_valid,
+            global_feature_counts,
+            self.flat_cfm.first_violated_constraints(global_feature_counts),
+        ):
+            if constraint >= 0:
+                verdicts[position] = self.constraint_violation(
+                    constraint, global_feature_count, configurations[position].value
+                )
+
+        return verdicts
+
+    def validate_tree(
+        self, configuration: ConfigurationNode, global_feature_count: "array[int]"
+    ) -> Violation | None:
+        """Validate a configuration except for the constraints, counting the instances of each feature."""
+
+        flat_cfm = self.flat_cfm
+        names = flat_cfm.names
+
+        if feature_name(configuration.value) != names[0]:
+            return Violation(
+                ViolationKind.ROOT,
+                f"Root {configuration.value} is not an instance of {names[0]}",
+                [configuration.value],
+                names[0],
+            )
+
+        child_instance_count = array("q", [0]) * flat_cfm.feature_count
+        pending: list[_Entry] = [(configuration, 0, None)]
+
+        while pending:
+            entry = pending.pop()
+            node, feature_id, _ = entry
+            global_feature_count[feature_id] += 1
+
+            if not node.children:
+                path = partial(_path, entry)
+                violation = self.validate_group(feature_id, 0, 0, path)
+                if violation is not None:
+                    return violation
+
+                for child_id in flat_cfm.children(feature_id):
+                    violation = self.validate_instances(child_id, 0, path)
+                    if violation is not None:
+                        return violation
+
+                continue
+
+            children = flat_cfm.children(feature_id)
+            child_id = children.start
+            child_entries: list[_Entry] = []
+
+            # Instances of the same child feature have to be consecutive and appear
+            # in the same order as the child features in the feature model
+            for child in node.children:
+                name = feature_name(child.value)
+
+                while child_id < children.stop and names[child_id] != name:
+                    child_id += 1
+
+                if child_id == children.stop:
+                    return Violation(
+                        ViolationKind.UNEXPECTED_CHILD,
+                        f"{child.value} is not an expected child of {node.value}",
+                        _path(entry) + [child.value],
+                        names[feature_id],
+                    )
+
+                child_instance_count[child_id] += 1
+                child_entries.append((child, child_id, entry))
+
+            group_type_count = 0
+            for child_id in children:
+                if child_instance_count[child_id]:
+                    group_type_count += 1
+
+            path = partial(_path, entry)
+            violation = self.validate_group(
+                feature_id, len(node.children), group_type_count, path
+            )
+            if violation is not None:
+                return violation
+
+            for child_id in children:
+                count = child_instance_count[child_id]
+                child_instance_count[child_id] = 0
+
+                violation = self.validate_instances(child_id, count, path)
+                if violation is not None:
+                    return violation
+
+            pending.extend(reversed(child_entries))
+
+        return None
+
+    def validate_flat(self, configuration: FlatConfiguration) -> Violation | None:
+        """Validate a flat configuration. Returns the first violation or None if it is valid.
+
+        Nodes are checked in pre-order without parsing any values, and values are only
+        formatted to report a violation.
+        """
+
+        flat_cfm = self.flat_cfm
+        names = flat_cfm.names
+        feature_ids = configuration.feature_ids
+        subtree_ends = configuration.subtree_ends
+
+        if not configuration.node_count:
+            return Violation(
+                ViolationKind.ROOT,
+                f"Root instance of {names[0]} is missing",
+                [],
+                names[0],
+            )
+
+        if feature_ids[0] != 0:
+            return Violation(
+                ViolationKind.ROOT,
+                f"Root {configuration.value(0)} is not an instance of {names[0]}",
+                [configuration.value(0)],
+                names[0],
+            )
+
+        global_feature_count = array("q", [0]) * flat_cfm.feature_count
+        child_instance_count = array("q", [0]) * flat_cfm.feature_count
+
+        for node in range(configuration.node_count):
+            feature_id = feature_ids[node]
+            global_feature_count[feature_id] += 1
+
+            children = flat_cfm.children(feature_id)
+            previous_child_id = children.start
+            group_instance_count = 0
+            group_type_count = 0
+            child = node + 1
+            end = subtree_ends[node]
+
+            while child < end:
+                child_id = feature_ids[child]
+
+                if child_id < previous_child_id or child_id >= children.stop:
+                    return Violation(
+                        ViolationKind.UNEXPECTED_CHILD,
+                        f"{configuration.value(child)} is not an expected child of "
+                        f"{configuration.value(node)}",
+                        configuration.path(child),
+                        names[feature_id],
+                    )
+
+                if not child_instance_count[child_id]:
+                    group_type_count += 1
+
+                child_instance_count[child_id] += 1
+                group_instance_count += 1
+                previous_child_id = child_id
+                child = subtree_ends[child]
+
+            path = partial(configuration.path, node)
+            violation = self.validate_group(
+                feature_id, group_instance_count, group_type_count, path
+            )
+            if violation is not None:
+                return violation
+
+            for child_id in children:
+                count = child_instance_count[child_id]
+                child_instance_count[child_id] = 0
+
+                violation = self.validate_instances(child_id, count, path)
+                if violation is not None:
+                    return violation
+
+        return self.validate_constraints(global_feature_count, configuration.value(0))
+
+    def validate_group(
+        self,
+        feature_id: int,
+        group_instance_count: int,
+        group_type_count: int,
+        path: Callable[[], list[str]],
+    ) -> Violation | None:
+        flat_cfm = self.flat_cfm
+
+        # Leaf features have no group cardinalities to satisfy
+        if not flat_cfm.child_counts[feature_id]:
+            return None
+
+        if not flat_cfm.is_valid_cardinality(
+            flat_cfm.group_instance_cardinalities[feature_id], group_instance_count
+        ):
+            node_path = path()
+            return Violation(
+                ViolationKind.GROUP_INSTANCE_CARDINALITY,
+                f"{node_path[-1]} has {group_instance_count} child instances",
+                node_path,
+                flat_cfm.names[feature_id],
+                group_instance_count,
+            )
+
+        if not flat_cfm.is_valid_cardinality(
+            flat_cfm.group_type_cardinalities[feature_id], group_type_count
+        ):
+            node_path = path()
+            return Violation(
+                ViolationKind.GROUP_TYPE_CARDINALITY,
+                f"{node_path[-1]} has instances of {group_type_count} child features",
+                node_path,
+                flat_cfm.names[feature_id],
+                group_type_count,
+            )
+
+        return None
+
+    def validate_instances(
+        self, child_id: int, count: int, path: Callable[[], list[str]]
+    ) -> Violation | None:
+        flat_cfm = self.flat_cfm
+
+        if flat_cfm.is_valid_cardinality(
+            flat_cfm.instance_cardinalities[child_id], count
+        ):
+            return None
+
+        node_path = path()
+        return Violation(
+            ViolationKind.INSTANCE_CARDINALITY,
+            f"{node_path[-1]} has {count} instances of {flat_cfm.names[child_id]}",
+            node_path,
+            flat_cfm.names[child_id],
+            count,
+        )
+
+    def validate_constraints(
+        self, global_feature_count: "array[int]", root_value: str
+    ) -> Violation | None:
+        constraint = self.flat_cfm.first_violated_constraint(global_feature_count)
+
+        if constraint < 0:
+            return None
+
+        return self.constraint_violation(constraint, global_feature_count, root_value)
+
+    def constraint_violation(
+        self, constraint: int, global_feature_count: "array[int]", root_value: str
+    ) -> Violation:
+        flat_cfm = self.flat_cfm
+        constraint_type = (
+            "Require" if flat_cfm.constraint_requires[constraint] else "Exclude"
+        )
+        first_name = flat_cfm.names[flat_cfm.constraint_first_features[constraint]]
+        second_feature = flat_cfm.constraint_second_features[constraint]
+        second_name = flat_cfm.names[second_feature]
+
+        return Violation(
+            ViolationKind.CONSTRAINT,
+            f"{constraint_type} constraint {first_name} => {second_name} is violated",
+            [root_value],
+            second_name,
+            global_feature_count[second_feature],
+        )
+
+
+def validate_many(
+    model: CFM | FlatCFM,
+    configurations: Iterable[ConfigurationNode],
+    workers: int = 1,
+    chunk_size: int = 64,
+) -> Iterator[Violation | None]:
+    """Validate configurations of one feature model, yielding a verdict per configuration.
+
+    The feature model is compiled once. With more than one worker, the configurations
+    are sent to a process pool in chunks, and each worker compiles its validator once.
+    Verdicts are yielded in the order of the configurations as soon as their chunk is
+    done, and only a few chunks per worker are in flight at any time.
+    """
+
+    if workers < 1:
+        raise ValueError(f"Number of workers must be at least 1, not {workers}")
+
+    if chunk_size < 1:
+        raise ValueError(f"Chunk size must be at least 1, not {chunk_size}")
+
+    return _validate_chunks(
+        ConfigurationValidator(model), iter(configurations), workers, chunk_size
+    )
+
+
+def _validate_chunks(
+    validator: ConfigurationValidator,
+    configuration_iterator: Iterator[ConfigurationNode],
+    workers: int,
+    chunk_size: int,
+) -> Iterator[Violation | None]:
+    if workers == 1:
+        while chunk := list(islice(configuration_iterator, chunk_size)):
+            yield from validator.validate_batch(chunk)
+        return
+
+    pending: deque[Future[list[Violation | None]]] = deque()
+
+    with ProcessPoolExecutor(
+        workers, initializer=_initialize_worker, initargs=(validator.flat_cfm,)
+    ) as executor:
+        while chunk := list(islice(configuration_iterator, chunk_size)):
+            pending.append(executor.submit(_validate_chunk, chunk))
+
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+
+        while pending:
+            yield from pending.popleft().result()
+
+
+_worker_validator: ConfigurationValidator | None = None
+
+
+def _initialize_worker(flat_cfm: FlatCFM) -> None:
+    global _worker_validator
+    _worker_validator = ConfigurationValidator(flat_cfm)
+
+
+def _validate_chunk(
+    configurations: list[ConfigurationNode],
+) -> list[Violation | None]:
+    assert _worker_validator is not None
+    return _worker_validator.validate_batch(configurations)
+
+
+def feature_name(value: str) -> str:
+    """Extract the feature name from a configuration node value of the form `name#index`."""
+
+    return value.partition("#")[0]
+
+
+def _path(entry: _Entry | None) -> list[str]:
+    path = []
+
+    while entry is not None:
+        path.append(entry[0].value)
+        entry = entry[2]
+
+    path.reverse()
+    return path
@@ -0,0 +1,8 @@
+import pytest
+
+from cfmtoolbox.cache import CACHE_DIR_VARIABLE
+
+
+@pytest.fixture(autouse=True)
+def isolated_model_cache(monkeypatch, tmp_path_factory):
+    monkeypatch.setenv(CACHE_DIR_VARIABLE, str(tmp_path_factory.mktemp("cache")))
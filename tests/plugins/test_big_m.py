@@ -4,6 +4,7 @@ import pytest
 
 import cfmtoolbox.plugins.big_m as big_m
 from cfmtoolbox import app
+from cfmtoolbox.flat import FlatCFM
 from cfmtoolbox.models import CFM, Cardinality, Feature, Interval
 from cfmtoolbox.plugins.big_m import apply_big_m
 from cfmtoolbox.plugins.json_import import import_json
@@ -72,3 +73,19 @@ def test_replace_infinite_upper_bound_with_global_upper_bound():
     assert feature.children[0].instance_cardinality.intervals[-1].upper == 12
     assert feature.children[1].instance_cardinality.intervals[-1].upper == 12
     assert feature.children[2].instance_cardinality.intervals[-1].upper == 3
+
+
+def test_replace_last_upper_bound():
+    cardinality = Cardinality([Interval(0, 2), Interval(4, None)])
+    assert big_m.replace_last_upper_bound(cardinality, 7) == Cardinality(
+        [Interval(0, 2), Interval(4, 7)]
+    )
+    assert cardinality.intervals[-1].upper is None
+
+
+def test_get_flat_global_upper_bound(model: CFM):
+    flat_model = FlatCFM.from_cfm(model)
+    assert big_m.get_flat_global_upper_bound(flat_model) == 12
+    assert big_m.get_flat_global_upper_bound(flat_model) == (
+        big_m.get_global_upper_bound(model.root)
+    )
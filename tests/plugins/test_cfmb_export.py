@@ -0,0 +1,72 @@
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+
+from cfmtoolbox import CFM, Cardinality, Feature, Interval, structurally_equal
+from cfmtoolbox.plugins import cfmb_export
+from cfmtoolbox.plugins.cfmb_import import HEADER, MAGIC, VERSION, import_cfmb
+from cfmtoolbox.plugins.json_export import export_json
+from cfmtoolbox.plugins.json_import import import_json
+from cfmtoolbox.toolbox import CFMToolbox
+
+
+def test_plugin_can_be_loaded():
+    app = CFMToolbox()
+    assert cfmb_export in app.load_plugins()
+
+
+def test_export_cfmb_writes_header():
+    root = Feature(
+        name="sandwich",
+        instance_cardinality=Cardinality([Interval(1, 1)]),
+        group_type_cardinality=Cardinality([]),
+        group_instance_cardinality=Cardinality([]),
+        parent=None,
+        children=[],
+    )
+
+    output = cfmb_export.export_cfmb(CFM(root=root, constraints=[]))
+
+    assert HEADER.unpack_from(output) == (MAGIC, VERSION, 0, 1, 2, 1, 0, 8)
+    assert output.endswith(b"sandwich")
+
+
+@pytest.mark.parametrize(
+    "path", ["tests/data/sandwich.json", "tests/data/sandwich_bound.json"]
+)
+def test_export_cfmb_round_trips_json_models(path: str):
+    cfm = import_json(Path(path).read_bytes())
+
+    imported_cfm = import_cfmb(cfmb_export.export_cfmb(cfm))
+
+    assert structurally_equal(imported_cfm, cfm)
+    assert export_json(imported_cfm) == export_json(cfm)
+
+
+def test_export_cfmb_keeps_unbounded_and_unnormalized_cardinalities():
+    root = Feature(
+        name="sandwich",
+        instance_cardinality=Cardinality([Interval(1, 1)]),
+        group_type_cardinality=Cardinality([Interval(2, None), Interval(0, 1)]),
+        group_instance_cardinality=Cardinality([Interval(0, None)]),
+        parent=None,
+        children=[],
+    )
+    cfm = CFM(root=root, constraints=[])
+
+    imported_cfm = import_cfmb(cfmb_export.export_cfmb(cfm))
+
+    assert imported_cfm.root.group_type_cardinality == root.group_type_cardinality
+    assert imported_cfm.root.group_instance_cardinality == Cardinality(
+        [Interval(0, None)]
+    )
+
+
+def test_write_cfmb_matches_export_cfmb():
+    cfm = import_json(Path("tests/data/sandwich.json").read_bytes())
+    buffer = BytesIO()
+
+    cfmb_export.write_cfmb(cfm, buffer)
+
+    assert buffer.getvalue() == cfmb_export.export_cfmb(cfm)
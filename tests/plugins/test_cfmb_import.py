@@ -0,0 +1,113 @@
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+
+from cfmtoolbox import CFM, structurally_equal
+from cfmtoolbox.plugins import cfmb_import
+from cfmtoolbox.plugins.cfmb_export import export_cfmb
+from cfmtoolbox.plugins.cfmb_import import HEADER
+from cfmtoolbox.plugins.json_import import import_json
+from cfmtoolbox.toolbox import CFMToolbox
+
+
+@pytest.fixture
+def model():
+    return import_json(Path("tests/data/sandwich.json").read_bytes())
+
+
+def test_plugin_can_be_loaded():
+    app = CFMToolbox()
+    assert cfmb_import in app.load_plugins()
+
+
+def test_read_cfmb_maps_files(model, tmp_path):
+    path = tmp_path / "sandwich.cfmb"
+    path.write_bytes(export_cfmb(model))
+
+    with path.open("rb") as file:
+        cfm = cfmb_import.read_cfmb(file)
+
+    assert len(cfm.features) == 12
+    assert cfm.root.name == "sandwich"
+    assert structurally_equal(cfm, model)
+
+
+def test_read_cfmb_reads_streams_without_file_descriptor(model):
+    cfm = cfmb_import.read_cfmb(BytesIO(export_cfmb(model)))
+    assert structurally_equal(cfm, model)
+
+
+def test_read_cfmb_rejects_empty_files(tmp_path):
+    path = tmp_path / "empty.cfmb"
+    path.write_bytes(b"")
+
+    with path.open("rb") as file, pytest.raises(ValueError, match="truncated"):
+        cfmb_import.read_cfmb(file)
+
+
+@pytest.mark.parametrize(
+    ["data", "message"],
+    [
+        (b"CFMB", "truncated"),
+        (HEADER.pack(b"JSON", 1, 0, 1, 0, 0, 0, 0), "Not a CFMB file"),
+        (HEADER.pack(b"CFMB", 2, 0, 1, 0, 0, 0, 0), "Unsupported CFMB version: 2"),
+        (HEADER.pack(b"CFMB", 1, 0, 0, 0, 0, 0, 0), "no root feature"),
+        (HEADER.pack(b"CFMB", 1, 0, 1, 1, 0, 0, 0), "truncated"),
+    ],
+)
+def test_parse_cfmb_rejects_invalid_files(data: bytes, message: str):
+    with pytest.raises(ValueError, match=message):
+        cfmb_import.parse_cfmb(data)
+
+
+def test_parse_cfmb_rejects_features_stored_before_their_parent(model):
+    data = bytearray(export_cfmb(model))
+    parents_offset = HEADER.size + 8 * (len(model.features) + 1)
+    data[parents_offset + 8 : parents_offset + 16] = (5).to_bytes(8, "little")
+
+    with pytest.raises(ValueError, match="Feature 1 has an invalid parent: 5"):
+        cfmb_import.parse_cfmb(bytes(data))
+
+
+def corrupt(model: CFM, section: int, index: int, value: int) -> bytes:
+    """Export the model and overwrite an integer in one of its sections."""
+
+    data = bytearray(export_cfmb(model))
+    (_, _, _, _, cardinality_count, interval_count, _, _) = HEADER.unpack_from(data)
+    feature_count = len(model.features)
+    section_lengths = [
+        feature_count + 1,
+        feature_count,
+        feature_count,
+        feature_count,
+        feature_count,
+        cardinality_count + 1,
+        interval_count,
+        interval_count,
+    ]
+    offset = HEADER.size + 8 * (sum(section_lengths[:section]) + index)
+    data[offset : offset + 8] = value.to_bytes(8, "little", signed=True)
+    return bytes(data)
+
+
+@pytest.mark.parametrize(
+    ["section", "index", "value", "message"],
+    [
+        (0, 1, -3, "invalid name offset: -3"),
+        (0, 1, 10**6, "invalid name offset: 1000000"),
+        (2, 0, -1, "invalid cardinality index: -1"),
+        (3, 1, 10**6, "invalid cardinality index: 1000000"),
+        (5, 1, -2, "invalid interval offset: -2"),
+        (8, 1, -1, "invalid feature index: -1"),
+        (8, 3, 10**6, "invalid feature index: 1000000"),
+        (8, 4, -5, "invalid cardinality index: -5"),
+    ],
+)
+def test_parse_cfmb_rejects_invalid_indices(
+    model: CFM, section: int, index: int, value: int, message: str
+):
+    assert model.constraints
+
+    with pytest.raises(ValueError, match=message):
+        cfmb_import.parse_cfmb(corrupt(model, section, index, value))
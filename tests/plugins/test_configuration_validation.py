@@ -0,0 +1,141 @@
+import json
+from dataclasses import asdict
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+import cfmtoolbox.plugins.configuration_validation as configuration_validation_plugin
+from cfmtoolbox import app
+from cfmtoolbox.models import CFM, ConfigurationNode
+from cfmtoolbox.plugins.configuration_validation import (
+    format_verdict,
+    parse_configuration,
+    read_configurations,
+    validate_configurations,
+)
+from cfmtoolbox.plugins.json_import import import_json
+from cfmtoolbox.validation import Violation, ViolationKind
+
+
+@pytest.fixture
+def model():
+    return import_json(Path("tests/data/sandwich_bound.json").read_bytes())
+
+
+@pytest.fixture
+def configurations():
+    return [
+        ConfigurationNode(
+            "sandwich#0",
+            [
+                ConfigurationNode("bread#0", [ConfigurationNode("wheat#0", [])]),
+                ConfigurationNode("bread#1", [ConfigurationNode("wheat#1", [])]),
+            ],
+        ),
+        ConfigurationNode("sandwich#0", []),
+    ]
+
+
+def test_plugin_can_be_loaded():
+    assert configuration_validation_plugin in app.load_plugins()
+
+
+def test_parse_configuration(configurations: list[ConfigurationNode]):
+    assert parse_configuration(asdict(configurations[0])) == configurations[0]
+
+
+def test_parse_configuration_rejects_invalid_nodes():
+    with pytest.raises(TypeError, match="value must be a string"):
+        parse_configuration({"value": 1, "children": []})
+
+    with pytest.raises(TypeError, match="children must be a list"):
+        parse_configuration({"value": "sandwich#0", "children": None})
+
+    with pytest.raises(TypeError, match="missing children"):
+        parse_configuration({"value": "sandwich#0"})
+
+    with pytest.raises(TypeError, match="missing value, children"):
+        parse_configuration({"value": "sandwich#0", "children": [{}]})
+
+
+def test_read_configurations_from_json(
+    tmp_path: Path, configurations: list[ConfigurationNode]
+):
+    path = tmp_path / "configurations.json"
+    path.write_text(json.dumps([asdict(c) for c in configurations]))
+
+    assert list(read_configurations(path)) == configurations
+
+
+def test_read_configurations_from_jsonl(
+    tmp_path: Path, configurations: list[ConfigurationNode]
+):
+    path = tmp_path / "configurations.jsonl"
+    path.write_text("\n".join(json.dumps(asdict(c)) for c in configurations) + "\n")
+
+    assert list(read_configurations(path)) == configurations
+
+
+def test_format_verdict():
+    assert format_verdict(0, None) == {"configuration": 0, "valid": True}
+    assert format_verdict(
+        1,
+        Violation(
+            ViolationKind.INSTANCE_CARDINALITY,
+            "sandwich#0 has 0 instances of bread",
+            ["sandwich#0"],
+            "bread",
+            0,
+        ),
+    ) == {
+        "configuration": 1,
+        "valid": False,
+        "violation": {
+            "kind": "instance-cardinality",
+            "message": "sandwich#0 has 0 instances of bread",
+            "path": ["sandwich#0"],
+            "feature": "bread",
+            "count": 0,
+        },
+    }
+
+
+def test_validate_configurations(
+    tmp_path: Path, model: CFM, configurations: list[ConfigurationNode], capsys
+):
+    path = tmp_path / "configurations.json"
+    path.write_text(json.dumps([asdict(c) for c in configurations]))
+
+    assert validate_configurations(model, path) is model
+
+    captured = capsys.readouterr()
+    verdicts = [json.loads(line) for line in captured.out.splitlines()]
+    assert [verdict["valid"] for verdict in verdicts] == [
+        configurations[0].validate(model),
+        False,
+    ]
+    assert "Validated 2 configurations" in captured.err
+
+
+@pytest.mark.parametrize("option", ["--workers", "--chunk-size"])
+def test_validate_configurations_rejects_non_positive_sizes(tmp_path: Path, option):
+    path = tmp_path / "configurations.json"
+    path.write_text("[]")
+
+    result = CliRunner(mix_stderr=False).invoke(
+        app.typer,
+        [
+            "--import",
+            "tests/data/sandwich_bound.json",
+            "--no-cache",
+            "validate-configurations",
+            "--configurations",
+            str(path),
+            option,
+            "0",
+        ],
+    )
+
+    assert result.exit_code == 2
+    assert "Validated" not in result.stderr
@@ -5,7 +5,13 @@ from xml.etree.ElementTree import Element, SubElement
 import pytest
 
 import cfmtoolbox.plugins.featureide_import as featureide_import_plugin
-from cfmtoolbox.models import Cardinality, Constraint, Feature, Interval
+from cfmtoolbox.models import (
+    Cardinality,
+    Constraint,
+    Feature,
+    Interval,
+    structurally_equal,
+)
 from cfmtoolbox.plugins.featureide_import import (
     TooComplexConstraintError,
     import_featureide,
@@ -15,7 +21,7 @@ from cfmtoolbox.plugins.featureide_import import (
     parse_formula_value_and_feature,
     parse_group_cardinality,
     parse_instance_cardinality,
-    parse_root,
+    read_featureide,
 )
 from cfmtoolbox.toolbox import CFMToolbox
 
@@ -197,14 +203,10 @@ def test_parse_feature_sets_relatives_correctly():
     assert len(feature.children[2].children) == 2
 
 
-def test_parse_root():
+def test_parse_cfm_indexes_all_features(capsys):
     tree = ET.parse("tests/data/sandwich.xml")
-
-    struct = tree.getroot().find("struct")
-    assert struct is not None
-
-    root_struct = struct[0]
-    root_feature, feature_list = parse_root(root_struct)
+    cfm = parse_cfm(tree.getroot())
+    root_feature, feature_list = cfm.root, cfm.features
 
     assert root_feature.name == "Sandwich"
     assert len(feature_list) == 11
@@ -229,14 +231,14 @@ def test_parse_formula_value_and_feature():
         "Bread", Cardinality([]), Cardinality([]), Cardinality([]), None, []
     )
 
-    value, formula = parse_formula_value_and_feature(root, [feature])
+    value, formula = parse_formula_value_and_feature(root, {"Bread": feature})
     assert (value, formula) == (True, feature)
 
 
 def test_parse_formula_value_and_feature_raises_type_error_on_no_valid_feature_name():
     root = Element("var")
     with pytest.raises(TypeError, match="No valid feature name found in formula"):
-        parse_formula_value_and_feature(root, [])
+        parse_formula_value_and_feature(root, {})
 
 
 def test_parse_formula_value_and_feature_can_parse_more_complex_formula_with_even_nots():
@@ -248,7 +250,7 @@ def test_parse_formula_value_and_feature_can_parse_more_complex_formula_with_eve
         "Bread", Cardinality([]), Cardinality([]), Cardinality([]), None, []
     )
 
-    formula = parse_formula_value_and_feature(root, [feature])
+    formula = parse_formula_value_and_feature(root, {"Bread": feature})
     assert formula == (True, feature)
 
 
@@ -261,7 +263,7 @@ def test_parse_formula_value_and_feature_can_parse_more_complex_formula_with_odd
         "Bread", Cardinality([]), Cardinality([]), Cardinality([]), None, []
     )
 
-    formula = parse_formula_value_and_feature(root, [feature])
+    formula = parse_formula_value_and_feature(root, {"Bread": feature})
     assert formula == (False, feature)
 
 
@@ -271,13 +273,13 @@ def type_parse_formula_value_and_feature_raises_too_complex_constraint_error_wit
     SubElement(root, "var")
 
     with pytest.raises(TooComplexConstraintError):
-        parse_formula_value_and_feature(root, [])
+        parse_formula_value_and_feature(root, {})
 
 
 def test_parse_formula_value_and_feature_raises_too_complex_contraint_error_without_subelement():
     root = Element("disj")
     with pytest.raises(TooComplexConstraintError):
-        parse_formula_value_and_feature(root, [])
+        parse_formula_value_and_feature(root, {})
 
 
 @pytest.mark.parametrize(
@@ -288,14 +290,14 @@ def test_parse_constraints_can_parse_without_constraints(
     constraints: Element,
     expectation: tuple[list[Constraint], list[Constraint], list[int]],
 ):
-    assert parse_constraints(constraints, []) == expectation
+    assert parse_constraints(constraints, {}) == expectation
 
 
 def test_parse_constraints_raises_type_error_on_no_valid_rule_tag():
     constraints = Element("constraints")
     SubElement(constraints, "unknown")
     with pytest.raises(TypeError, match="Unknown constraint tag: unknown"):
-        parse_constraints(constraints, [])
+        parse_constraints(constraints, {})
 
 
 def test_parse_constraints_raises_type_error_on_no_valid_constraint_structure():
@@ -304,7 +306,7 @@ def test_parse_constraints_raises_type_error_on_no_valid_constraint_structure():
     with pytest.raises(
         TypeError, match="No valid constraint rule found in constraints"
     ):
-        parse_constraints(constraints, [])
+        parse_constraints(constraints, {})
 
 
 def test_parse_constraint_can_parse_constraint_with_one_require_rule():
@@ -317,7 +319,7 @@ def test_parse_constraint_can_parse_constraint_with_one_require_rule():
         "Bread", Cardinality([]), Cardinality([]), Cardinality([]), None, []
     )
 
-    constraints, eliminated = parse_constraints(constraints_element, [feature])
+    constraints, eliminated = parse_constraints(constraints_element, {"Bread": feature})
     assert len(eliminated) == 0
     assert len(constraints) == 1
     assert constraints[0] == Constraint(
@@ -340,7 +342,7 @@ def test_parse_constraint_can_parse_constraint_with_one_exclude_rule():
         "Bread", Cardinality([]), Cardinality([]), Cardinality([]), None, []
     )
 
-    constraints, eliminated = parse_constraints(constraints_element, [feature])
+    constraints, eliminated = parse_constraints(constraints_element, {"Bread": feature})
     assert len(eliminated) == 0
     assert len(constraints) == 1
     assert constraints[0] == Constraint(
@@ -370,7 +372,7 @@ def test_parse_constraint_can_parse_constraint_with_both_formulas_negative():
     )
 
     constraints, eliminated = parse_constraints(
-        constraints_element, [bread_feature, cheese_feature]
+        constraints_element, {"Bread": bread_feature, "Cheese": cheese_feature}
     )
     assert len(eliminated) == 0
     assert len(constraints) == 1
@@ -388,7 +390,7 @@ def test_parse_constraint_can_parse_constraint_with_elimination():
     rule = SubElement(constraints_element, "rule")
     SubElement(rule, "conj")
 
-    constraints, eliminated = parse_constraints(constraints_element, [])
+    constraints, eliminated = parse_constraints(constraints_element, {})
     assert len(eliminated) == 1
     assert len(constraints) == 0
     assert eliminated == [rule]
@@ -488,3 +490,12 @@ def test_parse_cfm_reports_missing_struct():
     root = Element("root")
     with pytest.raises(TypeError, match="No valid Feature structure found in XML file"):
         parse_cfm(root)
+
+
+def test_read_featureide_streams_the_file():
+    path = Path("tests/data/sandwich.xml")
+
+    with path.open("rb") as file:
+        cfm = read_featureide(file)
+
+    assert structurally_equal(cfm, import_featureide(path.read_bytes()))
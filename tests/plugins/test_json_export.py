@@ -1,4 +1,5 @@
 import json
+from io import BytesIO
 
 from cfmtoolbox import CFM, Cardinality, Constraint, Feature, Interval
 from cfmtoolbox.plugins import json_export
@@ -170,3 +171,16 @@ def test_serialize_constraint():
         "second_feature_name": "sauce",
         "second_cardinality": {"intervals": []},
     }
+
+
+def test_write_json_streams_the_exported_json():
+    cfm = CFM(
+        Feature("Cheese", Cardinality([]), Cardinality([]), Cardinality([]), None, []),
+        [],
+    )
+    file = BytesIO()
+
+    json_export.write_json(cfm, file)
+
+    assert file.getvalue() == json_export.export_json(cfm)
+    assert json.loads(file.getvalue())["root"]["name"] == "Cheese"
@@ -117,47 +117,53 @@ def test_parse_cfm_parses_root_and_constraints():
     assert len(cfm.constraints) == 3
 
 
-def test_parse_root_returns_all_features_in_the_tree():
-    root, features = json_import.parse_root(
+def test_parse_cfm_indexes_all_features_in_the_tree():
+    cfm = json_import.parse_cfm(
         {
-            "name": "sandwich",
-            "instance_cardinality": {"intervals": []},
-            "group_type_cardinality": {"intervals": []},
-            "group_instance_cardinality": {"intervals": []},
-            "children": [
-                {
-                    "name": "meat",
-                    "instance_cardinality": {"intervals": []},
-                    "group_type_cardinality": {"intervals": []},
-                    "group_instance_cardinality": {"intervals": []},
-                    "children": [],
-                },
-                {
-                    "name": "bread",
-                    "instance_cardinality": {"intervals": []},
-                    "group_type_cardinality": {"intervals": []},
-                    "group_instance_cardinality": {"intervals": []},
-                    "children": [
-                        {
-                            "name": "sourdough",
-                            "instance_cardinality": {"intervals": []},
-                            "group_type_cardinality": {"intervals": []},
-                            "group_instance_cardinality": {"intervals": []},
-                            "children": [],
-                        },
-                        {
-                            "name": "wheat",
-                            "instance_cardinality": {"intervals": []},
-                            "group_type_cardinality": {"intervals": []},
-                            "group_instance_cardinality": {"intervals": []},
-                            "children": [],
-                        },
-                    ],
-                },
-            ],
+            "root": {
+                "name": "sandwich",
+                "instance_cardinality": {"intervals": []},
+                "group_type_cardinality": {"intervals": []},
+                "group_instance_cardinality": {"intervals": []},
+                "children": [
+                    {
+                        "name": "meat",
+                        "instance_cardinality": {"intervals": []},
+                        "group_type_cardinality": {"intervals": []},
+                        "group_instance_cardinality": {"intervals": []},
+                        "children": [],
+                    },
+                    {
+                        "name": "bread",
+                        "instance_cardinality": {"intervals": []},
+                        "group_type_cardinality": {"intervals": []},
+                        "group_instance_cardinality": {"intervals": []},
+                        "children": [
+                            {
+                                "name": "sourdough",
+                                "instance_cardinality": {"intervals": []},
+                                "group_type_cardinality": {"intervals": []},
+                                "group_instance_cardinality": {"intervals": []},
+                                "children": [],
+                            },
+                            {
+                                "name": "wheat",
+                                "instance_cardinality": {"intervals": []},
+                                "group_type_cardinality": {"intervals": []},
+                                "group_instance_cardinality": {"intervals": []},
+                                "children": [],
+                            },
+                        ],
+                    },
+                ],
+            },
+            "constraints": [],
         }
     )
 
+    root = cfm.root
+    features = cfm.features
+
     assert root.name == "sandwich"
     assert len(features) == 5
     assert features[0].name == "sandwich"
@@ -428,7 +434,7 @@ def test_parse_interval_can_parse_unbound_intervals():
 )
 def test_parse_constraint_requires_constraint_to_be_an_object(constraint, expectation):
     with expectation:
-        json_import.parse_constraint(constraint, [])
+        json_import.parse_constraint(constraint, {})
 
 
 @pytest.mark.parametrize(
@@ -449,7 +455,7 @@ def test_parse_constraint_requires_constraint_to_be_an_object(constraint, expect
 )
 def test_parse_constraint_requires_require_to_be_a_boolean(require, expectation):
     with expectation:
-        json_import.parse_constraint({"require": require}, [])
+        json_import.parse_constraint({"require": require}, {})
 
 
 @pytest.mark.parametrize(
@@ -508,7 +514,7 @@ def test_parse_constraint_requires_first_feature_name_to_be_a_string(
 ):
     with expectation:
         json_import.parse_constraint(
-            {"require": True, "first_feature_name": first_feature_name}, []
+            {"require": True, "first_feature_name": first_feature_name}, {}
         )
 
 
@@ -572,7 +578,7 @@ def test_parse_constraint_requires_second_feature_name_to_be_a_string(
                 "second_feature_name": second_feature_name,
                 "second_cardinality": {"intervals": []},
             },
-            [],
+            {},
         )
 
 
@@ -604,7 +610,7 @@ def test_parse_constraint_returns_constraint_with_inserted_features():
             "second_feature_name": "feature2",
             "second_cardinality": {"intervals": []},
         },
-        features,
+        {feature.name: feature for feature in features},
     )
 
     assert constraint == Constraint(
@@ -637,11 +643,11 @@ def test_parse_constraint_requires_named_features_to_exist():
                 "second_feature_name": "feature2",
                 "second_cardinality": {"intervals": []},
             },
-            features,
+            {feature.name: feature for feature in features},
         )
 
 
-def test_require_feature_returns_first_match():
+def test_require_feature_returns_named_feature():
     feature1 = Feature(
         name="feature1",
         instance_cardinality=Cardinality(intervals=[]),
@@ -660,7 +666,9 @@ def test_require_feature_returns_first_match():
         children=[],
     )
 
-    feature = json_import.require_feature("feature2", [feature1, feature2])
+    feature = json_import.require_feature(
+        "feature2", {"feature1": feature1, "feature2": feature2}
+    )
     assert feature == feature2
 
 
@@ -675,4 +683,4 @@ def test_require_feature_raises_error_when_there_is_no_match():
     )
 
     with pytest.raises(ValueError, match="Feature feature3 not found"):
-        json_import.require_feature("feature3", [feature1])
+        json_import.require_feature("feature3", {"feature1": feature1})
@@ -1,3 +1,5 @@
+import json
+import random
 from pathlib import Path
 
 import pytest
@@ -5,6 +7,7 @@ import typer
 
 import cfmtoolbox.plugins.one_wise_sampling as one_wise_sampling_plugin
 from cfmtoolbox import app
+from cfmtoolbox.generation import generate_cfm
 from cfmtoolbox.models import CFM, Cardinality, Feature, Interval
 from cfmtoolbox.plugins.json_import import import_json
 from cfmtoolbox.plugins.one_wise_sampling import OneWiseSampler, one_wise_sampling
@@ -163,3 +166,42 @@ def test_generate_random_children_with_random_cardinality_with_assignment(
         assert child.instance_cardinality.is_valid_cardinality(
             random_instance_cardinality
         )
+
+
+def test_one_wise_sampling_is_reproducible_with_seed(model: CFM, capsys):
+    one_wise_sampling(model, seed=7)
+    first = capsys.readouterr().out
+    one_wise_sampling(model, seed=7)
+    second = capsys.readouterr().out
+
+    assert first == second
+
+
+def test_one_wise_sampling_rejects_seed_for_secure_generator(model: CFM):
+    with pytest.raises(typer.BadParameter, match="cannot be seeded"):
+        one_wise_sampling(model, seed=7, secure=True)
+
+
+def test_one_wise_sampling_writes_json_lines(model: CFM, capsys):
+    one_wise_sampling(model, seed=3, jsonl=True)
+    lines = capsys.readouterr().out.splitlines()
+
+    one_wise_sampling(model, seed=3)
+    assert [json.loads(line) for line in lines] == json.loads(capsys.readouterr().out)
+
+
+def test_constraint_propagation_raises_the_acceptance_rate():
+    model = generate_cfm(100, clone_probability=0.1, constraint_density=0.05, seed=2)
+    acceptance_rates = []
+
+    for propagate_constraints in (False, True):
+        one_wise_sampler = OneWiseSampler(
+            model, random.Random(0), propagate_constraints=propagate_constraints
+        )
+        samples = one_wise_sampler.one_wise_sampling()
+
+        assert all(sample.validate(model) for sample in samples)
+        assert one_wise_sampler.pruned <= one_wise_sampler.retries
+        acceptance_rates.append(one_wise_sampler.acceptance_rate)
+
+    assert acceptance_rates[1] > acceptance_rates[0]
@@ -1,3 +1,6 @@
+import json
+import random
+import secrets
 from pathlib import Path
 
 import pytest
@@ -5,9 +8,11 @@ import typer
 
 import cfmtoolbox.plugins.random_sampling as random_sampling_plugin
 from cfmtoolbox import app
+from cfmtoolbox.generation import generate_cfm
 from cfmtoolbox.models import CFM, Cardinality, Feature, Interval
 from cfmtoolbox.plugins.json_import import import_json
 from cfmtoolbox.plugins.random_sampling import (
+    SAMPLES_PER_STREAM,
     RandomSampler,
     random_sampling,
 )
@@ -23,11 +28,6 @@ def unbound_model():
     return import_json(Path("tests/data/sandwich.json").read_bytes())
 
 
-@pytest.fixture
-def random_sampler(model: CFM):
-    return RandomSampler(model)
-
-
 def test_plugin_can_be_loaded():
     assert random_sampling_plugin in app.load_plugins()
 
@@ -54,93 +54,33 @@ def test_random_sampling_with_loaded_model(model: CFM):
     assert feature_node.validate(model)
 
 
-def test_get_random_cardinality(random_sampler: RandomSampler):
-    cardinality = Cardinality([Interval(1, 10), Interval(20, 30), Interval(40, 50)])
-    assert cardinality.is_valid_cardinality(
-        random_sampler.get_random_cardinality(cardinality)
-    )
-
-
-def test_get_random_cardinality_without_zero(random_sampler: RandomSampler):
-    cardinality = Cardinality([Interval(1, 10), Interval(20, 30), Interval(40, 50)])
-    random_cardinality = random_sampler.get_random_cardinality_without_zero(cardinality)
-    assert cardinality.is_valid_cardinality(random_cardinality)
-    assert random_cardinality != 0
-
-
-def test_get_sorted_sample(random_sampler: RandomSampler):
-    feature_list = [
-        Feature(
-            "Cheddar",
-            Cardinality([Interval(0, 1)]),
-            Cardinality([]),
-            Cardinality([]),
-            None,
-            [],
-        ),
-        Feature(
-            "Swiss",
-            Cardinality([Interval(0, 2)]),
-            Cardinality([]),
-            Cardinality([]),
-            None,
-            [],
-        ),
-        Feature(
-            "Gouda",
-            Cardinality([Interval(0, 3)]),
-            Cardinality([]),
-            Cardinality([]),
-            None,
-            [],
-        ),
-    ]
-    sample = random_sampler.get_sorted_sample(feature_list, 2)
-    assert len(sample) == 2
-    assert (
-        (sample[0].name == "Cheddar" and sample[1].name == "Swiss")
-        or (sample[0].name == "Swiss" and sample[1].name == "Gouda")
-        or (sample[0].name == "Cheddar" and sample[1].name == "Gouda")
-    )
-
-
-def test_get_required_children(random_sampler: RandomSampler):
+def test_generate_random_children_with_random_cardinality():
     feature = Feature(
-        "Cheese",
-        Cardinality([]),
-        Cardinality([]),
+        "Cheese-mix",
         Cardinality([]),
+        Cardinality([Interval(1, 3)]),
+        Cardinality([Interval(3, 3)]),
         None,
         [
             Feature(
-                "Milk",
-                Cardinality([Interval(1, 1)]),
+                "Cheddar",
+                Cardinality([Interval(0, 1)]),
                 Cardinality([]),
                 Cardinality([]),
                 None,
                 [],
-            )
-        ],
-    )
-    assert len(random_sampler.get_required_children(feature)) == 1
-    feature = Feature(
-        "Cheese",
-        Cardinality([]),
-        Cardinality([]),
-        Cardinality([]),
-        None,
-        [
+            ),
             Feature(
-                "Milk",
-                Cardinality([Interval(2, 2)]),
+                "Swiss",
+                Cardinality([Interval(0, 2)]),
                 Cardinality([]),
                 Cardinality([]),
                 None,
                 [],
             ),
             Feature(
-                "Bread",
-                Cardinality([Interval(1, 4)]),
+                "Gouda",
+                Cardinality([Interval(0, 3)]),
                 Cardinality([]),
                 Cardinality([]),
                 None,
@@ -148,174 +88,207 @@ def test_get_required_children(random_sampler: RandomSampler):
             ),
         ],
     )
-    assert len(random_sampler.get_required_children(feature)) == 2
-    feature = Feature(
-        "Cheese", Cardinality([]), Cardinality([]), Cardinality([]), None, []
-    )
-    assert len(random_sampler.get_required_children(feature)) == 0
-    feature = Feature(
-        "Cheese",
-        Cardinality([]),
-        Cardinality([]),
-        Cardinality([]),
-        None,
-        [
-            Feature(
-                "Milk",
-                Cardinality([Interval(0, 5)]),
-                Cardinality([]),
-                Cardinality([]),
-                None,
-                [],
+    random_sampler = RandomSampler(CFM(feature, []))
+
+    for _ in range(50):
+        children, summed_random_instance_cardinality = (
+            random_sampler.generate_random_children_with_random_cardinality(feature)
+        )
+        for child, random_instance_cardinality in children:
+            assert child.instance_cardinality.is_valid_cardinality(
+                random_instance_cardinality
             )
-        ],
-    )
-    assert len(random_sampler.get_required_children(feature)) == 0
+        assert summed_random_instance_cardinality == 3
 
 
-def test_get_optional_children(random_sampler: RandomSampler):
-    feature = Feature(
-        "Cheese",
-        Cardinality([]),
+def test_random_flat_sampling_with_loaded_model(model: CFM):
+    random_sampler = RandomSampler(model)
+    sample = random_sampler.random_flat_sampling()
+
+    assert random_sampler.validator.validate_flat(sample) is None
+    assert sample.to_configuration_node().validate(model)
+
+
+def test_random_sampling_is_reproducible_with_seed(model: CFM, capsys):
+    random_sampling(model, 5, seed=7)
+    first = capsys.readouterr().out
+    random_sampling(model, 5, seed=7)
+    second = capsys.readouterr().out
+
+    assert first == second
+
+
+def test_random_sampling_rejects_seed_for_secure_generator(model: CFM):
+    with pytest.raises(typer.BadParameter, match="cannot be seeded"):
+        random_sampling(model, seed=7, secure=True)
+
+
+def test_random_sampler_uses_given_random_generator(model: CFM):
+    samples = [
+        RandomSampler(model, random.Random(3)).random_flat_sampling().to_dict()
+        for _ in range(2)
+    ]
+
+    assert samples[0] == samples[1]
+
+
+def leaf(name: str, lower: int, upper: int) -> Feature:
+    return Feature(
+        name,
+        Cardinality([Interval(lower, upper)]),
         Cardinality([]),
         Cardinality([]),
         None,
-        [
-            Feature(
-                "Milk",
-                Cardinality([Interval(0, 1)]),
-                Cardinality([]),
-                Cardinality([]),
-                None,
-                [],
-            ),
-            Feature(
-                "Bread",
-                Cardinality([Interval(1, 4)]),
-                Cardinality([]),
-                Cardinality([]),
-                None,
-                [],
-            ),
-        ],
+        [],
     )
-    assert len(random_sampler.get_optional_children(feature)) == 1
-    feature = Feature(
-        "Cheese",
-        Cardinality([]),
-        Cardinality([]),
-        Cardinality([]),
+
+
+def test_random_sampler_draws_tight_group_cardinalities_without_retrying():
+    children = [leaf(f"child{i}", 0, 40) for i in range(20)]
+    root = Feature(
+        "root",
+        Cardinality([Interval(1, 1)]),
+        Cardinality([Interval(2, 2)]),
+        Cardinality([Interval(79, 80)]),
         None,
-        [
-            Feature(
-                "Milk",
-                Cardinality([Interval(0, 2)]),
-                Cardinality([]),
-                Cardinality([]),
-                None,
-                [],
-            ),
-            Feature(
-                "Bread",
-                Cardinality([Interval(0, 4)]),
-                Cardinality([]),
-                Cardinality([]),
-                None,
-                [],
-            ),
-        ],
-    )
-    assert len(random_sampler.get_optional_children(feature)) == 2
-    feature = Feature(
-        "Cheese", Cardinality([]), Cardinality([]), Cardinality([]), None, []
+        children,
     )
-    assert len(random_sampler.get_optional_children(feature)) == 0
-    feature = Feature(
-        "Cheese",
-        Cardinality([]),
-        Cardinality([]),
-        Cardinality([]),
+    for child in children:
+        child.parent = root
+    model = CFM(root, [])
+    random_sampler = RandomSampler(model, random.Random(0))
+
+    for _ in range(20):
+        assert random_sampler.random_sampling().validate(model)
+
+    assert random_sampler.retries == 0
+
+
+def test_random_sampler_excludes_features_without_valid_groups():
+    impossible = Feature(
+        "impossible",
+        Cardinality([Interval(0, 1)]),
+        Cardinality([Interval(2, 2)]),
+        Cardinality([Interval(2, 2)]),
         None,
-        [
-            Feature(
-                "Milk",
-                Cardinality([Interval(1, 5)]),
-                Cardinality([]),
-                Cardinality([]),
-                None,
-                [],
-            )
-        ],
+        [leaf("only", 0, 1)],
     )
-    assert len(random_sampler.get_optional_children(feature)) == 0
-    feature = Feature(
-        "Cheese",
-        Cardinality([]),
-        Cardinality([]),
-        Cardinality([]),
+    root = Feature(
+        "root",
+        Cardinality([Interval(1, 1)]),
+        Cardinality([Interval(0, 2)]),
+        Cardinality([Interval(0, 2)]),
         None,
-        [
-            Feature(
-                "Milk",
-                Cardinality([Interval(3, 5)]),
-                Cardinality([]),
-                Cardinality([]),
-                None,
-                [],
-            ),
-            Feature(
-                "Bread",
-                Cardinality([Interval(2, 5)]),
-                Cardinality([]),
-                Cardinality([]),
-                None,
-                [],
-            ),
-        ],
+        [impossible, leaf("other", 0, 1)],
     )
-    assert len(random_sampler.get_optional_children(feature)) == 0
+    impossible.parent = root
+    impossible.children[0].parent = impossible
+    root.children[1].parent = root
+    model = CFM(root, [])
 
+    for _ in range(20):
+        sample = RandomSampler(model).random_sampling()
+        assert sample.validate(model)
+        assert all(
+            not child.value.startswith("impossible") for child in sample.children
+        )
 
-def test_generate_random_children_with_random_cardinality(
-    random_sampler: RandomSampler,
-):
-    feature = Feature(
-        "Cheese-mix",
-        Cardinality([]),
-        Cardinality([Interval(1, 3)]),
-        Cardinality([Interval(3, 3)]),
-        None,
-        [
-            Feature(
-                "Cheddar",
-                Cardinality([Interval(0, 1)]),
-                Cardinality([]),
-                Cardinality([]),
-                None,
-                [],
-            ),
-            Feature(
-                "Swiss",
-                Cardinality([Interval(0, 2)]),
-                Cardinality([]),
-                Cardinality([]),
-                None,
-                [],
-            ),
-            Feature(
-                "Gouda",
-                Cardinality([Interval(0, 3)]),
-                Cardinality([]),
-                Cardinality([]),
-                None,
-                [],
-            ),
-        ],
-    )
-    children, summed_random_instance_cardinality = (
-        random_sampler.generate_random_children_with_random_cardinality(feature)
-    )
-    for child, random_instance_cardinality in children:
-        assert child.instance_cardinality.is_valid_cardinality(
-            random_instance_cardinality
+    impossible.instance_cardinality = Cardinality([Interval(1, 1)])
+    with pytest.raises(ValueError, match="no valid configurations"):
+        RandomSampler(model)
+
+
+def test_random_sampler_counts_retries_for_constraints():
+    model = generate_cfm(200, constraint_density=0.05, seed=2)
+    random_sampler = RandomSampler(model, random.Random(0), propagate_constraints=False)
+
+    samples = [random_sampler.random_sampling() for _ in range(20)]
+
+    assert all(sample.validate(model) for sample in samples)
+    assert random_sampler.retries > 0
+    assert random_sampler.pruned == 0
+
+
+def test_constraint_propagation_raises_the_acceptance_rate():
+    model = generate_cfm(300, clone_probability=0.1, constraint_density=0.05, seed=2)
+    acceptance_rates = []
+
+    for propagate_constraints in (False, True):
+        random_sampler = RandomSampler(
+            model, random.Random(0), propagate_constraints=propagate_constraints
         )
+        samples = [random_sampler.random_sampling() for _ in range(30)]
+
+        assert all(sample.validate(model) for sample in samples)
+        assert random_sampler.pruned <= random_sampler.retries
+        acceptance_rates.append(random_sampler.acceptance_rate)
+
+    assert acceptance_rates[1] > acceptance_rates[0]
+
+
+def test_random_sampler_samples_generated_models():
+    model = generate_cfm(300, clone_probability=0.3, seed=5)
+    random_sampler = RandomSampler(model, random.Random(0))
+
+    for _ in range(20):
+        assert random_sampler.random_sampling().validate(model)
+
+    assert random_sampler.retries == 0
+
+
+def test_random_flat_samplings_do_not_depend_on_jobs(model: CFM):
+    num_samples = 2 * SAMPLES_PER_STREAM + 5
+    sequential = RandomSampler(model, random.Random(1))
+    parallel = RandomSampler(model, random.Random(1))
+
+    samples = [
+        sample.to_dict() for sample in sequential.random_flat_samplings(num_samples)
+    ]
+
+    assert len(samples) == num_samples
+    assert samples == [
+        sample.to_dict() for sample in parallel.random_flat_samplings(num_samples, 2)
+    ]
+    assert parallel.retries == sequential.retries
+
+
+def test_random_flat_samplings_yield_each_sample_when_drawn(model: CFM):
+    random_sampler = RandomSampler(model, random.Random(3))
+    random_generator = random_sampler.random_generator
+    samples = random_sampler.random_flat_samplings(SAMPLES_PER_STREAM)
+
+    next(samples)
+
+    assert random_sampler.accepted == 1
+    assert random_sampler.random_generator is random_generator
+
+
+def test_random_flat_samplings_with_secure_generator(model: CFM):
+    random_generator = secrets.SystemRandom()
+    random_sampler = RandomSampler(model, random_generator)
+
+    samples = list(random_sampler.random_flat_samplings(SAMPLES_PER_STREAM + 1))
+
+    assert len(samples) == SAMPLES_PER_STREAM + 1
+    assert all(sample.to_configuration_node().validate(model) for sample in samples)
+    assert random_sampler.random_generator is random_generator
+
+
+def test_random_sampling_with_jobs(model: CFM, capsys):
+    random_sampling(model, 5, seed=7)
+    sequential = capsys.readouterr().out
+    random_sampling(model, 5, seed=7, jobs=2)
+
+    assert capsys.readouterr().out == sequential
+
+
+def test_random_sampling_writes_json_lines(model: CFM, tmp_path: Path, capsys):
+    output = tmp_path / "samples.jsonl"
+
+    random_sampling(model, 3, seed=7, jsonl=True, output=output)
+    lines = output.read_text().splitlines()
+
+    assert capsys.readouterr().out == ""
+    assert len(lines) == 3
+    random_sampling(model, 3, seed=7)
+    assert [json.loads(line) for line in lines] == json.loads(capsys.readouterr().out)
@@ -0,0 +1,142 @@
+import json
+import random
+from collections import Counter
+from pathlib import Path
+
+import pytest
+import typer
+
+import cfmtoolbox.plugins.uniform_sampling as uniform_sampling_plugin
+from cfmtoolbox import app
+from cfmtoolbox.generation import generate_cfm
+from cfmtoolbox.models import CFM, Cardinality, Feature, Interval
+from cfmtoolbox.plugins.json_import import import_json
+from cfmtoolbox.plugins.uniform_sampling import UniformSampler, uniform_sampling
+
+
+@pytest.fixture
+def model():
+    return import_json(Path("tests/data/sandwich_bound.json").read_bytes())
+
+
+@pytest.fixture
+def unbound_model():
+    return import_json(Path("tests/data/sandwich.json").read_bytes())
+
+
+def test_plugin_can_be_loaded():
+    assert uniform_sampling_plugin in app.load_plugins()
+
+
+def test_uniform_sampling_with_unbound_model(unbound_model: CFM):
+    with pytest.raises(
+        typer.Abort, match="Model is unbound. Please apply big-m global bound first."
+    ):
+        uniform_sampling(unbound_model)
+
+
+def test_plugin_passes_though_model(model: CFM):
+    assert uniform_sampling(model) is model
+
+
+def test_plugin_outputs_expected_number_of_samples(model: CFM, capsys):
+    uniform_sampling(model, 3)
+    captured = capsys.readouterr()
+    assert captured.out.count("sandwich#0") == 3
+
+
+def test_uniform_sampling_is_reproducible_with_seed(model: CFM, capsys):
+    uniform_sampling(model, 5, seed=7)
+    first = capsys.readouterr().out
+    uniform_sampling(model, 5, seed=7)
+    second = capsys.readouterr().out
+
+    assert first == second
+
+
+def test_uniform_sampling_rejects_seed_for_secure_generator(model: CFM):
+    with pytest.raises(typer.BadParameter, match="cannot be seeded"):
+        uniform_sampling(model, seed=7, secure=True)
+
+
+def test_uniform_sampling_with_loaded_model(model: CFM):
+    uniform_sampler = UniformSampler(model, random.Random(0))
+
+    for _ in range(20):
+        assert uniform_sampler.uniform_sampling().validate(model)
+
+
+def test_uniform_sampler_draws_configurations_uniformly():
+    # Two optional children with 0..2 instances, and at least one instance in total
+    children = [
+        Feature(
+            name,
+            Cardinality([Interval(0, 2)]),
+            Cardinality([]),
+            Cardinality([]),
+            None,
+            [],
+        )
+        for name in ("a", "b")
+    ]
+    root = Feature(
+        "root",
+        Cardinality([Interval(1, 1)]),
+        Cardinality([Interval(1, 2)]),
+        Cardinality([Interval(1, 4)]),
+        None,
+        children,
+    )
+    uniform_sampler = UniformSampler(CFM(root, []), random.Random(0))
+
+    frequencies = Counter(
+        json.dumps(uniform_sampler.uniform_flat_sampling().to_dict())
+        for _ in range(8000)
+    )
+
+    assert len(frequencies) == 8
+    assert all(900 < frequency < 1100 for frequency in frequencies.values())
+
+
+def test_uniform_sampler_counts_retries_for_constraints():
+    model = generate_cfm(50, constraint_density=0.1, seed=2)
+    uniform_sampler = UniformSampler(model, random.Random(0))
+
+    samples = [uniform_sampler.uniform_sampling() for _ in range(20)]
+
+    assert all(sample.validate(model) for sample in samples)
+    assert uniform_sampler.retries > 0
+
+
+def test_uniform_sampler_rejects_models_without_configurations():
+    root = Feature(
+        "root",
+        Cardinality([Interval(1, 1)]),
+        Cardinality([Interval(2, 2)]),
+        Cardinality([Interval(2, 2)]),
+        None,
+        [
+            Feature(
+                "only",
+                Cardinality([Interval(0, 1)]),
+                Cardinality([]),
+                Cardinality([]),
+                None,
+                [],
+            )
+        ],
+    )
+
+    with pytest.raises(ValueError, match="no valid configurations"):
+        UniformSampler(CFM(root, []))
+
+    with pytest.raises(typer.Abort, match="no valid configurations"):
+        uniform_sampling(CFM(root, []))
+
+
+def test_uniform_sampling_writes_json_lines(model: CFM, capsys):
+    uniform_sampling(model, 4, jsonl=True)
+
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 4
+    assert all(json.loads(line)["value"] == "sandwich#0" for line in lines)
@@ -1,3 +1,4 @@
+from io import BytesIO
 from pathlib import Path
 
 import pytest
@@ -13,6 +14,7 @@ from cfmtoolbox.plugins.uvl_export import (
     serialize_group_cardinality,
     serialize_includes,
     serialize_root_feature,
+    write_uvl,
 )
 from cfmtoolbox.toolbox import CFMToolbox
 
@@ -579,3 +581,13 @@ constraints
 \t(Swiss = 1) => (Lettuce = 1)\n"""
 
     assert expectation == export.decode()
+
+
+def test_write_uvl_streams_the_exported_uvl():
+    cfm = import_featureide(Path("tests/data/sandwich.xml").read_bytes())
+    file = BytesIO()
+
+    write_uvl(cfm, file)
+
+    assert file.getvalue() == export_uvl(cfm)
+    assert file.getvalue().startswith(serialize_includes().encode())
@@ -4,7 +4,15 @@ from unittest.mock import Mock
 import pytest
 
 import cfmtoolbox.plugins.uvl_import as uvl_import_plugin
-from cfmtoolbox import Cardinality, CFMToolbox, Constraint, Feature, Interval
+from cfmtoolbox import (
+    CFM,
+    Cardinality,
+    CFMToolbox,
+    Constraint,
+    Feature,
+    Interval,
+    structurally_equal,
+)
 from cfmtoolbox.plugins.uvl_import import (
     ConstraintType,
     CustomErrorListener,
@@ -434,19 +442,35 @@ def test_exit_feature_with_two_groups(listener):
     assert listener.feature_map["test"] == listener.features[0]
     assert len(listener.groups) == 0
     assert len(listener.imported_constraints) == 2
-    assert listener.imported_constraints[0] == Constraint(
-        require=True,
-        first_feature=mock_parent,
-        first_cardinality=Cardinality([Interval(1, None)]),
-        second_feature=feature1,
-        second_cardinality=Cardinality([Interval(1, None)]),
+    assert structurally_equal(
+        CFM(listener.features[0], [listener.imported_constraints[0]]),
+        CFM(
+            mock_parent,
+            [
+                Constraint(
+                    require=True,
+                    first_feature=mock_parent,
+                    first_cardinality=Cardinality([Interval(1, None)]),
+                    second_feature=feature1,
+                    second_cardinality=Cardinality([Interval(1, None)]),
+                )
+            ],
+        ),
     )
-    assert listener.imported_constraints[1] == Constraint(
-        require=True,
-        first_feature=mock_parent,
-        first_cardinality=Cardinality([Interval(1, None)]),
-        second_feature=feature2,
-        second_cardinality=Cardinality([Interval(1, None)]),
+    assert structurally_equal(
+        CFM(listener.features[0], [listener.imported_constraints[1]]),
+        CFM(
+            mock_parent,
+            [
+                Constraint(
+                    require=True,
+                    first_feature=mock_parent,
+                    first_cardinality=Cardinality([Interval(1, None)]),
+                    second_feature=feature2,
+                    second_cardinality=Cardinality([Interval(1, None)]),
+                )
+            ],
+        ),
     )
 
 
@@ -542,19 +566,35 @@ def test_exit_feature_with_two_groups_and_instance_cardinality(listener):
     assert listener.feature_map["test"] == listener.features[0]
     assert listener.group_features_count == [1]
     assert len(listener.imported_constraints) == 2
-    assert listener.imported_constraints[0] == Constraint(
-        require=True,
-        first_feature=mock_parent,
-        first_cardinality=Cardinality([Interval(1, None)]),
-        second_feature=feature1,
-        second_cardinality=Cardinality([Interval(1, None)]),
+    assert structurally_equal(
+        CFM(listener.features[0], [listener.imported_constraints[0]]),
+        CFM(
+            mock_parent,
+            [
+                Constraint(
+                    require=True,
+                    first_feature=mock_parent,
+                    first_cardinality=Cardinality([Interval(1, None)]),
+                    second_feature=feature1,
+                    second_cardinality=Cardinality([Interval(1, None)]),
+                )
+            ],
+        ),
     )
-    assert listener.imported_constraints[1] == Constraint(
-        require=True,
-        first_feature=mock_parent,
-        first_cardinality=Cardinality([Interval(1, None)]),
-        second_feature=feature2,
-        second_cardinality=Cardinality([Interval(1, None)]),
+    assert structurally_equal(
+        CFM(listener.features[0], [listener.imported_constraints[1]]),
+        CFM(
+            mock_parent,
+            [
+                Constraint(
+                    require=True,
+                    first_feature=mock_parent,
+                    first_cardinality=Cardinality([Interval(1, None)]),
+                    second_feature=feature2,
+                    second_cardinality=Cardinality([Interval(1, None)]),
+                )
+            ],
+        ),
     )
 
 
@@ -649,19 +689,35 @@ def test_exit_feature_with_two_groups_including_group_cardinality(listener):
     assert listener.feature_map["test"] == listener.features[0]
     assert listener.group_features_count == [1]
     assert len(listener.imported_constraints) == 2
-    assert listener.imported_constraints[0] == Constraint(
-        require=True,
-        first_feature=mock_parent,
-        first_cardinality=Cardinality([Interval(1, None)]),
-        second_feature=feature1,
-        second_cardinality=Cardinality([Interval(1, None)]),
+    assert structurally_equal(
+        CFM(listener.features[0], [listener.imported_constraints[0]]),
+        CFM(
+            mock_parent,
+            [
+                Constraint(
+                    require=True,
+                    first_feature=mock_parent,
+                    first_cardinality=Cardinality([Interval(1, None)]),
+                    second_feature=feature1,
+                    second_cardinality=Cardinality([Interval(1, None)]),
+                )
+            ],
+        ),
     )
-    assert listener.imported_constraints[1] == Constraint(
-        require=True,
-        first_feature=mock_parent,
-        first_cardinality=Cardinality([Interval(1, None)]),
-        second_feature=feature2,
-        second_cardinality=Cardinality([Interval(1, None)]),
+    assert structurally_equal(
+        CFM(listener.features[0], [listener.imported_constraints[1]]),
+        CFM(
+            mock_parent,
+            [
+                Constraint(
+                    require=True,
+                    first_feature=mock_parent,
+                    first_cardinality=Cardinality([Interval(1, None)]),
+                    second_feature=feature2,
+                    second_cardinality=Cardinality([Interval(1, None)]),
+                )
+            ],
+        ),
     )
 
 
@@ -758,19 +814,35 @@ def test_exit_feature_with_two_groups_including_group_cardinality_with_instances
     assert listener.feature_map["test"] == listener.features[0]
     assert listener.group_features_count == [1]
     assert len(listener.imported_constraints) == 2
-    assert listener.imported_constraints[0] == Constraint(
-        require=True,
-        first_feature=mock_parent,
-        first_cardinality=Cardinality([Interval(1, None)]),
-        second_feature=feature1,
-        second_cardinality=Cardinality([Interval(1, None)]),
+    assert structurally_equal(
+        CFM(listener.features[0], [listener.imported_constraints[0]]),
+        CFM(
+            mock_parent,
+            [
+                Constraint(
+                    require=True,
+                    first_feature=mock_parent,
+                    first_cardinality=Cardinality([Interval(1, None)]),
+                    second_feature=feature1,
+                    second_cardinality=Cardinality([Interval(1, None)]),
+                )
+            ],
+        ),
     )
-    assert listener.imported_constraints[1] == Constraint(
-        require=True,
-        first_feature=mock_parent,
-        first_cardinality=Cardinality([Interval(1, None)]),
-        second_feature=feature2,
-        second_cardinality=Cardinality([Interval(1, None)]),
+    assert structurally_equal(
+        CFM(listener.features[0], [listener.imported_constraints[1]]),
+        CFM(
+            mock_parent,
+            [
+                Constraint(
+                    require=True,
+                    first_feature=mock_parent,
+                    first_cardinality=Cardinality([Interval(1, None)]),
+                    second_feature=feature2,
+                    second_cardinality=Cardinality([Interval(1, None)]),
+                )
+            ],
+        ),
     )
 
 
@@ -920,19 +992,8 @@ def test_exit_mandatory_group_one_feature_without_instance_cardinality(listener)
 
     assert len(listener.group_specs) == 0
     assert len(listener.groups) == 1
-    assert listener.groups[0] == (
-        Cardinality([Interval(-1, -1)]),
-        [
-            Feature(
-                name="test",
-                instance_cardinality=Cardinality([Interval(1, 1)]),
-                group_type_cardinality=Cardinality([]),
-                group_instance_cardinality=Cardinality([]),
-                parent=None,
-                children=[],
-            )
-        ],
-    )
+    assert listener.groups[0] == (Cardinality([Interval(-1, -1)]), [feature])
+    assert feature.instance_cardinality == Cardinality([Interval(1, 1)])
 
 
 def test_exit_mandatory_group_one_feature_with_instance_cardinality(listener):
@@ -1027,19 +1088,8 @@ def test_exit_optional_group_with_instance_cardinality_lower_changed_to_zero(lis
 
     assert len(listener.group_specs) == 0
     assert len(listener.groups) == 1
-    assert listener.groups[0] == (
-        Cardinality([Interval(-4, -4)]),
-        [
-            Feature(
-                name="test",
-                instance_cardinality=Cardinality([Interval(0, 5)]),
-                group_type_cardinality=Cardinality([]),
-                group_instance_cardinality=Cardinality([]),
-                parent=None,
-                children=[],
-            )
-        ],
-    )
+    assert listener.groups[0] == (Cardinality([Interval(-4, -4)]), [feature])
+    assert feature.instance_cardinality == Cardinality([Interval(0, 5)])
 
 
 def test_exit_optional_group_with_instance_cardinality_lower_not_changed(listener):
@@ -1129,7 +1179,7 @@ def test_exit_feature_cardinality_single_value(listener):
     listener.exitFeatureCardinality(mock_ctx)
 
     assert len(listener.feature_cardinalities) == 1
-    assert listener.feature_cardinalities[0].intervals == [Interval(1, 1)]
+    assert listener.feature_cardinalities[0].intervals == (Interval(1, 1),)
     assert len(listener.cardinality_available) == 1
     assert listener.cardinality_available[0] is True
 
@@ -1142,7 +1192,7 @@ def test_exit_feature_cardinality_multiple_values(listener):
     listener.exitFeatureCardinality(mock_ctx)
 
     assert len(listener.feature_cardinalities) == 1
-    assert listener.feature_cardinalities[0].intervals == [Interval(2, 4)]
+    assert listener.feature_cardinalities[0].intervals == (Interval(2, 4),)
     assert len(listener.cardinality_available) == 1
     assert listener.cardinality_available[0] is True
 
@@ -1155,7 +1205,7 @@ def test_exit_feature_cardinality_multiple_values_including_asterisk(listener):
     listener.exitFeatureCardinality(mock_ctx)
 
     assert len(listener.feature_cardinalities) == 1
-    assert listener.feature_cardinalities[0].intervals == [Interval(2, None)]
+    assert listener.feature_cardinalities[0].intervals == (Interval(2, None),)
     assert len(listener.cardinality_available) == 1
     assert listener.cardinality_available[0] is True
 
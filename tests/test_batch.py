@@ -0,0 +1,89 @@
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+import cfmtoolbox.plugins.conversion  # noqa: F401
+import cfmtoolbox.plugins.json_export  # noqa: F401
+import cfmtoolbox.plugins.json_import  # noqa: F401
+from cfmtoolbox import app
+from cfmtoolbox.batch import (
+    BatchResult,
+    describe_error,
+    find_models,
+    is_batch_path,
+    process_model,
+    process_models,
+)
+
+
+@pytest.fixture
+def models(tmp_path):
+    directory = tmp_path / "models"
+    directory.mkdir()
+    shutil.copy("tests/data/sandwich.json", directory / "sandwich.json")
+    shutil.copy("tests/data/sandwich_bound.json", directory / "bound.json")
+    (directory / "broken.json").write_text("{")
+    (directory / "notes.txt").write_text("")
+    (directory / "nested").mkdir()
+    return directory
+
+
+def test_is_batch_path(models: Path):
+    assert is_batch_path(models)
+    assert is_batch_path(models / "*.json")
+    assert is_batch_path(models / "**" / "sandwich.json")
+    assert not is_batch_path(models / "sandwich.json")
+    assert not is_batch_path(models / "missing.json")
+
+
+def test_is_batch_path_with_pattern_characters_in_file_name(models: Path):
+    model = models / "sandwich[1].json"
+    assert is_batch_path(model)
+
+    shutil.copy(models / "sandwich.json", model)
+    assert not is_batch_path(model)
+
+
+def test_find_models_in_directory_filters_by_extension(models: Path):
+    assert find_models(models, {".json"}) == [
+        models / "bound.json",
+        models / "broken.json",
+        models / "sandwich.json",
+    ]
+
+
+def test_find_models_matching_glob_pattern(models: Path):
+    assert find_models(models / "s*", {".json"}) == [models / "sandwich.json"]
+    assert find_models(models / "*.uvl", {".json"}) == []
+
+
+def test_describe_error():
+    assert describe_error(ValueError("bad")) == "ValueError: bad"
+    assert describe_error(KeyError()) == "KeyError"
+
+
+def test_process_model_reports_errors(models: Path, tmp_path):
+    stages = app.parse_pipeline([["convert"]])
+
+    result = process_model(app, stages, models / "broken.json", None)
+
+    assert result.import_path == models / "broken.json"
+    assert result.error is not None
+    assert result.error.startswith("JSONDecodeError")
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_process_models(models: Path, tmp_path, jobs: int):
+    stages = app.parse_pipeline([["convert"]])
+    names = ["sandwich", "broken", "bound"]
+    pairs = [(models / f"{name}.json", tmp_path / f"{name}.out.json") for name in names]
+
+    results = list(process_models(app, stages, pairs, jobs))
+
+    assert [result.import_path for result in results] == [path for path, _ in pairs]
+    assert [result.error is None for result in results] == [True, False, True]
+    assert all(isinstance(result, BatchResult) for result in results)
+    assert "root" in json.loads((tmp_path / "sandwich.out.json").read_text())
+    assert not (tmp_path / "broken.out.json").exists()
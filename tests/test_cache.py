@@ -0,0 +1,109 @@
+import os
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+
+import cfmtoolbox.cache
+from cfmtoolbox.cache import (
+    CACHE_DIR_VARIABLE,
+    ModelCache,
+    default_cache_directory,
+)
+from cfmtoolbox.models import CFM, structurally_equal
+from cfmtoolbox.plugins.json_import import import_json
+
+
+@pytest.fixture
+def model():
+    return import_json(Path("tests/data/sandwich.json").read_bytes())
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ModelCache(tmp_path / "cache")
+
+
+def test_default_cache_directory(monkeypatch, tmp_path):
+    monkeypatch.setenv(CACHE_DIR_VARIABLE, str(tmp_path))
+    assert default_cache_directory() == tmp_path
+
+    monkeypatch.delenv(CACHE_DIR_VARIABLE)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert default_cache_directory() == tmp_path / "cfmtoolbox"
+
+
+def test_key_depends_on_contents_and_importer(cache: ModelCache):
+    key = cache.key(b"features", "uvl_import.import_uvl")
+
+    assert key == cache.key(b"features", "uvl_import.import_uvl")
+    assert key != cache.key(b"features ", "uvl_import.import_uvl")
+    assert key != cache.key(b"features", "json_import.import_json")
+
+
+def test_key_of_files_matches_key_of_contents(cache: ModelCache, monkeypatch):
+    monkeypatch.setattr(cfmtoolbox.cache, "CHUNK_SIZE", 3)
+
+    assert cache.key(BytesIO(b"features"), "importer") == cache.key(
+        b"features", "importer"
+    )
+
+
+def test_load_returns_none_for_missing_entries(cache: ModelCache):
+    assert cache.load(cache.key(b"", "importer")) is None
+
+
+def test_store_and_load_round_trip(cache: ModelCache, model: CFM):
+    key = cache.key(b"sandwich", "importer")
+    cache.store(key, model)
+
+    cached_model = cache.load(key)
+
+    assert cached_model is not None
+    assert cached_model is not model
+    assert structurally_equal(cached_model, model)
+
+
+def test_load_drops_corrupt_entries(cache: ModelCache):
+    key = cache.key(b"sandwich", "importer")
+    cache.directory.mkdir()
+    cache.path(key).write_bytes(b"not a pickle")
+
+    assert cache.load(key) is None
+    assert not cache.path(key).exists()
+
+
+def test_store_evicts_least_recently_used_entries(cache: ModelCache, model: CFM):
+    keys = [cache.key(str(i).encode(), "importer") for i in range(3)]
+    cache.store(keys[0], model)
+    cache.max_size = 2 * cache.path(keys[0]).stat().st_size
+
+    cache.store(keys[1], model)
+    os.utime(cache.path(keys[0]), (0, 0))
+    os.utime(cache.path(keys[1]), (1, 1))
+    cache.load(keys[0])
+    cache.store(keys[2], model)
+
+    assert cache.path(keys[0]).exists()
+    assert not cache.path(keys[1]).exists()
+    assert cache.path(keys[2]).exists()
+
+
+def test_clear_removes_all_entries(cache: ModelCache, model: CFM):
+    key = cache.key(b"sandwich", "importer")
+    cache.store(key, model)
+
+    cache.clear()
+
+    assert cache.load(key) is None
+
+
+def test_unusable_cache_directories_leave_models_uncached(tmp_path, model: CFM):
+    (tmp_path / "file").write_bytes(b"")
+    cache = ModelCache(tmp_path / "file" / "cache")
+    key = cache.key(b"sandwich", "importer")
+
+    cache.store(key, model)
+
+    assert cache.load(key) is None
+    cache.evict()
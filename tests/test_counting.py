@@ -0,0 +1,119 @@
+import json
+import random
+from pathlib import Path
+
+import pytest
+
+from cfmtoolbox.counting import ConfigurationCounter
+from cfmtoolbox.generation import generate_cfm
+from cfmtoolbox.models import CFM, Cardinality, Feature, Interval
+from cfmtoolbox.plugins.json_import import import_json
+from cfmtoolbox.plugins.uniform_sampling import UniformSampler
+
+
+def feature(
+    name: str,
+    lower: int,
+    upper: int | None,
+    children: list[Feature] | None = None,
+    group_type: tuple[int, int] = (0, 0),
+    group_instance: tuple[int, int] = (0, 0),
+) -> Feature:
+    created = Feature(
+        name,
+        Cardinality([Interval(lower, upper)]),
+        Cardinality([Interval(*group_type)]) if children else Cardinality([]),
+        Cardinality([Interval(*group_instance)]) if children else Cardinality([]),
+        None,
+        children or [],
+    )
+    for child in created.children:
+        child.parent = created
+
+    return created
+
+
+def test_count_of_a_single_feature():
+    assert ConfigurationCounter(CFM(feature("root", 1, 1), [])).count == 1
+
+
+def test_count_of_a_group_with_clonable_children():
+    # Instance counts of 0..1, 0..2 and 0..3 summing to exactly 3
+    root = feature(
+        "root",
+        1,
+        1,
+        [feature("a", 0, 1), feature("b", 0, 2), feature("c", 0, 3)],
+        group_type=(1, 3),
+        group_instance=(3, 3),
+    )
+
+    assert ConfigurationCounter(CFM(root, [])).count == 6
+
+
+def test_count_multiplies_the_configurations_of_instances():
+    # Each instance of the child chooses one of its two children, and the instances
+    # are ordered, so two instances have four configurations
+    child = feature(
+        "child",
+        2,
+        2,
+        [feature("x", 0, 1), feature("y", 0, 1)],
+        group_type=(1, 1),
+        group_instance=(1, 1),
+    )
+    root = feature("root", 1, 1, [child], group_type=(1, 1), group_instance=(2, 2))
+    counter = ConfigurationCounter(CFM(root, []))
+
+    assert counter.count == 4
+    assert counter.configuration_counts[counter.feature_ids[child]] == 2
+    assert counter.instance_counts[counter.feature_ids[child]] == {2: 4}
+
+
+def test_count_excludes_features_without_valid_groups():
+    impossible = feature(
+        "impossible",
+        0,
+        1,
+        [feature("only", 0, 1)],
+        group_type=(2, 2),
+        group_instance=(2, 2),
+    )
+    root = feature(
+        "root",
+        1,
+        1,
+        [impossible, feature("other", 0, 1)],
+        group_type=(0, 2),
+        group_instance=(0, 2),
+    )
+    counter = ConfigurationCounter(CFM(root, []))
+
+    assert counter.count == 2
+    assert counter.instance_counts[counter.feature_ids[impossible]] == {0: 1}
+
+
+def test_count_rejects_unbound_models():
+    root = feature(
+        "root", 1, 1, [feature("a", 0, None)], group_type=(0, 1), group_instance=(0, 5)
+    )
+
+    with pytest.raises(ValueError, match="a is unbound"):
+        ConfigurationCounter(CFM(root, []))
+
+
+def test_count_matches_the_distinct_uniform_samples():
+    model = generate_cfm(8, max_children=3, clone_probability=0.3, seed=4)
+    sampler = UniformSampler(model, random.Random(0))
+
+    samples = {
+        json.dumps(sampler.uniform_flat_sampling().to_dict()) for _ in range(2000)
+    }
+
+    assert len(samples) == ConfigurationCounter(model).count
+
+
+def test_count_of_a_loaded_model_is_exact():
+    model = import_json(Path("tests/data/sandwich_bound.json").read_bytes())
+
+    assert ConfigurationCounter(model).count == 3141372
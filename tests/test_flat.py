@@ -0,0 +1,322 @@
+from array import array
+from dataclasses import asdict
+from pathlib import Path
+
+import pytest
+
+from cfmtoolbox.flat import FlatCFM, FlatConfiguration
+from cfmtoolbox.models import (
+    CFM,
+    Cardinality,
+    ConfigurationNode,
+    Constraint,
+    Feature,
+    Interval,
+    structurally_equal,
+)
+from cfmtoolbox.plugins.json_import import import_json
+
+
+@pytest.fixture
+def model():
+    return import_json(Path("tests/data/sandwich.json").read_bytes())
+
+
+@pytest.fixture
+def flat_model(model: CFM):
+    return FlatCFM.from_cfm(model)
+
+
+def test_from_cfm_numbers_features_in_breadth_first_order(flat_model: FlatCFM):
+    assert flat_model.names == [
+        "sandwich",
+        "bread",
+        "cheese-mix",
+        "veggies",
+        "sourdough",
+        "wheat",
+        "cheddar",
+        "swiss",
+        "gouda",
+        "lettuce",
+        "tomato",
+        "onion",
+    ]
+    assert flat_model.ids["gouda"] == 8
+    assert flat_model.feature_count == 12
+
+
+def test_from_cfm_stores_tree_structure(flat_model: FlatCFM):
+    assert list(flat_model.parents) == [-1, 0, 0, 0, 1, 1, 2, 2, 2, 3, 3, 3]
+    assert list(flat_model.child_counts) == [3, 2, 3, 3, 0, 0, 0, 0, 0, 0, 0, 0]
+    assert list(flat_model.children(0)) == [1, 2, 3]
+    assert list(flat_model.children(2)) == [6, 7, 8]
+    assert list(flat_model.children(5)) == []
+
+
+def test_from_cfm_stores_depth_first_ranks(flat_model: FlatCFM):
+    names_in_preorder = sorted(
+        flat_model.names, key=lambda name: flat_model.preorder[flat_model.ids[name]]
+    )
+    names_in_postorder = sorted(
+        flat_model.names, key=lambda name: flat_model.postorder[flat_model.ids[name]]
+    )
+
+    assert names_in_preorder == [
+        "sandwich",
+        "bread",
+        "sourdough",
+        "wheat",
+        "cheese-mix",
+        "cheddar",
+        "swiss",
+        "gouda",
+        "veggies",
+        "lettuce",
+        "tomato",
+        "onion",
+    ]
+    assert names_in_postorder == [
+        "sourdough",
+        "wheat",
+        "bread",
+        "cheddar",
+        "swiss",
+        "gouda",
+        "cheese-mix",
+        "lettuce",
+        "tomato",
+        "onion",
+        "veggies",
+        "sandwich",
+    ]
+
+
+def test_from_cfm_shares_cardinalities_in_a_table(flat_model: FlatCFM):
+    assert len(flat_model.cardinalities) == len(set(flat_model.cardinalities))
+
+    cheddar = flat_model.ids["cheddar"]
+    sourdough = flat_model.ids["sourdough"]
+    assert (
+        flat_model.instance_cardinalities[cheddar]
+        == flat_model.instance_cardinalities[sourdough]
+    )
+
+    cheese_mix = flat_model.ids["cheese-mix"]
+    assert flat_model.cardinalities[
+        flat_model.instance_cardinalities[cheese_mix]
+    ] == Cardinality([Interval(0, 0), Interval(2, 4)])
+
+
+@pytest.mark.parametrize(
+    ["feature_name", "value", "expectation"],
+    [
+        ("cheese-mix", 0, True),
+        ("cheese-mix", 1, False),
+        ("cheese-mix", 3, True),
+        ("cheese-mix", 5, False),
+        ("lettuce", 1000, True),
+        ("swiss", 2, True),
+        ("swiss", 3, False),
+    ],
+)
+def test_is_valid_cardinality_uses_packed_bounds(
+    flat_model: FlatCFM, feature_name: str, value: int, expectation: bool
+):
+    cardinality = flat_model.instance_cardinalities[flat_model.ids[feature_name]]
+    assert flat_model.is_valid_cardinality(cardinality, value) is expectation
+
+
+def test_from_cfm_stores_constraints_as_index_arrays(flat_model: FlatCFM):
+    assert flat_model.constraint_count == 3
+    assert list(flat_model.constraint_requires) == [1, 1, 0]
+    assert [flat_model.names[i] for i in flat_model.constraint_first_features] == [
+        "wheat",
+        "cheddar",
+        "tomato",
+    ]
+    assert [flat_model.names[i] for i in flat_model.constraint_second_features] == [
+        "lettuce",
+        "sourdough",
+        "gouda",
+    ]
+    assert flat_model.cardinalities[
+        flat_model.constraint_first_cardinalities[1]
+    ] == Cardinality([Interval(3, 3)])
+
+
+def test_from_cfm_matches_detached_constraint_features_by_name():
+    root = Feature(
+        "Cheese", Cardinality([]), Cardinality([]), Cardinality([]), None, []
+    )
+    detached = Feature(
+        "Cheese", Cardinality([]), Cardinality([]), Cardinality([]), None, []
+    )
+    cfm = CFM(
+        root, [Constraint(True, detached, Cardinality([]), root, Cardinality([]))]
+    )
+
+    assert list(FlatCFM.from_cfm(cfm).constraint_first_features) == [0]
+
+
+def test_from_cfm_rejects_constraints_with_unknown_features():
+    root = Feature(
+        "Cheese", Cardinality([]), Cardinality([]), Cardinality([]), None, []
+    )
+    unknown = Feature(
+        "Ham", Cardinality([]), Cardinality([]), Cardinality([]), None, []
+    )
+    cfm = CFM(root, [Constraint(True, unknown, Cardinality([]), root, Cardinality([]))])
+
+    with pytest.raises(ValueError, match="Feature Ham not found"):
+        FlatCFM.from_cfm(cfm)
+
+
+def test_to_cfm_is_lossless(model: CFM, flat_model: FlatCFM):
+    restored = flat_model.to_cfm()
+
+    assert structurally_equal(model, restored)
+    assert all(
+        child.parent is feature
+        for feature in restored.features
+        for child in feature.children
+    )
+
+
+def test_flattening_deep_models():
+    root = Feature("0", Cardinality([]), Cardinality([]), Cardinality([]), None, [])
+    feature = root
+    for i in range(1, 5000):
+        child = Feature(
+            str(i), Cardinality([]), Cardinality([]), Cardinality([]), feature, []
+        )
+        feature.children.append(child)
+        feature = child
+    cfm = CFM(root, [])
+
+    flat_model = FlatCFM.from_cfm(cfm)
+
+    assert flat_model.preorder[4999] == 4999
+    assert flat_model.postorder[4999] == 0
+    assert structurally_equal(cfm, flat_model.to_cfm())
+
+
+@pytest.fixture
+def configuration():
+    return ConfigurationNode(
+        "sandwich#0",
+        [
+            ConfigurationNode("bread#0", [ConfigurationNode("wheat#0", [])]),
+            ConfigurationNode("bread#1", [ConfigurationNode("wheat#1", [])]),
+            ConfigurationNode(
+                "cheese-mix#0",
+                [ConfigurationNode("cheddar#0", []), ConfigurationNode("gouda#0", [])],
+            ),
+        ],
+    )
+
+
+def test_flat_configuration_stores_nodes_in_preorder(
+    flat_model: FlatCFM, configuration: ConfigurationNode
+):
+    flat_configuration = FlatConfiguration.from_configuration_node(
+        configuration, flat_model
+    )
+
+    assert flat_configuration.node_count == 8
+    assert [flat_model.names[i] for i in flat_configuration.feature_ids] == [
+        "sandwich",
+        "bread",
+        "wheat",
+        "bread",
+        "wheat",
+        "cheese-mix",
+        "cheddar",
+        "gouda",
+    ]
+    assert list(flat_configuration.instances) == [0, 0, 0, 1, 1, 0, 0, 0]
+    assert list(flat_configuration.subtree_ends) == [8, 3, 3, 5, 5, 8, 7, 8]
+    assert flat_configuration.children(0) == [1, 3, 5]
+    assert flat_configuration.children(6) == []
+    assert flat_configuration.value(3) == "bread#1"
+    assert flat_configuration.path(7) == ["sandwich#0", "cheese-mix#0", "gouda#0"]
+
+
+def test_flat_configuration_conversion_is_lossless(
+    flat_model: FlatCFM, configuration: ConfigurationNode
+):
+    flat_configuration = FlatConfiguration.from_configuration_node(
+        configuration, flat_model
+    )
+
+    assert flat_configuration.to_configuration_node() == configuration
+    assert flat_configuration.to_dict() == asdict(configuration)
+
+
+def test_flat_configuration_can_be_built_node_by_node(flat_model: FlatCFM):
+    flat_configuration = FlatConfiguration(flat_model.names)
+    root = flat_configuration.open_node(0, 0)
+    bread = flat_configuration.open_node(flat_model.ids["bread"], 0)
+    flat_configuration.open_node(flat_model.ids["wheat"], 0)
+    flat_configuration.close_node(bread)
+    flat_configuration.close_node(root)
+
+    assert flat_configuration.to_configuration_node() == ConfigurationNode(
+        "sandwich#0",
+        [ConfigurationNode("bread#0", [ConfigurationNode("wheat#0", [])])],
+    )
+
+
+def test_flat_configuration_rejects_unknown_features(flat_model: FlatCFM):
+    with pytest.raises(ValueError, match="Feature ham not found"):
+        FlatConfiguration.from_configuration_node(
+            ConfigurationNode("sandwich#0", [ConfigurationNode("ham#0", [])]),
+            flat_model,
+        )
+
+
+def test_first_violated_constraint(flat_model: FlatCFM):
+    counts = array("q", [0]) * flat_model.feature_count
+    assert flat_model.first_violated_constraint(counts) == -1
+
+    # wheat requires lettuce
+    counts[flat_model.ids["wheat"]] = 1
+    assert flat_model.first_violated_constraint(counts) == 0
+    assert flat_model.is_violated_constraint(0, counts)
+    assert not flat_model.is_violated_constraint(1, counts)
+
+    counts[flat_model.ids["lettuce"]] = 1
+    assert flat_model.first_violated_constraint(counts) == -1
+
+
+def test_first_violated_constraints_matches_single_rows(flat_model: FlatCFM):
+    count_matrix = []
+    for wheat, lettuce, cheddar, sourdough, tomato, gouda in [
+        (0, 0, 0, 0, 0, 0),
+        (1, 0, 0, 0, 0, 0),
+        (1, 1, 3, 0, 0, 0),
+        (1, 1, 3, 1, 6, 1),
+        (0, 0, 0, 0, 6, 2),
+        (1, 2, 3, 2, 6, 3),
+    ]:
+        counts = array("q", [0]) * flat_model.feature_count
+        counts[flat_model.ids["wheat"]] = wheat
+        counts[flat_model.ids["lettuce"]] = lettuce
+        counts[flat_model.ids["cheddar"]] = cheddar
+        counts[flat_model.ids["sourdough"]] = sourdough
+        counts[flat_model.ids["tomato"]] = tomato
+        counts[flat_model.ids["gouda"]] = gouda
+        count_matrix.append(counts)
+
+    assert flat_model.first_violated_constraints(count_matrix) == [
+        -1,
+        0,
+        1,
+        -1,
+        2,
+        1,
+    ]
+    assert flat_model.first_violated_constraints(count_matrix) == [
+        flat_model.first_violated_constraint(counts) for counts in count_matrix
+    ]
+    assert flat_model.first_violated_constraints([]) == []
@@ -0,0 +1,78 @@
+import pytest
+
+from cfmtoolbox.flat import FlatCFM
+from cfmtoolbox.generation import generate_cfm
+from cfmtoolbox.models import structurally_equal
+from cfmtoolbox.plugins.big_m import apply_big_m
+from cfmtoolbox.plugins.random_sampling import RandomSampler
+
+
+def test_generate_cfm_has_the_requested_number_of_features():
+    cfm = generate_cfm(250, max_depth=5, max_children=3)
+
+    assert len(cfm.features) == 250
+    assert [feature.name for feature in cfm.features] == [f"f{i}" for i in range(250)]
+    assert max(cfm.feature_index.depths) <= 5
+    assert all(len(feature.children) <= 3 for feature in cfm.features)
+
+
+def test_generate_cfm_is_reproducible():
+    def generate(seed: int):
+        return generate_cfm(
+            300, clone_probability=0.2, constraint_density=0.05, seed=seed
+        )
+
+    assert structurally_equal(generate(7), generate(7))
+    assert not structurally_equal(generate(7), generate(8))
+
+
+def test_generate_cfm_rejects_trees_that_are_too_small():
+    with pytest.raises(ValueError, match="cannot hold 100 features"):
+        generate_cfm(100, max_depth=2, max_children=3)
+
+    with pytest.raises(ValueError):
+        generate_cfm(0)
+
+
+def test_generate_cfm_boolean_features():
+    cfm = generate_cfm(200, seed=1)
+
+    assert not cfm.is_unbound
+    assert all(
+        feature.instance_cardinality.intervals[0].upper == 1 for feature in cfm.features
+    )
+
+
+def test_generate_cfm_clonable_features():
+    cfm = generate_cfm(200, clone_probability=0.5, unbounded_probability=0.1, seed=1)
+    uppers = [
+        feature.instance_cardinality.intervals[0].upper for feature in cfm.features
+    ]
+
+    assert cfm.is_unbound
+    assert None in uppers
+    assert any(upper is not None and upper > 1 for upper in uppers)
+
+
+def test_generate_cfm_constraint_density():
+    cfm = generate_cfm(400, constraint_density=0.05, seed=3)
+
+    assert len(cfm.constraints) == 20
+    assert all(
+        constraint.first_feature is not constraint.second_feature
+        and not constraint.first_feature.is_required
+        for constraint in cfm.constraints
+    )
+    # Constraints only refer to features of the model
+    FlatCFM.from_cfm(cfm)
+
+
+def test_generate_cfm_group_cardinalities_admit_samples():
+    cfm = generate_cfm(
+        300, clone_probability=0.2, unbounded_probability=0.05, constraint_density=0.01
+    )
+    apply_big_m(cfm)
+
+    sampler = RandomSampler(cfm)
+    for _ in range(5):
+        assert sampler.random_sampling().validate(cfm)
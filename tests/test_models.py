@@ -1,4 +1,5 @@
-from collections import defaultdict
+import copy
+import pickle
 
 import pytest
 
@@ -8,7 +9,9 @@ from cfmtoolbox.models import (
     ConfigurationNode,
     Constraint,
     Feature,
+    FeatureIndex,
     Interval,
+    structurally_equal,
 )
 
 
@@ -34,6 +37,49 @@ def test_cardinality_string(intervals: list[Interval], expectation: str):
     assert str(cardinality) == expectation
 
 
+def test_intervals_are_interned():
+    assert Interval(1, 10) is Interval(lower=1, upper=10)
+    assert Interval(1, None) is not Interval(1, 10)
+
+
+def test_cardinalities_are_interned():
+    assert Cardinality([Interval(0, 1)]) is Cardinality((Interval(0, 1),))
+    assert Cardinality([]) is Cardinality(intervals=[])
+    assert Cardinality([Interval(0, 1)]) is not Cardinality([Interval(1, 1)])
+
+
+def test_cardinality_intervals_are_a_tuple():
+    cardinality = Cardinality([Interval(1, 4), Interval(6, 10)])
+    assert cardinality.intervals == (Interval(1, 4), Interval(6, 10))
+
+
+@pytest.mark.parametrize(
+    "value", [Interval(1, 10), Cardinality([Interval(1, 10), Interval(20, None)])]
+)
+def test_intervals_and_cardinalities_are_immutable(value: Interval | Cardinality):
+    with pytest.raises(AttributeError, match="immutable"):
+        setattr(value, "upper", 3)
+
+    with pytest.raises(AttributeError, match="immutable"):
+        delattr(value, "intervals")
+
+
+@pytest.mark.parametrize(
+    "value", [Interval(1, 10), Cardinality([Interval(1, 10), Interval(20, None)])]
+)
+def test_copies_of_intervals_and_cardinalities_are_interned(
+    value: Interval | Cardinality,
+):
+    assert copy.copy(value) is value
+    assert copy.deepcopy(value) is value
+    assert pickle.loads(pickle.dumps(value)) is value
+
+
+def test_interval_and_cardinality_repr():
+    cardinality = Cardinality([Interval(1, None)])
+    assert repr(cardinality) == "Cardinality(intervals=[Interval(lower=1, upper=None)])"
+
+
 def test_feature_string():
     feature = Feature(
         "Cheese", Cardinality([]), Cardinality([]), Cardinality([]), None, []
@@ -58,6 +104,116 @@ def test_cardinality_is_valid():
     assert not cardinality.is_valid_cardinality(55)
 
 
+@pytest.mark.parametrize(
+    ["intervals", "expectation"],
+    [
+        ([], []),
+        ([Interval(3, 1)], []),
+        ([Interval(6, 10), Interval(1, 4)], [Interval(1, 4), Interval(6, 10)]),
+        ([Interval(1, 4), Interval(5, 10)], [Interval(1, 10)]),
+        ([Interval(1, 8), Interval(5, 10), Interval(2, 3)], [Interval(1, 10)]),
+        (
+            [Interval(4, None), Interval(1, 2), Interval(6, 9)],
+            [Interval(1, 2), Interval(4, None)],
+        ),
+        ([Interval(0, 0), Interval(2, 1), Interval(1, 1)], [Interval(0, 1)]),
+    ],
+)
+def test_cardinality_normalized(intervals: list[Interval], expectation: list[Interval]):
+    assert Cardinality(intervals).normalized() == Cardinality(expectation)
+
+
+def test_cardinality_is_empty():
+    assert Cardinality([]).is_empty
+    assert Cardinality([Interval(5, 4)]).is_empty
+    assert not Cardinality([Interval(0, 0)]).is_empty
+
+
+def test_cardinality_is_valid_with_unsorted_and_unbounded_intervals():
+    cardinality = Cardinality([Interval(40, None), Interval(1, 10), Interval(8, 12)])
+    assert not cardinality.is_valid_cardinality(0)
+    assert cardinality.is_valid_cardinality(1)
+    assert cardinality.is_valid_cardinality(12)
+    assert not cardinality.is_valid_cardinality(13)
+    assert not cardinality.is_valid_cardinality(39)
+    assert cardinality.is_valid_cardinality(40)
+    assert cardinality.is_valid_cardinality(10**9)
+    assert not Cardinality([]).is_valid_cardinality(0)
+
+
+def test_cardinality_union():
+    first = Cardinality([Interval(1, 3), Interval(10, 12)])
+    second = Cardinality([Interval(4, 5), Interval(20, None)])
+    assert first.union(second) == Cardinality(
+        [Interval(1, 5), Interval(10, 12), Interval(20, None)]
+    )
+
+
+@pytest.mark.parametrize(
+    ["first", "second", "expectation"],
+    [
+        ([Interval(1, 10)], [Interval(5, 20)], [Interval(5, 10)]),
+        ([Interval(1, 3)], [Interval(4, 5)], []),
+        (
+            [Interval(0, 2), Interval(5, 8), Interval(10, None)],
+            [Interval(1, 6), Interval(8, 11)],
+            [Interval(1, 2), Interval(5, 6), Interval(8, 8), Interval(10, 11)],
+        ),
+        ([Interval(3, None)], [Interval(1, None)], [Interval(3, None)]),
+    ],
+)
+def test_cardinality_intersection(
+    first: list[Interval], second: list[Interval], expectation: list[Interval]
+):
+    assert Cardinality(first).intersection(Cardinality(second)) == Cardinality(
+        expectation
+    )
+
+
+def test_cardinality_minkowski_sum():
+    first = Cardinality([Interval(0, 1), Interval(10, 10)])
+    second = Cardinality([Interval(0, 0), Interval(100, None)])
+    assert first + second == Cardinality(
+        [Interval(0, 1), Interval(10, 10), Interval(100, None)]
+    )
+    assert first + Cardinality([]) == Cardinality([])
+
+
+def test_cardinality_minkowski_difference():
+    first = Cardinality([Interval(0, 1), Interval(4, 4)])
+    second = Cardinality([Interval(1, 2)])
+    assert first - second == Cardinality([Interval(-2, 0), Interval(2, 3)])
+    assert Cardinality([Interval(3, None)]) - second == Cardinality([Interval(1, None)])
+    assert first - Cardinality([]) == Cardinality([])
+
+
+def test_cardinality_minkowski_difference_requires_bounded_subtrahends():
+    with pytest.raises(ValueError, match="unbounded"):
+        Cardinality([Interval(1, 1)]) - Cardinality([Interval(0, None)])
+
+
+@pytest.mark.parametrize(
+    ["first", "second", "expectation"],
+    [
+        (
+            [Interval(0, None)],
+            [Interval(1, 2), Interval(5, 5)],
+            [Interval(0, 0), Interval(3, 4), Interval(6, None)],
+        ),
+        ([Interval(1, 2)], [Interval(0, 3)], []),
+        ([Interval(-3, 3)], [Interval(0, None)], [Interval(-3, -1)]),
+        ([Interval(2, 4), Interval(8, 9)], [], [Interval(2, 4), Interval(8, 9)]),
+        ([], [Interval(1, 1)], []),
+    ],
+)
+def test_cardinality_difference(
+    first: list[Interval], second: list[Interval], expectation: list[Interval]
+):
+    assert Cardinality(first).difference(Cardinality(second)) == Cardinality(
+        expectation
+    )
+
+
 def test_feature_is_required():
     cardinality = Cardinality([Interval(1, 10)])
     feature = Feature("Cheese", cardinality, cardinality, cardinality, None, [])
@@ -205,158 +361,169 @@ def test_cfm_is_unbound(cfm: CFM, expectation: bool):
     assert cfm.is_unbound is expectation
 
 
-def test_partition_children():
-    feature = Feature(
-        "Sandwich",
-        Cardinality([]),
-        Cardinality([]),
-        Cardinality([]),
-        None,
-        [
-            Feature(
-                "Bread", Cardinality([]), Cardinality([]), Cardinality([]), None, []
-            ),
-            Feature(
-                "Cheese", Cardinality([]), Cardinality([]), Cardinality([]), None, []
-            ),
-            Feature(
-                "Meat", Cardinality([]), Cardinality([]), Cardinality([]), None, []
-            ),
-        ],
+def make_sandwich_cfm() -> CFM:
+    sandwich = Feature(
+        "Sandwich", Cardinality([]), Cardinality([]), Cardinality([]), None, []
     )
-    feature_node = ConfigurationNode(
-        "Sandwich",
-        [
-            ConfigurationNode("Bread#0", []),
-            ConfigurationNode("Bread#1", []),
-            ConfigurationNode("Meat#0", []),
-        ],
+    bread = Feature(
+        "Bread", Cardinality([]), Cardinality([]), Cardinality([]), sandwich, []
     )
-    assert feature_node.partition_children(feature) == [
-        [
-            ConfigurationNode("Bread#0", []),
-            ConfigurationNode("Bread#1", []),
-        ],
-        [],
-        [
-            ConfigurationNode("Meat#0", []),
-        ],
+    cheese = Feature(
+        "Cheese", Cardinality([]), Cardinality([]), Cardinality([]), sandwich, []
+    )
+    wheat = Feature(
+        "Wheat", Cardinality([]), Cardinality([]), Cardinality([]), bread, []
+    )
+    sandwich.children = [bread, cheese]
+    bread.children = [wheat]
+    return CFM(sandwich, [])
+
+
+def test_feature_index_from_root():
+    cfm = make_sandwich_cfm()
+    index = FeatureIndex.from_root(cfm.root)
+
+    assert [feature.name for feature in index.features] == [
+        "Sandwich",
+        "Bread",
+        "Cheese",
+        "Wheat",
     ]
+    assert index.ids == {"Sandwich": 0, "Bread": 1, "Cheese": 2, "Wheat": 3}
+    assert index.features_by_name["Wheat"] is index.features[3]
+    assert index.parents == [-1, 0, 0, 1]
+    assert index.depths == [0, 1, 1, 2]
 
 
-@pytest.mark.parametrize(
-    ["feature", "feature_instance", "expectation"],
-    [
-        (
-            Feature(
-                "Sandwich",
-                Cardinality([]),
-                Cardinality([]),
-                Cardinality([]),
-                None,
-                [],
-            ),
-            ConfigurationNode("Sandwich#0", []),
-            True,
-        ),
-        (
-            Feature(
-                "Sandwich",
-                Cardinality([]),
-                Cardinality([]),
-                Cardinality([]),
-                None,
-                [],
-            ),
-            ConfigurationNode("Sandwich#0", [ConfigurationNode("Bread#0", [])]),
-            False,
-        ),
-    ],
-)
-def test_validate_children_no_children(
-    feature: Feature, feature_instance: ConfigurationNode, expectation: bool
-):
-    assert feature_instance.validate_children(feature) == expectation
+def test_cfm_features_are_cached():
+    cfm = make_sandwich_cfm()
+    assert cfm.features is cfm.features
+    assert cfm.feature_index is cfm.feature_index
 
 
-@pytest.mark.parametrize(
-    ["feature_instance", "expectation"],
-    [
-        (
-            ConfigurationNode("Sandwich#0", [ConfigurationNode("Bread#0", [])]),
-            False,
-        ),
-        (
-            ConfigurationNode(
-                "Sandwich#0",
-                [
-                    ConfigurationNode("Bread#0", []),
-                    ConfigurationNode("Bread#1", []),
-                    ConfigurationNode("Bread#2", []),
-                ],
-            ),
-            False,
-        ),
-        (
-            ConfigurationNode(
-                "Sandwich#0",
-                [
-                    ConfigurationNode("Bread#0", []),
-                    ConfigurationNode("Bread#1", []),
-                    ConfigurationNode("Bread#2", []),
-                    ConfigurationNode("Cheese#0", []),
-                ],
-            ),
-            False,
-        ),
-        (
-            ConfigurationNode(
-                "Sandwich#0",
-                [
-                    ConfigurationNode("Bread#0", []),
-                    ConfigurationNode("Bread#1", []),
-                    ConfigurationNode("Cheese#0", []),
-                ],
-            ),
-            True,
-        ),
-    ],
-)
-def test_validate_children(feature_instance: ConfigurationNode, expectation: bool):
-    feature = Feature(
-        "Sandwich",
-        Cardinality([Interval(1, 1)]),
-        Cardinality([Interval(2, 3)]),
-        Cardinality([Interval(3, 4)]),
-        None,
-        [
-            Feature(
-                "Bread",
-                Cardinality([Interval(2, 2)]),
-                Cardinality([]),
-                Cardinality([]),
-                None,
-                [],
-            ),
-            Feature(
-                "Cheese",
-                Cardinality([Interval(0, 1)]),
-                Cardinality([]),
-                Cardinality([]),
-                None,
-                [],
-            ),
-            Feature(
-                "Meat",
-                Cardinality([Interval(0, 1)]),
-                Cardinality([]),
-                Cardinality([]),
-                None,
-                [],
-            ),
-        ],
+def test_cfm_find_feature():
+    cfm = make_sandwich_cfm()
+    assert cfm.find_feature("Cheese") is cfm.root.children[1]
+    assert cfm.find_feature("Ham") is None
+
+
+def test_cfm_add_feature_invalidates_index():
+    cfm = make_sandwich_cfm()
+    assert cfm.find_feature("Ham") is None
+
+    ham = Feature("Ham", Cardinality([]), Cardinality([]), Cardinality([]), None, [])
+    cfm.add_feature(ham, cfm.root)
+
+    assert ham.parent is cfm.root
+    assert cfm.root.children[-1] is ham
+    assert cfm.find_feature("Ham") is ham
+    assert len(cfm.features) == 5
+
+
+def test_cfm_remove_feature_invalidates_index():
+    cfm = make_sandwich_cfm()
+    bread = cfm.root.children[0]
+
+    cfm.remove_feature(bread)
+
+    assert bread.parent is None
+    assert [feature.name for feature in cfm.features] == ["Sandwich", "Cheese"]
+
+
+def test_cfm_remove_feature_refuses_root():
+    cfm = make_sandwich_cfm()
+
+    with pytest.raises(ValueError, match="root feature cannot be removed"):
+        cfm.remove_feature(cfm.root)
+
+
+def test_cfm_replacing_root_invalidates_index():
+    cfm = make_sandwich_cfm()
+    assert len(cfm.features) == 4
+
+    cfm.root = cfm.root.children[0]
+
+    assert [feature.name for feature in cfm.features] == ["Bread", "Wheat"]
+
+
+def test_cfm_invalidate_feature_index_picks_up_direct_modifications():
+    cfm = make_sandwich_cfm()
+    assert len(cfm.features) == 4
+
+    cfm.root.children.pop()
+    cfm.invalidate_feature_index()
+
+    assert len(cfm.features) == 3
+
+
+def test_features_compare_by_identity():
+    first = Feature(
+        "Cheese", Cardinality([]), Cardinality([]), Cardinality([]), None, []
     )
-    assert feature_instance.validate_children(feature) == expectation
+    second = Feature(
+        "Cheese", Cardinality([]), Cardinality([]), Cardinality([]), None, []
+    )
+
+    assert first == first
+    assert first != second
+    assert len({first, second, first}) == 2
+    assert {first: 1}[first] == 1
+
+
+def test_structurally_equal_models():
+    assert structurally_equal(make_sandwich_cfm(), make_sandwich_cfm())
+
+
+def test_structurally_equal_detects_different_cardinalities():
+    first = make_sandwich_cfm()
+    second = make_sandwich_cfm()
+    second.features[3].instance_cardinality = Cardinality([Interval(0, 1)])
+
+    assert not structurally_equal(first, second)
+
+
+def test_structurally_equal_detects_different_children():
+    first = make_sandwich_cfm()
+    second = make_sandwich_cfm()
+    second.root.children.reverse()
+
+    assert not structurally_equal(first, second)
+
+
+def test_structurally_equal_compares_constraints():
+    first = make_sandwich_cfm()
+    second = make_sandwich_cfm()
+
+    for cfm in (first, second):
+        cfm.constraints.append(
+            Constraint(
+                True,
+                cfm.features[1],
+                Cardinality([Interval(1, 1)]),
+                cfm.features[2],
+                Cardinality([Interval(1, 1)]),
+            )
+        )
+    assert structurally_equal(first, second)
+
+    second.constraints[0].second_feature = second.features[3]
+    assert not structurally_equal(first, second)
+
+
+def test_structurally_equal_handles_deep_models():
+    def make_chain(depth: int) -> CFM:
+        root = Feature("0", Cardinality([]), Cardinality([]), Cardinality([]), None, [])
+        feature = root
+        for i in range(1, depth):
+            child = Feature(
+                str(i), Cardinality([]), Cardinality([]), Cardinality([]), feature, []
+            )
+            feature.children.append(child)
+            feature = child
+        return CFM(root, [])
+
+    assert structurally_equal(make_chain(5000), make_chain(5000))
+    assert not structurally_equal(make_chain(5000), make_chain(4999))
 
 
 @pytest.mark.parametrize(
@@ -451,286 +618,3 @@ def test_validate_feature_instance(
     )
     cfm = CFM(feature, [])
     assert feature_instance.validate(cfm) == expectation
-
-
-@pytest.mark.parametrize(
-    ["feature_instance", "expectation"],
-    [
-        (
-            ConfigurationNode("Milkshake#0", []),
-            {"Milkshake": 1},
-        ),
-        (
-            ConfigurationNode(
-                "Sandwich#0",
-                [
-                    ConfigurationNode("Bread#0", [ConfigurationNode("Wheat#0", [])]),
-                    ConfigurationNode("Bread#1", [ConfigurationNode("Wheat#1", [])]),
-                    ConfigurationNode("Cheese#0", []),
-                ],
-            ),
-            {"Sandwich": 1, "Bread": 2, "Wheat": 2, "Cheese": 1},
-        ),
-        (
-            ConfigurationNode(
-                "Sandwich#0",
-                [
-                    ConfigurationNode("Bread#0", [ConfigurationNode("Wheat#0", [])]),
-                    ConfigurationNode("Bread#1", [ConfigurationNode("Wheat#1", [])]),
-                    ConfigurationNode(
-                        "Cheese-mix#0",
-                        [
-                            ConfigurationNode("Swiss#0", []),
-                            ConfigurationNode("Gouda#0", []),
-                            ConfigurationNode("Gouda#1", []),
-                        ],
-                    ),
-                    ConfigurationNode(
-                        "Cheese-mix#1",
-                        [
-                            ConfigurationNode("Swiss#1", []),
-                            ConfigurationNode("Gouda#2", []),
-                            ConfigurationNode("Cheddar#0", []),
-                        ],
-                    ),
-                ],
-            ),
-            {
-                "Sandwich": 1,
-                "Bread": 2,
-                "Wheat": 2,
-                "Cheese-mix": 2,
-                "Swiss": 2,
-                "Gouda": 3,
-                "Cheddar": 1,
-            },
-        ),
-    ],
-)
-def test_initialize_global_feature_count(
-    feature_instance: ConfigurationNode, expectation: defaultdict[str, int]
-):
-    global_feature_count: defaultdict[str, int] = defaultdict(int)
-    feature_instance.initialize_global_feature_count(global_feature_count)
-    assert global_feature_count == expectation
-
-
-@pytest.mark.parametrize(
-    ["constraints", "expectation"],
-    [
-        (
-            [],
-            True,
-        ),
-        (
-            [
-                Constraint(
-                    True,
-                    Feature(
-                        "Bread",
-                        Cardinality([]),
-                        Cardinality([]),
-                        Cardinality([]),
-                        None,
-                        [],
-                    ),
-                    Cardinality([Interval(1, 1)]),
-                    Feature(
-                        "Cheese-mix",
-                        Cardinality([]),
-                        Cardinality([]),
-                        Cardinality([]),
-                        None,
-                        [],
-                    ),
-                    Cardinality([Interval(1, 1)]),
-                )
-            ],
-            True,
-        ),
-        (
-            [
-                Constraint(
-                    True,
-                    Feature(
-                        "Bread",
-                        Cardinality([]),
-                        Cardinality([]),
-                        Cardinality([]),
-                        None,
-                        [],
-                    ),
-                    Cardinality([Interval(2, 2)]),
-                    Feature(
-                        "Sourdough",
-                        Cardinality([]),
-                        Cardinality([]),
-                        Cardinality([]),
-                        None,
-                        [],
-                    ),
-                    Cardinality([Interval(2, 2)]),
-                )
-            ],
-            False,
-        ),
-        (
-            [
-                Constraint(
-                    True,
-                    Feature(
-                        "Bread",
-                        Cardinality([]),
-                        Cardinality([]),
-                        Cardinality([]),
-                        None,
-                        [],
-                    ),
-                    Cardinality([Interval(2, 2)]),
-                    Feature(
-                        "Cheese-mix",
-                        Cardinality([]),
-                        Cardinality([]),
-                        Cardinality([]),
-                        None,
-                        [],
-                    ),
-                    Cardinality([Interval(1, None)]),
-                )
-            ],
-            True,
-        ),
-        (
-            [
-                Constraint(
-                    False,
-                    Feature(
-                        "Swiss",
-                        Cardinality([]),
-                        Cardinality([]),
-                        Cardinality([]),
-                        None,
-                        [],
-                    ),
-                    Cardinality([Interval(4, None)]),
-                    Feature(
-                        "Cheese-mix",
-                        Cardinality([]),
-                        Cardinality([]),
-                        Cardinality([]),
-                        None,
-                        [],
-                    ),
-                    Cardinality([Interval(1, None)]),
-                )
-            ],
-            True,
-        ),
-        (
-            [
-                Constraint(
-                    False,
-                    Feature(
-                        "Gouda",
-                        Cardinality([]),
-                        Cardinality([]),
-                        Cardinality([]),
-                        None,
-                        [],
-                    ),
-                    Cardinality([Interval(2, None)]),
-                    Feature(
-                        "Cheese-mix",
-                        Cardinality([]),
-                        Cardinality([]),
-                        Cardinality([]),
-                        None,
-                        [],
-                    ),
-                    Cardinality([Interval(1, None)]),
-                )
-            ],
-            False,
-        ),
-        (
-            [
-                Constraint(
-                    True,
-                    Feature(
-                        "Bread",
-                        Cardinality([]),
-                        Cardinality([]),
-                        Cardinality([]),
-                        None,
-                        [],
-                    ),
-                    Cardinality([Interval(2, 2)]),
-                    Feature(
-                        "Cheese-mix",
-                        Cardinality([]),
-                        Cardinality([]),
-                        Cardinality([]),
-                        None,
-                        [],
-                    ),
-                    Cardinality([Interval(1, None)]),
-                ),
-                Constraint(
-                    False,
-                    Feature(
-                        "Swiss",
-                        Cardinality([]),
-                        Cardinality([]),
-                        Cardinality([]),
-                        None,
-                        [],
-                    ),
-                    Cardinality([Interval(4, None)]),
-                    Feature(
-                        "Cheese-mix",
-                        Cardinality([]),
-                        Cardinality([]),
-                        Cardinality([]),
-                        None,
-                        [],
-                    ),
-                    Cardinality([Interval(1, None)]),
-                ),
-            ],
-            True,
-        ),
-    ],
-)
-def test_validate_constraints(
-    constraints: list[Constraint],
-    expectation: bool,
-):
-    feature_instance = ConfigurationNode(
-        "Sandwich#0",
-        [
-            ConfigurationNode("Bread#0", [ConfigurationNode("Wheat#0", [])]),
-            ConfigurationNode("Bread#1", [ConfigurationNode("Wheat#1", [])]),
-            ConfigurationNode(
-                "Cheese-mix#0",
-                [
-                    ConfigurationNode("Swiss#0", []),
-                    ConfigurationNode("Gouda#0", []),
-                    ConfigurationNode("Gouda#1", []),
-                ],
-            ),
-            ConfigurationNode(
-                "Cheese-mix#1",
-                [
-                    ConfigurationNode("Swiss#1", []),
-                    ConfigurationNode("Gouda#2", []),
-                    ConfigurationNode("Cheddar#0", []),
-                ],
-            ),
-        ],
-    )
-
-    dummy_root = Feature(
-        "Dummy", Cardinality([]), Cardinality([]), Cardinality([]), None, []
-    )
-    cfm = CFM(dummy_root, constraints)
-    assert feature_instance.validate_constraints(cfm) == expectation
@@ -0,0 +1,102 @@
+import pstats
+import tracemalloc
+
+import pytest
+
+from cfmtoolbox.profiling import PhaseTiming, Profiler, format_size
+
+
+def test_phase_records_wall_time():
+    profiler = Profiler()
+
+    with profiler.run():
+        with profiler.phase("import"):
+            pass
+        with profiler.phase("convert"):
+            pass
+
+    assert [phase.name for phase in profiler.phases] == ["import", "convert"]
+    assert all(phase.duration >= 0 for phase in profiler.phases)
+    assert all(phase.peak_memory is None for phase in profiler.phases)
+
+
+def test_phase_records_peak_memory_when_tracing():
+    profiler = Profiler(trace_memory=True)
+
+    with profiler.run():
+        with profiler.phase("allocate"):
+            data = bytearray(2**20)
+            del data
+        with profiler.phase("idle"):
+            pass
+
+    assert not tracemalloc.is_tracing()
+    allocate, idle = profiler.phases
+    assert allocate.peak_memory is not None and allocate.peak_memory >= 2**20
+    assert idle.peak_memory is not None and idle.peak_memory < 2**20
+
+
+def test_run_resets_phases():
+    profiler = Profiler()
+
+    with profiler.run():
+        with profiler.phase("import"):
+            pass
+
+    with profiler.run():
+        pass
+
+    assert profiler.phases == []
+
+
+def test_run_dumps_cprofile_stats(tmp_path):
+    profile_path = tmp_path / "run.prof"
+    profiler = Profiler(profile_path=profile_path)
+
+    with profiler.run():
+        sorted(range(1000))
+
+    assert pstats.Stats(str(profile_path)).get_stats_profile().func_profiles
+
+
+def test_run_dumps_cprofile_stats_of_failing_runs(tmp_path):
+    profile_path = tmp_path / "run.prof"
+    profiler = Profiler(profile_path=profile_path)
+
+    with pytest.raises(ValueError), profiler.run():
+        raise ValueError()
+
+    assert profile_path.exists()
+
+
+def test_summary_lists_phases_and_total():
+    profiler = Profiler()
+    profiler.phases = [
+        PhaseTiming("import", 1.5, 2048),
+        PhaseTiming("convert", 0.25, 4096),
+    ]
+
+    table = profiler.summary()
+
+    assert [column.header for column in table.columns] == [
+        "Phase",
+        "Time",
+        "Peak memory",
+    ]
+    assert list(table.columns[0].cells) == ["import", "convert", "total"]
+    assert list(table.columns[1].cells) == ["1.500s", "0.250s", "1.750s"]
+    assert list(table.columns[2].cells) == ["2.0 KiB", "4.0 KiB", "4.0 KiB"]
+
+
+@pytest.mark.parametrize(
+    ["size", "expectation"],
+    [
+        (None, "-"),
+        (12, "12 B"),
+        (1536, "1.5 KiB"),
+        (3 * 2**20, "3.0 MiB"),
+        (5 * 2**30, "5.0 GiB"),
+    ],
+)
+def test_format_size(size: int | None, expectation: str):
+    assert format_size(size) == expectation
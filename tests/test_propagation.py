@@ -0,0 +1,115 @@
+import pytest
+
+from cfmtoolbox.flat import FlatCFM
+from cfmtoolbox.models import CFM, Cardinality, Constraint, Feature, Interval
+from cfmtoolbox.propagation import ANY_COUNT, NOT_FINAL, ConstraintPropagator
+
+
+def feature(
+    name: str, lower: int, upper: int, children: list[Feature] | None = None
+) -> Feature:
+    created = Feature(
+        name,
+        Cardinality([Interval(lower, upper)]),
+        Cardinality([Interval(0, len(children))]) if children else Cardinality([]),
+        Cardinality([Interval(0, 10)]) if children else Cardinality([]),
+        None,
+        children or [],
+    )
+    for child in created.children:
+        child.parent = created
+
+    return created
+
+
+@pytest.fixture
+def features() -> dict[str, Feature]:
+    # An optional feature a, a mandatory feature b and a clonable group c with x
+    x = feature("x", 0, 2)
+    root = feature(
+        "root",
+        1,
+        1,
+        [feature("a", 0, 1), feature("b", 1, 1), feature("c", 0, 3, [x])],
+    )
+
+    return {created.name: created for created in [root, *root.children, x]}
+
+
+def create_propagator(
+    features: dict[str, Feature], constraints: list[Constraint]
+) -> tuple[ConstraintPropagator, dict[str, int]]:
+    propagator = ConstraintPropagator(
+        FlatCFM.from_cfm(CFM(features["root"], constraints))
+    )
+    propagator.reset()
+    ids = {name: index for index, name in enumerate(propagator.flat_cfm.names)}
+
+    return propagator, ids
+
+
+def present() -> Cardinality:
+    return Cardinality([Interval(1, None)])
+
+
+def test_count_bounds_follow_the_instance_cardinalities(features):
+    propagator, ids = create_propagator(features, [])
+
+    assert propagator.minimum_counts[ids["b"]] == 1
+    assert propagator.minimum_counts[ids["x"]] == 0
+    assert propagator.maximum_counts[ids["x"]] == 6
+
+
+def test_exclude_of_a_mandatory_feature_is_decided_from_the_start(features):
+    propagator, ids = create_propagator(
+        features,
+        [Constraint(False, features["a"], present(), features["b"], present())],
+    )
+    counts = [0] * len(ids)
+
+    assert propagator.allowed_counts(ids["a"], counts) == Cardinality([Interval(0, 0)])
+
+
+def test_require_is_decided_once_the_first_count_is_final(features):
+    propagator, ids = create_propagator(
+        features,
+        [Constraint(True, features["a"], present(), features["x"], present())],
+    )
+    counts = [0] * len(ids)
+
+    assert propagator.allowed_counts(ids["x"], counts) == ANY_COUNT
+
+    propagator.finalize(ids["a"], 1)
+    assert propagator.allowed_counts(ids["x"], counts) == Cardinality(
+        [Interval(1, None)]
+    )
+
+
+def test_skipping_a_subtree_is_prevented_by_its_constrained_descendants(features):
+    propagator, ids = create_propagator(
+        features,
+        [Constraint(True, features["a"], present(), features["x"], present())],
+    )
+    counts = [0] * len(ids)
+    propagator.finalize(ids["a"], 1)
+
+    assert propagator.constrained_descendants[ids["c"]] == [ids["x"]]
+    assert propagator.allowed_instances(
+        ids["c"], Cardinality([Interval(0, 3)]), counts
+    ) == Cardinality([Interval(1, 3)])
+
+
+def test_restore_undoes_the_final_counts_since_the_checkpoint(features):
+    propagator, ids = create_propagator(
+        features,
+        [Constraint(True, features["a"], present(), features["x"], present())],
+    )
+    checkpoint = propagator.checkpoint()
+
+    propagator.finalize(ids["c"], 0)
+    propagator.finalize_subtree(ids["c"], [0] * len(ids))
+    assert propagator.final_counts[ids["x"]] == 0
+
+    propagator.restore(checkpoint)
+    assert propagator.final_counts[ids["c"]] == NOT_FINAL
+    assert propagator.final_counts[ids["x"]] == NOT_FINAL
@@ -0,0 +1,34 @@
+import random
+import secrets
+
+import pytest
+
+from cfmtoolbox.randomness import create_random_generator, derive_seeds
+
+
+def test_create_random_generator_is_reproducible_with_seed():
+    first = create_random_generator(42)
+    second = create_random_generator(42)
+
+    assert type(first) is random.Random
+    assert [first.random() for _ in range(5)] == [second.random() for _ in range(5)]
+
+
+def test_create_random_generator_secure():
+    assert isinstance(create_random_generator(secure=True), secrets.SystemRandom)
+
+    with pytest.raises(ValueError, match="cannot be seeded"):
+        create_random_generator(42, secure=True)
+
+
+def test_derive_seeds_is_reproducible():
+    seeds = derive_seeds(42, 3)
+
+    assert seeds == derive_seeds(42, 3)
+    assert len(set(seeds)) == 3
+    assert derive_seeds(42, 5)[:3] == seeds
+    assert derive_seeds(43, 3) != seeds
+
+
+def test_derive_seeds_without_master_seed():
+    assert derive_seeds(None, 2) != derive_seeds(None, 2)
@@ -0,0 +1,48 @@
+import json
+from pathlib import Path
+
+from cfmtoolbox.flat import FlatConfiguration
+from cfmtoolbox.samples import write_samples
+
+
+def sample(instance: int) -> FlatConfiguration:
+    configuration = FlatConfiguration(["root", "child"])
+    root = configuration.open_node(0, instance)
+    configuration.open_node(1, instance)
+    configuration.close_node(root)
+    return configuration
+
+
+def test_write_samples_as_json_list(capsys):
+    write_samples([sample(0), sample(1)])
+
+    assert json.loads(capsys.readouterr().out) == [
+        {"value": "root#0", "children": [{"value": "child#0", "children": []}]},
+        {"value": "root#1", "children": [{"value": "child#1", "children": []}]},
+    ]
+
+
+def test_write_samples_as_json_lines(capsys):
+    write_samples([sample(0), sample(1)], jsonl=True)
+
+    assert capsys.readouterr().out.splitlines() == [
+        '{"value":"root#0","children":[{"value":"child#0","children":[]}]}',
+        '{"value":"root#1","children":[{"value":"child#1","children":[]}]}',
+    ]
+
+
+def test_write_samples_streams_json_lines_to_file(tmp_path: Path):
+    output = tmp_path / "samples.jsonl"
+
+    def samples():
+        yield sample(0)
+        # The first sample is already written when the next one is drawn
+        assert output.read_text().count("\n") == 1
+        yield sample(1)
+
+    write_samples(samples(), jsonl=True, output=output)
+
+    assert [json.loads(line)["value"] for line in output.read_text().splitlines()] == [
+        "root#0",
+        "root#1",
+    ]
@@ -0,0 +1,238 @@
+import json
+import shutil
+import socket
+import stat
+import threading
+from io import StringIO
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+import cfmtoolbox.plugins.conversion  # noqa: F401
+import cfmtoolbox.plugins.debugging  # noqa: F401
+import cfmtoolbox.plugins.json_export  # noqa: F401
+import cfmtoolbox.plugins.json_import  # noqa: F401
+from cfmtoolbox import app
+from cfmtoolbox.server import (
+    INVALID_PARAMS,
+    INVALID_REQUEST,
+    METHOD_NOT_FOUND,
+    PARSE_ERROR,
+    SERVER_ERROR,
+    ModelServer,
+)
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    path = tmp_path / "sandwich.json"
+    shutil.copy("tests/data/sandwich.json", path)
+    return path
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(app, "cache", None)
+    return ModelServer(app, max_models=2)
+
+
+def request(method: str, params: dict | None = None, request_id: int = 1) -> dict:
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "method": method,
+        "params": params or {},
+    }
+
+
+def test_run_returns_output_and_timings(server: ModelServer, model_path: Path):
+    response = server.handle(
+        request("run", {"import": str(model_path), "commands": [["convert"]]})
+    )
+
+    assert response is not None
+    assert response["id"] == 1
+    assert response["result"]["output"] == "Converting CFM...\n"
+    assert [name for name, _ in response["result"]["timings"]] == [
+        "import",
+        "convert",
+    ]
+
+
+def test_run_exports_the_model(server: ModelServer, model_path: Path, tmp_path):
+    export_path = tmp_path / "out.json"
+
+    response = server.handle(
+        request("run", {"import": str(model_path), "export": str(export_path)})
+    )
+
+    assert response is not None
+    assert "result" in response
+    assert "root" in json.loads(export_path.read_text())
+
+
+def test_run_keeps_models_resident_until_they_change(
+    server: ModelServer, model_path: Path, monkeypatch
+):
+    imports = []
+    import_model = app.import_model
+
+    def counting_import_model():
+        imports.append(app.import_path)
+        return import_model()
+
+    monkeypatch.setattr(app, "import_model", counting_import_model)
+    params = {"import": str(model_path), "commands": [["debug"]]}
+
+    first = server.handle(request("run", params))
+    second = server.handle(request("run", params))
+
+    assert first is not None and second is not None
+    assert first["result"]["output"] == second["result"]["output"]
+    assert len(imports) == 1
+
+    model_path.write_text(model_path.read_text() + "\n")
+    server.handle(request("run", params))
+
+    assert len(imports) == 2
+
+
+def test_resident_models_are_evicted(server: ModelServer, tmp_path):
+    paths = []
+    for name in ["a", "b", "c"]:
+        path = tmp_path / f"{name}.json"
+        shutil.copy("tests/data/sandwich.json", path)
+        paths.append(path)
+        server.handle(request("run", {"import": str(path)}))
+
+    response = server.handle(request("models"))
+
+    assert response is not None
+    assert response["result"] == [str(path.resolve()) for path in paths[1:]]
+
+
+@pytest.mark.parametrize(
+    ["message", "code"],
+    [
+        ({"id": 1, "method": "run"}, INVALID_REQUEST),
+        (request("fly"), METHOD_NOT_FOUND),
+        (request("run", {"import": 1}), INVALID_PARAMS),
+        (request("run", {"import": "x.json", "commands": ["convert"]}), INVALID_PARAMS),
+        (request("run", {"import": "missing.json"}), SERVER_ERROR),
+        (request("run", {"import": "m.json", "commands": [["eat"]]}), SERVER_ERROR),
+    ],
+)
+def test_handle_reports_errors(server: ModelServer, message: dict, code: int):
+    response = server.handle(message)
+
+    assert response is not None
+    assert response["error"]["code"] == code
+
+
+def test_handle_does_not_answer_notifications(server: ModelServer):
+    assert server.handle({"jsonrpc": "2.0", "method": "models"}) is None
+
+
+def test_serve_stream_until_shutdown(server: ModelServer, model_path: Path):
+    requests = [
+        "not json",
+        json.dumps(request("run", {"import": str(model_path)}, 1)),
+        "",
+        json.dumps(request("shutdown", request_id=2)),
+        json.dumps(request("models", request_id=3)),
+    ]
+    output = StringIO()
+
+    server.serve_stream(StringIO("\n".join(requests) + "\n"), output)
+
+    responses = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert responses[0]["error"]["code"] == PARSE_ERROR
+    assert responses[1]["id"] == 1
+    assert responses[2] == {"jsonrpc": "2.0", "id": 2, "result": None}
+    assert len(responses) == 3
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Unix sockets required")
+def test_serve_socket(server: ModelServer, model_path: Path, tmp_path):
+    socket_path = tmp_path / "cfmtoolbox.sock"
+    thread = threading.Thread(target=server.serve_socket, args=(socket_path,))
+    thread.start()
+
+    try:
+        for _ in range(100):
+            if socket_path.exists():
+                break
+            threading.Event().wait(0.01)
+
+        with socket.socket(socket.AF_UNIX) as client:
+            client.connect(str(socket_path))
+            # The server removes the socket once it shuts down
+            mode = socket_path.stat().st_mode
+            file = client.makefile("rw")
+            file.write(json.dumps(request("run", {"import": str(model_path)})) + "\n")
+            file.write(json.dumps(request("shutdown", request_id=2)) + "\n")
+            file.flush()
+            responses = [json.loads(file.readline()) for _ in range(2)]
+    finally:
+        thread.join(5)
+
+    assert stat.S_IMODE(mode) == 0o600
+
+    assert "result" in responses[0]
+    assert responses[1]["id"] == 2
+    assert not thread.is_alive()
+    assert not socket_path.exists()
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Unix sockets required")
+def test_serve_socket_does_not_replace_other_files(server: ModelServer, tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("notes")
+
+    with pytest.raises(FileExistsError, match="is not a socket"):
+        server.serve_socket(path)
+
+    assert path.read_text() == "notes"
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Unix sockets required")
+def test_serve_socket_replaces_stale_sockets(server: ModelServer, tmp_path):
+    socket_path = tmp_path / "cfmtoolbox.sock"
+    with socket.socket(socket.AF_UNIX) as stale_socket:
+        stale_socket.bind(str(socket_path))
+
+    server.running = False
+    server.serve_socket(socket_path)
+
+    assert not socket_path.exists()
+
+
+def test_cli_serves_on_stdin(model_path: Path):
+    requests = [
+        json.dumps(
+            request("run", {"import": str(model_path), "commands": [["convert"]]})
+        ),
+        json.dumps(request("shutdown", request_id=2)),
+    ]
+
+    result = CliRunner().invoke(app.typer, ["--serve"], input="\n".join(requests))
+
+    assert result.exit_code == 0, result.output
+    responses = [json.loads(line) for line in result.stdout.splitlines()]
+    assert responses[0]["result"]["output"] == "Converting CFM...\n"
+    assert responses[1]["result"] is None
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Unix sockets required")
+def test_cli_refuses_to_serve_on_other_files(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("notes")
+
+    result = CliRunner(mix_stderr=False).invoke(
+        app.typer, ["--serve", "--socket", str(path)]
+    )
+
+    assert result.exit_code == 1
+    assert "is not a socket" in result.stderr
+    assert path.read_text() == "notes"
@@ -1,9 +1,26 @@
+import copy
 import inspect
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from importlib.metadata import EntryPoint
+from io import BytesIO
+from pathlib import Path
 
 import pytest
 import typer
+from typer.testing import CliRunner
 
-from cfmtoolbox import CFM, Cardinality, CFMToolbox, Feature
+import cfmtoolbox.toolbox
+from cfmtoolbox import CFM, Cardinality, CFMToolbox, Feature, app, structurally_equal
+from cfmtoolbox.cache import ModelCache
+from cfmtoolbox.toolbox import (
+    UnknownCommandError,
+    UnsupportedFormatError,
+    parse_args,
+    split_pipeline,
+)
+
+runner = CliRunner(mix_stderr=False)
 
 
 @pytest.fixture
@@ -139,4 +156,582 @@ def test_command_prevent_typer_from_including_the_cfm_argument_in_the_cli():
 def test_load_plugins_loads_all_core_plugins():
     app = CFMToolbox()
     plugins = app.load_plugins()
-    assert len(plugins) == 10
+    assert len(plugins) == 14
+
+
+@pytest.mark.parametrize(
+    ["args", "expectation"],
+    [
+        ([], (None, None, [])),
+        (["--help"], (None, None, [])),
+        (["debug"], (None, None, ["debug"])),
+        (
+            ["--import", "in.uvl", "--export", "out.json", "debug", "--help"],
+            (Path("in.uvl"), Path("out.json"), ["debug", "--help"]),
+        ),
+        (
+            ["--import=in.xml", "--timings", "apply-big-m", "then", "random-sampling"],
+            (Path("in.xml"), None, ["apply-big-m", "then", "random-sampling"]),
+        ),
+        (["--import"], (Path(""), None, [])),
+        (
+            ["--import", "models", "--jobs", "4", "--export-format=json", "convert"],
+            (Path("models"), None, ["convert"]),
+        ),
+    ],
+)
+def test_parse_args(args: list[str], expectation: tuple):
+    assert parse_args(args) == expectation
+
+
+@pytest.mark.parametrize(
+    ["args", "expectation"],
+    [
+        ([], []),
+        (["debug"], [["debug"]]),
+        (
+            ["apply-big-m", "then", "random-sampling", "--num-samples", "2"],
+            [["apply-big-m"], ["random-sampling", "--num-samples", "2"]],
+        ),
+        (["debug", "then"], [["debug"], []]),
+    ],
+)
+def test_split_pipeline(args: list[str], expectation: list[list[str]]):
+    assert split_pipeline(args) == expectation
+
+
+@pytest.fixture
+def pipeline_app(root_feature):
+    app = CFMToolbox()
+    calls = []
+
+    @app.importer(".json")
+    def import_json(data: bytes) -> CFM:
+        calls.append("import")
+        # Every import returns a new model, as commands modify it
+        return CFM(copy.deepcopy(root_feature), [])
+
+    @app.exporter(".json")
+    def export_json(cfm: CFM) -> bytes:
+        calls.append("export")
+        return cfm.root.name.encode()
+
+    @app.command()
+    def rename(cfm: CFM, name: str = "Burger") -> CFM:
+        calls.append(f"rename {cfm.root.name}")
+        cfm.root.name = name
+        return cfm
+
+    @app.command()
+    def show(cfm: CFM) -> CFM:
+        calls.append(f"show {cfm.root.name}")
+        return cfm
+
+    return app, calls
+
+
+def test_pipeline_runs_commands_on_one_imported_model(pipeline_app, tmp_path):
+    app, calls = pipeline_app
+    import_path = tmp_path / "in.json"
+    import_path.write_bytes(b"{}")
+    export_path = tmp_path / "out.json"
+
+    result = runner.invoke(
+        app.typer,
+        [
+            "--import",
+            str(import_path),
+            "--export",
+            str(export_path),
+            "rename",
+            "--name",
+            "Wrap",
+            "then",
+            "show",
+            "then",
+            "rename",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert calls == ["import", "rename root", "show Wrap", "rename Wrap", "export"]
+    assert export_path.read_bytes() == b"Burger"
+    assert [timing.name for timing in app.timings] == [
+        "import",
+        "rename",
+        "show",
+        "rename",
+        "export",
+    ]
+
+
+def test_pipeline_prints_timings(pipeline_app, tmp_path):
+    app, _ = pipeline_app
+    import_path = tmp_path / "in.json"
+    import_path.write_bytes(b"{}")
+
+    result = runner.invoke(
+        app.typer, ["--import", str(import_path), "--timings", "show"]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "import: " in result.stderr
+    assert "show: " in result.stderr
+
+
+@pytest.mark.parametrize(
+    "commands", [[], ["show", "then"], ["then", "show"], ["show", "then", "eat"]]
+)
+def test_pipeline_rejects_missing_and_unknown_commands(
+    pipeline_app, commands: list[str]
+):
+    app, calls = pipeline_app
+
+    result = runner.invoke(app.typer, ["--import", "in.json", *commands])
+
+    assert result.exit_code == 2
+    assert not calls
+
+
+@pytest.fixture
+def declared_entry_points(monkeypatch):
+    declared = {
+        "cfmtoolbox.plugins": [
+            EntryPoint("json-import", "cfmtoolbox.plugins.json_import", ""),
+            EntryPoint("debugging", "cfmtoolbox.plugins.debugging", ""),
+            EntryPoint("undeclared", "cfmtoolbox.plugins.conversion", ""),
+        ],
+        "cfmtoolbox.importers": [
+            EntryPoint(".json", "cfmtoolbox.plugins.json_import", ""),
+        ],
+        "cfmtoolbox.exporters": [],
+        "cfmtoolbox.commands": [
+            EntryPoint("debug", "cfmtoolbox.plugins.debugging", ""),
+        ],
+    }
+    monkeypatch.setattr(
+        cfmtoolbox.toolbox, "entry_points", lambda group: declared[group]
+    )
+
+
+@pytest.mark.usefixtures("declared_entry_points")
+def test_declare_plugins_does_not_import_plugins(monkeypatch):
+    monkeypatch.delitem(sys.modules, "cfmtoolbox.plugins.debugging", raising=False)
+
+    app = CFMToolbox()
+    app.declare_plugins()
+
+    assert app.declared_importers == {".json": "cfmtoolbox.plugins.json_import"}
+    assert app.declared_commands == {"debug": "cfmtoolbox.plugins.debugging"}
+    assert app.undeclared_plugins == ["cfmtoolbox.plugins.conversion"]
+    assert "cfmtoolbox.plugins.debugging" not in sys.modules
+
+
+@pytest.mark.usefixtures("declared_entry_points")
+def test_load_plugins_for_loads_only_selected_and_undeclared_plugins():
+    app = CFMToolbox()
+    plugins = app.load_plugins_for(["--import", "model.json", "debug"])
+
+    assert [plugin.__name__ for plugin in plugins] == [
+        "cfmtoolbox.plugins.conversion",
+        "cfmtoolbox.plugins.debugging",
+        "cfmtoolbox.plugins.json_import",
+    ]
+
+
+@pytest.mark.usefixtures("declared_entry_points")
+def test_load_plugins_for_loads_all_plugins_without_declared_command():
+    app = CFMToolbox()
+    plugins = app.load_plugins_for(["--help"])
+
+    assert [plugin.__name__ for plugin in plugins] == [
+        "cfmtoolbox.plugins.json_import",
+        "cfmtoolbox.plugins.debugging",
+        "cfmtoolbox.plugins.conversion",
+    ]
+
+
+def test_import_model_loads_declared_importer(monkeypatch, tmp_path):
+    import_path = tmp_path / "sandwich.json"
+    import_path.write_bytes(Path("tests/data/sandwich.json").read_bytes())
+
+    monkeypatch.delitem(sys.modules, "cfmtoolbox.plugins.json_import", raising=False)
+    monkeypatch.setattr(app, "registered_importers", {})
+    monkeypatch.setattr(
+        app, "declared_importers", {".json": "cfmtoolbox.plugins.json_import"}
+    )
+    monkeypatch.setattr(app, "import_path", import_path)
+
+    model = app.import_model()
+
+    assert model is not None
+    assert model.root.name == "sandwich"
+    assert ".json" in app.registered_importers
+
+
+def test_stream_importer_is_preferred_and_receives_a_file(root_feature, tmp_path):
+    cfm = CFM(root_feature, [])
+    import_path = tmp_path / "test.uvl"
+    import_path.write_bytes(b"hello")
+
+    app = CFMToolbox()
+    app.import_path = import_path
+
+    @app.importer(".uvl")
+    def import_uvl(data: bytes):
+        raise AssertionError("bytes importer should not be used")
+
+    @app.stream_importer(".uvl")
+    def read_uvl(file):
+        assert file.read() == b"hello"
+        return cfm
+
+    assert app.registered_stream_importers[".uvl"] == read_uvl
+    assert app.import_model() is cfm
+
+
+def test_find_importer_adapts_bytes_importers(root_feature):
+    cfm = CFM(root_feature, [])
+    app = CFMToolbox()
+
+    @app.importer(".uvl")
+    def import_uvl(data: bytes):
+        assert data == b"hello"
+        return cfm
+
+    importer = app.find_importer(".uvl")
+
+    assert importer is not None
+    assert importer(BytesIO(b"hello")) is cfm
+    assert app.find_importer(".txt") is None
+
+
+def test_stream_exporter_writes_to_the_export_file(root_feature, tmp_path):
+    cfm = CFM(root_feature, [])
+    export_path = tmp_path / "test.uvl"
+
+    app = CFMToolbox()
+    app.export_path = export_path
+
+    @app.stream_exporter(".uvl")
+    def write_uvl(cfm: CFM, file):
+        file.write(b"hel")
+        file.write(b"lo")
+
+    app.export_model(cfm)
+
+    assert app.registered_stream_exporters[".uvl"] == write_uvl
+    assert export_path.read_text() == "hello"
+
+
+def test_export_model_removes_partial_exports_of_failing_exporters(
+    root_feature, tmp_path
+):
+    cfm = CFM(root_feature, [])
+    export_path = tmp_path / "test.uvl"
+
+    app = CFMToolbox()
+    app.export_path = export_path
+
+    @app.stream_exporter(".uvl")
+    def write_uvl(cfm: CFM, file):
+        file.write(b"hel")
+        raise TypeError("UVL cannot handle this model")
+
+    with pytest.raises(TypeError, match="UVL cannot handle this model"):
+        app.export_model(cfm)
+
+    assert not export_path.exists()
+
+
+def test_import_model_uses_the_model_cache(root_feature, tmp_path):
+    app = CFMToolbox()
+    app.cache = ModelCache(tmp_path / "cache")
+    calls = []
+
+    @app.importer(".json")
+    def import_json(data: bytes) -> CFM:
+        calls.append(data)
+        return CFM(root_feature, [])
+
+    import_path = tmp_path / "test.json"
+    import_path.write_bytes(b"{}")
+    app.import_path = import_path
+
+    first = app.import_model()
+    second = app.import_model()
+
+    assert calls == [b"{}"]
+    assert first is not None and second is not None
+    assert first is not second
+    assert structurally_equal(first, second)
+
+    import_path.write_bytes(b"{ }")
+    app.import_model()
+
+    assert calls == [b"{}", b"{ }"]
+
+
+def test_import_model_falls_back_to_uncached_imports(root_feature, tmp_path):
+    app = CFMToolbox()
+    (tmp_path / "file").write_bytes(b"")
+    app.cache = ModelCache(tmp_path / "file" / "cache")
+
+    @app.importer(".json")
+    def import_json(data: bytes) -> CFM:
+        return CFM(root_feature, [])
+
+    import_path = tmp_path / "test.json"
+    import_path.write_bytes(b"{}")
+    app.import_path = import_path
+
+    assert app.import_model() is not None
+
+
+def test_prepare_enables_the_model_cache_only_on_request():
+    app = CFMToolbox()
+
+    app.prepare()
+    assert app.cache is None
+
+    app.prepare(use_cache=True)
+    assert app.cache is not None
+
+    app.prepare(use_cache=False)
+    assert app.cache is None
+
+
+def test_pipeline_processes_batches_of_models(pipeline_app, tmp_path):
+    app, calls = pipeline_app
+    import_directory = tmp_path / "models"
+    import_directory.mkdir()
+    for name in ["a", "b"]:
+        (import_directory / f"{name}.json").write_bytes(name.encode())
+    export_directory = tmp_path / "exports"
+
+    result = runner.invoke(
+        app.typer,
+        [
+            "--import",
+            str(import_directory),
+            "--export",
+            str(export_directory),
+            "--export-format",
+            "json",
+            "rename",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert calls == ["import", "rename root", "export"] * 2
+    assert sorted(path.name for path in export_directory.iterdir()) == [
+        "a.json",
+        "b.json",
+    ]
+    stderr = " ".join(result.stderr.split())
+    assert f"{import_directory / 'a.json'}: " in stderr
+    assert "Processed 2 models" in stderr
+    assert app.import_path == import_directory
+
+
+def test_pipeline_isolates_failures_of_batch_models(pipeline_app, tmp_path):
+    app, calls = pipeline_app
+    (tmp_path / "a.json").write_bytes(b"{}")
+    (tmp_path / "b.xml").write_bytes(b"")
+
+    result = runner.invoke(app.typer, ["--import", str(tmp_path / "*"), "show"])
+
+    assert result.exit_code == 1
+    assert calls == ["import", "show root"]
+    stderr = " ".join(result.stderr.split())
+    assert f"{tmp_path / 'b.xml'}: failed" in stderr
+    assert "Processed 2 models" in stderr
+    assert "(1 failed)" in stderr
+
+
+def test_pipeline_rejects_batches_exporting_to_the_same_file(pipeline_app, tmp_path):
+    app, calls = pipeline_app
+    (tmp_path / "a.json").write_bytes(b"{}")
+    (tmp_path / "a.xml").write_bytes(b"")
+
+    result = runner.invoke(
+        app.typer,
+        [
+            "--import",
+            str(tmp_path / "a.*"),
+            "--export",
+            str(tmp_path / "out"),
+            "--export-format",
+            ".json",
+            "show",
+        ],
+    )
+
+    assert result.exit_code == 1
+    assert "would both be exported to" in " ".join(result.stderr.split())
+    assert not calls
+
+
+def test_pipeline_reports_empty_batches(pipeline_app, tmp_path):
+    app, _ = pipeline_app
+
+    result = runner.invoke(app.typer, ["--import", str(tmp_path / "*.json"), "show"])
+
+    assert result.exit_code == 1
+    assert "No models found" in result.stderr
+
+
+def test_pipeline_prints_profile(pipeline_app, tmp_path):
+    app, _ = pipeline_app
+    import_path = tmp_path / "in.json"
+    import_path.write_bytes(b"{}")
+    profile_path = tmp_path / "run.prof"
+
+    result = runner.invoke(
+        app.typer,
+        [
+            "--import",
+            str(import_path),
+            "--profile-output",
+            str(profile_path),
+            "show",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert "Peak memory" in result.stderr
+    assert [timing.name for timing in app.timings] == ["import", "show"]
+    assert all(timing.peak_memory is not None for timing in app.timings)
+    assert profile_path.exists()
+
+
+def test_load_imports_paths_and_contents(pipeline_app, tmp_path):
+    app, calls = pipeline_app
+    import_path = tmp_path / "model.json"
+    import_path.write_bytes(b"{}")
+
+    assert app.load(import_path).root.name == "root"
+    assert app.load(str(import_path)).root.name == "root"
+    assert app.load(b"{}", format="json").root.name == "root"
+    assert app.load(b"{}", format=".json").root.name == "root"
+    assert calls == ["import"] * 4
+    assert app.import_path is None
+
+
+def test_load_rejects_unknown_formats(pipeline_app, tmp_path):
+    app, _ = pipeline_app
+
+    with pytest.raises(ValueError, match="format of a model given as bytes"):
+        app.load(b"{}")
+
+    with pytest.raises(UnsupportedFormatError, match="Unsupported import format: .txt"):
+        app.load(b"features", format="txt")
+
+
+def test_load_uses_the_given_cache(pipeline_app, tmp_path):
+    app, calls = pipeline_app
+    cache = ModelCache(tmp_path / "cache")
+
+    first = app.load(b"{}", format=".json", cache=cache)
+    second = app.load(b"{}", format=".json", cache=cache)
+
+    assert calls == ["import"]
+    assert structurally_equal(first, second)
+
+
+def test_load_streams_cached_files_to_the_importer(root_feature, tmp_path):
+    app = CFMToolbox()
+    cache = ModelCache(tmp_path / "cache")
+    files = []
+
+    @app.stream_importer(".json")
+    def read_json(file) -> CFM:
+        files.append((type(file), file.read()))
+        return CFM(root_feature, [])
+
+    import_path = tmp_path / "model.json"
+    import_path.write_bytes(b"{}")
+
+    app.load(import_path, cache=cache)
+    app.load(import_path, cache=cache)
+
+    assert len(files) == 1
+    file_type, data = files[0]
+    assert file_type is not BytesIO
+    assert data == b"{}"
+
+
+def test_load_does_not_cache_binary_models(root_feature, tmp_path):
+    app = CFMToolbox()
+    cache = ModelCache(tmp_path / "cache")
+    calls = []
+
+    @app.stream_importer(".cfmb")
+    def read_cfmb(file) -> CFM:
+        calls.append("import")
+        return CFM(root_feature, [])
+
+    app.load(b"CFMB", format=".cfmb", cache=cache)
+    app.load(b"CFMB", format=".cfmb", cache=cache)
+
+    assert calls == ["import"] * 2
+    assert not cache.directory.exists()
+
+
+def test_load_uses_the_installed_plugins(root_feature):
+    app = CFMToolbox()
+
+    @app.exporter(".json")
+    def export_json(cfm: CFM) -> bytes:
+        return b"own exporter"
+
+    model = app.load("tests/data/sandwich.uvl")
+
+    assert model.root.name == "sandwich"
+    assert app.run("apply-big-m", model) is model
+    assert app.dump(model, ".json") == b"own exporter"
+    assert b"features" in app.dump(model, ".uvl")
+
+
+def test_dump_and_save_export_models(pipeline_app, root_feature, tmp_path):
+    app, _ = pipeline_app
+    cfm = CFM(root_feature, [])
+
+    assert app.dump(cfm, "json") == b"root"
+
+    app.save(cfm, tmp_path / "model.json")
+    assert (tmp_path / "model.json").read_bytes() == b"root"
+
+    app.save(cfm, tmp_path / "model.txt", format=".json")
+    assert (tmp_path / "model.txt").read_bytes() == b"root"
+
+    with pytest.raises(UnsupportedFormatError, match="Unsupported export format"):
+        app.dump(cfm, ".txt")
+
+    assert app.export_path is None
+
+
+def test_run_calls_commands_by_name(pipeline_app, root_feature):
+    app, calls = pipeline_app
+    cfm = CFM(root_feature, [])
+
+    assert app.run("rename", cfm, name="Wrap") is cfm
+    assert app.run("show", cfm) is cfm
+    assert calls == ["rename root", "show Wrap"]
+
+    with pytest.raises(UnknownCommandError, match="Unknown command: missing"):
+        app.run("missing", cfm)
+
+
+def test_library_api_can_be_used_from_several_threads(pipeline_app):
+    app, _ = pipeline_app
+
+    def process(name: str) -> bytes:
+        model = app.load(name.encode(), format=".json")
+        return app.dump(app.run("rename", model, name=name), ".json")
+
+    names = [f"model{i}" for i in range(50)]
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(process, names))
+
+    assert results == [name.encode() for name in names]
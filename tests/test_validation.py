@@ -0,0 +1,385 @@
+import pytest
+
+from cfmtoolbox.flat import FlatCFM, FlatConfiguration
+from cfmtoolbox.models import (
+    CFM,
+    Cardinality,
+    ConfigurationNode,
+    Constraint,
+    Feature,
+    Interval,
+)
+from cfmtoolbox.validation import (
+    ConfigurationValidator,
+    ViolationKind,
+    feature_name,
+    validate_many,
+)
+
+
+@pytest.fixture
+def model():
+    sandwich = Feature(
+        "Sandwich",
+        Cardinality([Interval(1, 1)]),
+        Cardinality([Interval(1, 2)]),
+        Cardinality([Interval(1, 3)]),
+        None,
+        [],
+    )
+    bread = Feature(
+        "Bread",
+        Cardinality([Interval(1, 2)]),
+        Cardinality([]),
+        Cardinality([]),
+        sandwich,
+        [],
+    )
+    cheese = Feature(
+        "Cheese",
+        Cardinality([Interval(0, 1)]),
+        Cardinality([Interval(1, 1)]),
+        Cardinality([Interval(1, 1)]),
+        sandwich,
+        [],
+    )
+    gouda = Feature(
+        "Gouda",
+        Cardinality([Interval(0, 1)]),
+        Cardinality([]),
+        Cardinality([]),
+        cheese,
+        [],
+    )
+    sandwich.children = [bread, cheese]
+    cheese.children = [gouda]
+
+    return CFM(
+        sandwich,
+        [
+            Constraint(
+                False,
+                bread,
+                Cardinality([Interval(2, 2)]),
+                gouda,
+                Cardinality([Interval(1, 1)]),
+            )
+        ],
+    )
+
+
+@pytest.fixture
+def validator(model: CFM):
+    return ConfigurationValidator(model)
+
+
+def test_feature_name():
+    assert feature_name("Bread#12") == "Bread"
+    assert feature_name("Bread") == "Bread"
+
+
+def test_validator_accepts_flat_cfm(model: CFM):
+    flat_model = FlatCFM.from_cfm(model)
+    assert ConfigurationValidator(flat_model).flat_cfm is flat_model
+
+
+def test_validate_valid_configuration(validator: ConfigurationValidator):
+    configuration = ConfigurationNode(
+        "Sandwich#0",
+        [
+            ConfigurationNode("Bread#0", []),
+            ConfigurationNode("Cheese#0", [ConfigurationNode("Gouda#0", [])]),
+        ],
+    )
+
+    assert validator.validate(configuration) is None
+
+
+@pytest.mark.parametrize(
+    ["configuration", "kind", "path", "feature", "count"],
+    [
+        (
+            ConfigurationNode("Bread#0", []),
+            ViolationKind.ROOT,
+            ["Bread#0"],
+            "Sandwich",
+            None,
+        ),
+        (
+            ConfigurationNode(
+                "Sandwich#0",
+                [ConfigurationNode("Bread#0", []), ConfigurationNode("Ham#0", [])],
+            ),
+            ViolationKind.UNEXPECTED_CHILD,
+            ["Sandwich#0", "Ham#0"],
+            "Sandwich",
+            None,
+        ),
+        (
+            ConfigurationNode(
+                "Sandwich#0",
+                [ConfigurationNode("Cheese#0", []), ConfigurationNode("Bread#0", [])],
+            ),
+            ViolationKind.UNEXPECTED_CHILD,
+            ["Sandwich#0", "Bread#0"],
+            "Sandwich",
+            None,
+        ),
+        (
+            ConfigurationNode("Sandwich#0", []),
+            ViolationKind.GROUP_INSTANCE_CARDINALITY,
+            ["Sandwich#0"],
+            "Sandwich",
+            0,
+        ),
+        (
+            ConfigurationNode(
+                "Sandwich#0",
+                [ConfigurationNode("Bread#0", []), ConfigurationNode("Cheese#0", [])],
+            ),
+            ViolationKind.GROUP_INSTANCE_CARDINALITY,
+            ["Sandwich#0", "Cheese#0"],
+            "Cheese",
+            0,
+        ),
+        (
+            ConfigurationNode("Sandwich#0", [ConfigurationNode("Cheese#0", [])]),
+            ViolationKind.INSTANCE_CARDINALITY,
+            ["Sandwich#0"],
+            "Bread",
+            0,
+        ),
+        (
+            ConfigurationNode(
+                "Sandwich#0",
+                [
+                    ConfigurationNode("Bread#0", []),
+                    ConfigurationNode("Bread#1", []),
+                    ConfigurationNode("Cheese#0", [ConfigurationNode("Gouda#0", [])]),
+                ],
+            ),
+            ViolationKind.CONSTRAINT,
+            ["Sandwich#0"],
+            "Gouda",
+            1,
+        ),
+    ],
+)
+def test_validate_reports_first_violation(
+    validator: ConfigurationValidator,
+    configuration: ConfigurationNode,
+    kind: ViolationKind,
+    path: list[str],
+    feature: str,
+    count: int | None,
+):
+    violation = validator.validate(configuration)
+
+    assert violation is not None
+    assert violation.kind == kind
+    assert violation.path == path
+    assert violation.feature == feature
+    assert violation.count == count
+
+
+def test_validate_group_type_cardinality():
+    root = Feature(
+        "Root",
+        Cardinality([Interval(1, 1)]),
+        Cardinality([Interval(1, 1)]),
+        Cardinality([Interval(0, 2)]),
+        None,
+        [],
+    )
+    root.children = [
+        Feature(
+            name,
+            Cardinality([Interval(0, 1)]),
+            Cardinality([]),
+            Cardinality([]),
+            root,
+            [],
+        )
+        for name in ["A", "B"]
+    ]
+    configuration = ConfigurationNode(
+        "Root#0", [ConfigurationNode("A#0", []), ConfigurationNode("B#0", [])]
+    )
+
+    violation = ConfigurationValidator(CFM(root, [])).validate(configuration)
+
+    assert violation is not None
+    assert violation.kind == ViolationKind.GROUP_TYPE_CARDINALITY
+    assert violation.count == 2
+
+
+def test_validate_deep_configuration_without_recursion():
+    depth = 5000
+    root = Feature(
+        "Level0",
+        Cardinality([Interval(1, 1)]),
+        Cardinality([Interval(1, 1)]),
+        Cardinality([Interval(1, 1)]),
+        None,
+        [],
+    )
+    feature = root
+    for level in range(1, depth):
+        child = Feature(
+            f"Level{level}",
+            Cardinality([Interval(1, 1)]),
+            Cardinality([Interval(1, 1)]),
+            Cardinality([Interval(1, 1)]),
+            feature,
+            [],
+        )
+        feature.children.append(child)
+        feature = child
+    feature.group_type_cardinality = Cardinality([])
+    feature.group_instance_cardinality = Cardinality([])
+
+    configuration = ConfigurationNode("Level0#0", [])
+    node = configuration
+    for level in range(1, depth):
+        child_node = ConfigurationNode(f"Level{level}#0", [])
+        node.children.append(child_node)
+        node = child_node
+
+    validator = ConfigurationValidator(CFM(root, []))
+
+    assert validator.validate(configuration) is None
+
+    node.children.append(ConfigurationNode("Extra#0", []))
+    violation = validator.validate(configuration)
+
+    assert violation is not None
+    assert violation.kind == ViolationKind.UNEXPECTED_CHILD
+    assert len(violation.path) == depth + 1
+
+
+@pytest.mark.parametrize(
+    "configuration",
+    [
+        ConfigurationNode(
+            "Sandwich#0",
+            [
+                ConfigurationNode("Bread#0", []),
+                ConfigurationNode("Cheese#0", [ConfigurationNode("Gouda#0", [])]),
+            ],
+        ),
+        ConfigurationNode("Bread#0", []),
+        ConfigurationNode(
+            "Sandwich#0",
+            [ConfigurationNode("Cheese#0", []), ConfigurationNode("Bread#0", [])],
+        ),
+        ConfigurationNode(
+            "Sandwich#0",
+            [ConfigurationNode("Bread#0", [ConfigurationNode("Gouda#0", [])])],
+        ),
+        ConfigurationNode("Sandwich#0", []),
+        ConfigurationNode(
+            "Sandwich#0",
+            [ConfigurationNode("Bread#0", []), ConfigurationNode("Cheese#0", [])],
+        ),
+        ConfigurationNode("Sandwich#0", [ConfigurationNode("Cheese#0", [])]),
+        ConfigurationNode(
+            "Sandwich#0",
+            [
+                ConfigurationNode("Bread#0", []),
+                ConfigurationNode("Bread#1", []),
+                ConfigurationNode("Cheese#0", [ConfigurationNode("Gouda#0", [])]),
+            ],
+        ),
+    ],
+)
+def test_validate_flat_matches_validate(
+    validator: ConfigurationValidator, configuration: ConfigurationNode
+):
+    flat_configuration = FlatConfiguration.from_configuration_node(
+        configuration, validator.flat_cfm
+    )
+
+    assert validator.validate_flat(flat_configuration) == validator.validate(
+        configuration
+    )
+
+
+def test_validate_flat_empty_configuration(validator: ConfigurationValidator):
+    violation = validator.validate_flat(FlatConfiguration(validator.flat_cfm.names))
+
+    assert violation is not None
+    assert violation.kind == ViolationKind.ROOT
+    assert violation.path == []
+
+
+@pytest.fixture
+def configurations():
+    valid = ConfigurationNode(
+        "Sandwich#0",
+        [
+            ConfigurationNode("Bread#0", []),
+            ConfigurationNode("Cheese#0", [ConfigurationNode("Gouda#0", [])]),
+        ],
+    )
+    invalid = ConfigurationNode("Sandwich#0", [])
+    return [valid, invalid] * 50
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_validate_many(
+    model: CFM, configurations: list[ConfigurationNode], workers: int
+):
+    verdicts = list(validate_many(model, configurations, workers, chunk_size=8))
+
+    assert len(verdicts) == 100
+    assert verdicts[0::2] == [None] * 50
+    assert all(
+        verdict is not None and verdict.kind == ViolationKind.GROUP_INSTANCE_CARDINALITY
+        for verdict in verdicts[1::2]
+    )
+
+
+def test_validate_many_is_lazy(model: CFM, configurations: list[ConfigurationNode]):
+    consumed = []
+
+    def generate():
+        for configuration in configurations:
+            consumed.append(configuration)
+            yield configuration
+
+    verdicts = validate_many(model, generate(), chunk_size=8)
+
+    assert next(verdicts) is None
+    assert len(consumed) == 8
+
+
+def test_validate_many_rejects_empty_chunks(
+    model: CFM, configurations: list[ConfigurationNode]
+):
+    with pytest.raises(ValueError, match="Chunk size must be at least 1"):
+        validate_many(model, configurations, chunk_size=0)
+
+
+def test_validate_many_rejects_missing_workers(
+    model: CFM, configurations: list[ConfigurationNode]
+):
+    with pytest.raises(ValueError, match="Number of workers must be at least 1"):
+        validate_many(model, configurations, workers=0)
+
+
+def test_validate_batch_matches_validate(
+    validator: ConfigurationValidator, configurations: list[ConfigurationNode]
+):
+    violating = ConfigurationNode(
+        "Sandwich#0",
+        [
+            ConfigurationNode("Bread#0", []),
+            ConfigurationNode("Bread#1", []),
+            ConfigurationNode("Cheese#0", [ConfigurationNode("Gouda#0", [])]),
+        ],
+    )
+    batch = configurations[:4] + [violating]
+
+    assert validator.validate_batch(batch) == [
+        validator.validate(configuration) for configuration in batch
+    ]